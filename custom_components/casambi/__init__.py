@@ -2,71 +2,114 @@
 
 import asyncio
 import logging
+import time
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers.issue_registry import async_create_issue, IssueSeverity
+from homeassistant.exceptions import ConfigEntryError, ConfigEntryNotReady
+from homeassistant.helpers.issue_registry import (
+    IssueSeverity,
+    async_create_issue,
+    async_delete_issue,
+)
 
+import aiohttp
 import async_timeout
 
-from .utils import async_create_controller, async_create_coordinator
+from .casambi.CasambiTopologyStore import CasambiTopologyStore
+from .casambi.CasambiTrafficRecorder import CasambiTrafficRecorder
+from .errors import AuthenticationError
+from .utils import (
+    async_build_controller,
+    async_start_controller,
+    async_create_coordinator,
+    get_controllers,
+)
 
-from .const import DOMAIN, CONF_CONTROLLER, CONF_COORDINATOR, MAX_START_UP_TIME
+from .const import (
+    DOMAIN,
+    CONF_CONTROLLER,
+    CONF_COORDINATOR,
+    CONF_LIFECYCLE,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_RECORD_MAX_BYTES,
+    DEFAULT_RECORD_BACKUP_COUNT,
+    DEFAULT_RECONNECT_MIN_DELAY,
+    DEFAULT_RECONNECT_MAX_DELAY,
+    MAX_START_UP_TIME,
+    SERVICE_CASAMBI_SET_UNITS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 _PLATFORM_LIGHT: list[Platform] = [Platform.LIGHT]
 _PLATFORM_BINARY_SENSOR: list[Platform] = [Platform.BINARY_SENSOR]
+_PLATFORM_SCENE: list[Platform] = [Platform.SCENE]
+_PLATFORM_SENSOR: list[Platform] = [Platform.SENSOR]
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up platform from a ConfigEntry."""
+    start_time = time.monotonic()
+
     hass.data.setdefault(DOMAIN, {})
     config = hass.data[DOMAIN][config_entry.entry_id] = dict(config_entry.data)
+    # Options set through the options flow override the entry data
+    config.update(config_entry.options)
     # Registers update listener to update config entry when options are updated.
     # Store a reference to the unsubscribe function to cleanup if an entry is unloaded.
     config["remove_update_listener"] = config_entry.add_update_listener(
         options_update_listener
     )
 
-    if CONF_CONTROLLER in hass.data[DOMAIN]:
-        dbg_msg = "async_setup_platform CasambiController already created!"
-        _LOGGER.debug(dbg_msg)
-
-        async_create_issue(
-            hass=hass,
-            domain=DOMAIN,
-            issue_id="restart_required_casambi",
-            is_fixable=True,
-            issue_domain=DOMAIN,
-            severity=IssueSeverity.WARNING,
-            translation_key="restart_required",
-            translation_placeholders={},
+    # Every config entry has its own controller, a restart is no longer
+    # required to add another one
+    async_delete_issue(hass, DOMAIN, "restart_required_casambi")
+
+    # Entities are registered from the cached topology right away
+    # when available, the controller is then started in the background.
+    topology_store = CasambiTopologyStore(hass, config_entry.entry_id)
+    cached_units = await topology_store.async_load_units()
+
+    controller = config[CONF_CONTROLLER] = await async_build_controller(hass, config)
+    controller.set_cached_units(cached_units)
+
+    if config.get(CONF_RECORD_TRAFFIC):
+        # Opt-in, every signal reaching the controller is written to disk
+        controller.traffic_recorder = CasambiTrafficRecorder(
+            hass,
+            get_traffic_path(hass, config_entry),
+            controller.get_units,
+            controller.get_unit,
+            max_bytes=DEFAULT_RECORD_MAX_BYTES,
+            backup_count=DEFAULT_RECORD_BACKUP_COUNT,
         )
-        return True
+    else:
+        # Recordings are dropped once recording is turned off
+        await async_remove_traffic_files(hass, config_entry)
 
-    controller = hass.data[DOMAIN][CONF_CONTROLLER] = None
+    if not cached_units:
+        try:
+            started = await async_start_controller_with_timeout(controller)
+        except AuthenticationError as err:
+            await async_abort_setup(hass, config_entry)
+            async_create_auth_issue(hass, config_entry)
+            raise ConfigEntryError(str(err)) from err
+        except aiohttp.ClientError as err:
+            await async_abort_setup(hass, config_entry)
+            raise ConfigEntryNotReady(f"Error connecting to the Casambi: {err}") from err
 
-    # controller = hass.data[DOMAIN][CONF_CONTROLLER] = await hass.async_add_executor_job(
-    #    async_create_controller, hass, config
-    # )
-    try:
-        with async_timeout.timeout(MAX_START_UP_TIME):
-            controller = hass.data[DOMAIN][CONF_CONTROLLER] = (
-                await async_create_controller(hass, config)
-            )
+        if not started:
+            # Home Assistant retries the setup later
+            await async_abort_setup(hass, config_entry)
+            raise ConfigEntryNotReady("Failed to start Casambi controller")
 
-    except asyncio.TimeoutError:
-        err_msg = "Error connecting to the Casambi, "
-        err_msg += "caught asyncio.TimeoutError"
-        _LOGGER.error(err_msg)
-        return None
+        async_delete_issue(hass, DOMAIN, get_auth_issue_id(config_entry))
 
-    if not controller:
-        return False
+        await topology_store.async_save_units(controller.get_units())
 
-    hass.data[DOMAIN][CONF_COORDINATOR] = await hass.async_add_executor_job(
-        async_create_coordinator, hass, config, controller
+    coordinator = config[CONF_COORDINATOR] = await async_create_coordinator(
+        hass, config, controller
     )
 
     # Forward the setup to the sensor platform.
@@ -86,20 +129,172 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> b
         config_entry, _PLATFORM_BINARY_SENSOR
     )
 
+    await hass.config_entries.async_forward_entry_setups(config_entry, _PLATFORM_SCENE)
+
+    await hass.config_entries.async_forward_entry_setups(config_entry, _PLATFORM_SENSOR)
+
+    if cached_units:
+        config_entry.async_create_background_task(
+            hass,
+            async_start_cached_controller(
+                hass, config_entry, controller, coordinator, topology_store
+            ),
+            "casambi_start_controller",
+        )
+
+    get_lifecycle(hass, config_entry)["setup_time"] = round(
+        time.monotonic() - start_time, 3
+    )
+
     return True
 
 
+async def async_abort_setup(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """
+    Undo a failed setup of a config entry so it can be set up again
+    """
+    config = hass.data[DOMAIN].pop(config_entry.entry_id)
+    config["remove_update_listener"]()
+
+    await config[CONF_CONTROLLER].async_stop()
+
+
+def get_auth_issue_id(config_entry: ConfigEntry) -> str:
+    """
+    Id of the repair issue raised when the credentials are rejected
+    """
+    return f"invalid_auth_{config_entry.entry_id}"
+
+
+def async_create_auth_issue(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """
+    Ask the user to set up a config entry whose credentials were rejected
+    again, it is not retried until then
+    """
+    async_create_issue(
+        hass,
+        DOMAIN,
+        get_auth_issue_id(config_entry),
+        is_fixable=False,
+        severity=IssueSeverity.ERROR,
+        translation_key="invalid_auth",
+        translation_placeholders={"title": config_entry.title},
+    )
+
+
+def get_lifecycle(hass: HomeAssistant, config_entry: ConfigEntry) -> dict:
+    """
+    Setup, unload and reload times of a config entry, kept across reloads
+    """
+    lifecycle = hass.data[DOMAIN].setdefault(CONF_LIFECYCLE, {})
+
+    return lifecycle.setdefault(config_entry.entry_id, {})
+
+
+def get_traffic_path(hass: HomeAssistant, config_entry: ConfigEntry) -> str:
+    """
+    Path of the traffic recording of a config entry
+    """
+    return hass.config.path(f"{DOMAIN}_traffic_{config_entry.entry_id}.jsonl")
+
+
+async def async_remove_traffic_files(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> None:
+    """
+    Remove the traffic recording of a config entry and its backups
+    """
+    removed = await hass.async_add_executor_job(
+        CasambiTrafficRecorder.remove_files, get_traffic_path(hass, config_entry)
+    )
+
+    if removed:
+        _LOGGER.debug("Removed %d Casambi traffic files", removed)
+
+
+async def async_start_controller_with_timeout(controller) -> bool:
+    """
+    Connect controller to Casambi, gives up after MAX_START_UP_TIME seconds.
+    """
+    try:
+        async with async_timeout.timeout(MAX_START_UP_TIME):
+            return await async_start_controller(controller)
+
+    except asyncio.TimeoutError:
+        err_msg = "Error connecting to the Casambi, "
+        err_msg += "caught asyncio.TimeoutError"
+        _LOGGER.error(err_msg)
+
+    return False
+
+
+async def async_start_cached_controller(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    controller,
+    coordinator,
+    topology_store,
+) -> None:
+    """
+    Start a controller whose entities were registered from the cached
+    topology and reconcile them with the live units.
+
+    Failed starts are retried with exponential backoff until the
+    controller is started or the config entry is unloaded. Rejected
+    credentials are not retried, a repair issue is raised instead.
+    """
+    attempts = 0
+    while True:
+        attempts += 1
+
+        try:
+            if await async_start_controller_with_timeout(controller):
+                break
+        except AuthenticationError:
+            async_create_auth_issue(hass, config_entry)
+            return
+        except aiohttp.ClientError as err:
+            _LOGGER.error("Error connecting to the Casambi: %s", err)
+
+        delay = min(
+            DEFAULT_RECONNECT_MAX_DELAY,
+            DEFAULT_RECONNECT_MIN_DELAY * 2 ** (attempts - 1),
+        )
+
+        warn_msg = "Failed to start Casambi controller, lights restored from "
+        warn_msg += "cache stay unavailable, attempt %d, trying again in %d seconds"
+        _LOGGER.warning(warn_msg, attempts, delay)
+
+        await asyncio.sleep(delay)
+
+    async_delete_issue(hass, DOMAIN, get_auth_issue_id(config_entry))
+
+    controller.reconcile_units()
+
+    await topology_store.async_save_units(controller.get_units())
+    await coordinator.async_refresh()
+
+
 async def options_update_listener(hass: HomeAssistant, config_entry: ConfigEntry):
     """
     Handle options update.
     """
+    start_time = time.monotonic()
+
     await hass.config_entries.async_reload(config_entry.entry_id)
 
+    reload_time = round(time.monotonic() - start_time, 3)
+    get_lifecycle(hass, config_entry)["reload_time"] = reload_time
+
+    _LOGGER.debug(f"Reloaded {config_entry.entry_id} in {reload_time} seconds")
+
 
 async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """
     Unload a config entry.
     """
+    start_time = time.monotonic()
+
     unload_ok = all(
         await asyncio.gather(
             *[
@@ -109,6 +304,12 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
                 hass.config_entries.async_forward_entry_unload(
                     config_entry, Platform.BINARY_SENSOR
                 ),
+                hass.config_entries.async_forward_entry_unload(
+                    config_entry, Platform.SCENE
+                ),
+                hass.config_entries.async_forward_entry_unload(
+                    config_entry, Platform.SENSOR
+                ),
             ]
         )
     )
@@ -117,11 +318,39 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
 
     # Remove config entry from domain.
     if unload_ok:
-        hass.data[DOMAIN].pop(config_entry.entry_id)
+        config = hass.data[DOMAIN].pop(config_entry.entry_id)
+
+        # Stop websockets and timers, drop the coordinator
+        if config.get(CONF_CONTROLLER):
+            await config[CONF_CONTROLLER].async_stop()
+
+        coordinator = config.pop(CONF_COORDINATOR, None)
+        if coordinator is not None:
+            await coordinator.async_shutdown()
+
+        config.pop(CONF_CONTROLLER, None)
+
+        if not get_controllers(hass):
+            hass.services.async_remove(DOMAIN, SERVICE_CASAMBI_SET_UNITS)
+
+        unload_time = round(time.monotonic() - start_time, 3)
+        get_lifecycle(hass, config_entry)["unload_time"] = unload_time
+
+        _LOGGER.debug(f"Unloaded {config_entry.entry_id} in {unload_time} seconds")
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """
+    Remove the cached topology and traffic recording of a deleted config entry.
+    """
+    await CasambiTopologyStore(hass, config_entry.entry_id).async_remove()
+    await async_remove_traffic_files(hass, config_entry)
+
+    async_delete_issue(hass, DOMAIN, get_auth_issue_id(config_entry))
+
+
 async def async_setup(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up the GitHub Custom component from yaml configuration."""
 
@@ -3,9 +3,10 @@ Binary Sensor implementation for Casambi
 """
 
 import logging
+import time
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 
 from .casambi.CasambiStatusBinarySensorEntity import CasambiStatusBinarySensorEntity
 from .const import (
@@ -29,27 +30,43 @@ async def async_setup_entry(
     """
     Setting up binary sensor
     """
+    start_time = time.monotonic()
+
     _LOGGER.debug(f"Setting up binary sensor entities. config_entry:{config_entry}")
 
-    controller = hass.data[DOMAIN][CONF_CONTROLLER]
+    controller = hass.data[DOMAIN][config_entry.entry_id][CONF_CONTROLLER]
+
+    @callback
+    def async_add_units(units):
+        """Add binary sensor entities for units"""
+        binary_sensors = []
+
+        for unit in units:
+            _LOGGER.debug("Adding CasambiStatusBinarySensorEntity...")
+            binary_sensors.append(
+                CasambiStatusBinarySensorEntity(unit, controller, hass)
+            )
+
+            # TODO: check for overheat control
+            # 'controls': [[{'name': 'overheat', 'type': 'Overheat', 'status': 'ok'}, ...]]
+            # if ...
+            #   _LOGGER.debug("Adding CasambiOverheatBinarySensorEntity...")
+            #   binary_sensors.append(CasambiOverheatBinarySensorEntity(unit, controller, hass))
 
-    units = controller.aiocasambi_controller.get_units()
-    binary_sensors = []
+        if binary_sensors:
+            _LOGGER.debug("Adding binary sensor entities...")
+            async_add_entities(binary_sensors)
+        else:
+            _LOGGER.debug("No binary sensor entities available.")
 
-    for unit in units:
-        _LOGGER.debug("Adding CasambiStatusBinarySensorEntity...")
-        binary_sensors.append(CasambiStatusBinarySensorEntity(unit, controller, hass))
+        return len(binary_sensors)
 
-        # TODO: check for overheat control
-        # 'controls': [[{'name': 'overheat', 'type': 'Overheat', 'status': 'ok'}, ...]]
-        # if ...
-        #   _LOGGER.debug("Adding CasambiOverheatBinarySensorEntity...")
-        #   binary_sensors.append(CasambiOverheatBinarySensorEntity(unit, controller, hass))
+    # Units can be cached ones, units discovered later are added by listener
+    num_binary_sensors = async_add_units(controller.get_units())
+    controller.add_units_listener(async_add_units)
 
-    if binary_sensors:
-        _LOGGER.debug("Adding binary sensor entities...")
-        async_add_entities(binary_sensors)
-    else:
-        _LOGGER.debug("No binary sensor entities available.")
+    dbg_msg = f"Set up {num_binary_sensors} binary sensor entities for "
+    dbg_msg += f"{config_entry.entry_id} in {time.monotonic() - start_time:.3f} seconds"
+    _LOGGER.debug(dbg_msg)
 
     return True
@@ -18,7 +18,7 @@ class CasambiBinarySensorEntity(BinarySensorEntity, CasambiEntity):
         device_class=None,
         icon=None,
     ):
-        _LOGGER.debug(f"Casambi {name} - init - start")
+        _LOGGER.debug("Casambi %s - init - start", name)
 
         BinarySensorEntity.__init__(self)
         CasambiEntity.__init__(self, unit, controller, hass, name)
@@ -26,4 +26,4 @@ class CasambiBinarySensorEntity(BinarySensorEntity, CasambiEntity):
         self._attr_device_class = device_class
         self._attr_icon = icon
 
-        _LOGGER.debug(f"Casambi {name} - init - end")
+        _LOGGER.debug("Casambi %s - init - end", name)
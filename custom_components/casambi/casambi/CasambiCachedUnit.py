@@ -0,0 +1,170 @@
+"""
+Unit restored from the topology cache.
+"""
+
+from ..errors import CasambiException
+
+
+class CasambiCachedUnit:
+    """
+    Stand-in for an aiocasambi unit restored from the topology cache.
+
+    Used to register entities before the Casambi cloud session is up,
+    it is replaced by the live unit once the controller has started.
+    """
+
+    def __init__(self, data: dict):
+        """Initialize cached unit from its stored representation."""
+        self.unique_id = data["unique_id"]
+        self.unit_id = data["unit_id"]
+        self.network_id = data["network_id"]
+        self.name = data["name"]
+        self.type = data.get("type")
+        self.oem = data.get("oem")
+        self.fixture_model = data.get("fixture_model")
+        self.fixture_id = data.get("fixture_id")
+        self.firmware_version = data.get("firmware_version")
+        self._supports = data.get("supports", {})
+        self._min_mired = data.get("min_mired")
+        self._max_mired = data.get("max_mired")
+        self._min_kelvin = data.get("min_kelvin")
+        self._max_kelvin = data.get("max_kelvin")
+
+        # State is not known until the live unit is available
+        self.online = False
+        self.value = 0
+        self.distribution = 0
+
+    @staticmethod
+    def as_dict(unit) -> dict:
+        """
+        Stored representation of an aiocasambi unit
+        """
+        supports = {
+            "brightness": unit.supports_brightness(),
+            "distribution": unit.supports_distribution(),
+            "color_temperature": unit.supports_color_temperature(),
+            "rgb": unit.supports_rgb(),
+            "rgbw": unit.supports_rgbw(),
+        }
+
+        result = {
+            "unique_id": unit.unique_id,
+            "unit_id": unit.unit_id,
+            "network_id": unit.network_id,
+            "name": unit.name,
+            "type": unit.type,
+            "oem": unit.oem,
+            "fixture_model": unit.fixture_model,
+            "fixture_id": unit.fixture_id,
+            "firmware_version": unit.firmware_version,
+            "supports": supports,
+        }
+
+        if supports["color_temperature"]:
+            result["min_mired"] = unit.get_min_mired()
+            result["max_mired"] = unit.get_max_mired()
+
+            (min_kelvin, max_kelvin, _) = unit.get_supported_color_temperature()
+            result["min_kelvin"] = min_kelvin
+            result["max_kelvin"] = max_kelvin
+
+        return result
+
+    def is_light(self) -> bool:
+        """Check if the unit is a light fixture"""
+        return self.type in ("Luminaire", "Driver")
+
+    def supports_brightness(self) -> bool:
+        """Returns true if unit supports brightness"""
+        return self._supports.get("brightness", False)
+
+    def supports_distribution(self) -> bool:
+        """Returns true if unit supports distribution"""
+        return self._supports.get("distribution", False)
+
+    def supports_color_temperature(self) -> bool:
+        """Returns true if unit supports color temperature"""
+        return self._supports.get("color_temperature", False)
+
+    def supports_rgb(self) -> bool:
+        """Returns true if unit supports rgb"""
+        return self._supports.get("rgb", False)
+
+    def supports_rgbw(self) -> bool:
+        """Returns true if unit supports rgbw"""
+        return self._supports.get("rgbw", False)
+
+    def get_min_mired(self) -> int:
+        """Coldest supported color temperature in mireds"""
+        return self._min_mired
+
+    def get_max_mired(self) -> int:
+        """Warmest supported color temperature in mireds"""
+        return self._max_mired
+
+    def get_supported_color_temperature(self) -> tuple:
+        """
+        Supported color temperature range in kelvin and the current one,
+        caches written before the range was stored derive it from the mireds
+        """
+        min_kelvin = self._min_kelvin
+        max_kelvin = self._max_kelvin
+
+        if min_kelvin is None and self._max_mired:
+            min_kelvin = round(1000000 / self._max_mired)
+        if max_kelvin is None and self._min_mired:
+            max_kelvin = round(1000000 / self._min_mired)
+
+        return (min_kelvin, max_kelvin, 0)
+
+    def get_color_temp(self):
+        """Color temperature is not known for a cached unit"""
+
+    def get_rgb_color(self):
+        """Color is not known for a cached unit"""
+
+    def get_rgbw_color(self):
+        """Color is not known for a cached unit"""
+
+    def _raise_not_connected(self):
+        """
+        Commands can not be sent before the controller has started
+        """
+        raise CasambiException(f"Casambi is not connected yet, unit: {self.name}")
+
+    async def turn_unit_on(self) -> None:
+        """Turn unit on"""
+        self._raise_not_connected()
+
+    async def turn_unit_off(self) -> None:
+        """Turn unit off"""
+        self._raise_not_connected()
+
+    async def set_unit_value(self, **kwargs) -> None:
+        """Set unit value"""
+        self._raise_not_connected()
+
+    async def set_unit_distribution(self, **kwargs) -> None:
+        """Set unit distribution"""
+        self._raise_not_connected()
+
+    async def set_unit_color_temperature(self, **kwargs) -> None:
+        """Set unit color temperature"""
+        self._raise_not_connected()
+
+    async def set_unit_rgb(self, **kwargs) -> None:
+        """Set unit rgb"""
+        self._raise_not_connected()
+
+    async def set_unit_rgbw(self, **kwargs) -> None:
+        """Set unit rgbw"""
+        self._raise_not_connected()
+
+    async def set_unit_target_controls(self, **kwargs) -> None:
+        """Set unit target controls"""
+        self._raise_not_connected()
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<Cached unit {self.name}: unique_id={self.unique_id}>"
@@ -0,0 +1,205 @@
+"""
+Outbound command queue for Casambi units.
+"""
+
+import asyncio
+import logging
+import time
+
+import aiohttp
+
+from aiocasambi import AiocasambiException
+
+from ..errors import CasambiException
+
+_LOGGER = logging.getLogger(__name__)
+
+# Target controls that select the color source, a new color replaces all of them
+COLOR_CONTROLS = ("ColorTemperature", "RGB", "White", "Colorsource")
+
+
+class CasambiCommandQueue:
+    """
+    Per unit outbound command queue.
+
+    Pending target controls for a unit are merged into a single
+    controlUnit message, a newer value for a control replaces the older
+    one (last write wins). Units are sent independently of each other,
+    only messages to the same unit are sent at least command_interval
+    seconds apart. All units share a token bucket that limits the
+    messages to rate per second after a burst of burst messages.
+    """
+
+    def __init__(self, hass, command_interval=0.05, rate=20, burst=10):
+        """Initialize the command queue."""
+        self._hass = hass
+        self._command_interval = command_interval
+        self._rate = rate
+        self._burst = burst
+
+        # Token bucket of all units, waiting sends get tokens in order
+        self._tokens = burst
+        self._tokens_updated = time.monotonic()
+        self._tokens_lock = asyncio.Lock()
+
+        # unit unique id -> pending command, not sent yet
+        self._pending = {}
+        self._tasks = set()
+
+        # unit unique id -> time the last message to the unit was sent
+        self._last_sent = {}
+
+        self.commands_enqueued = 0
+        self.commands_merged = 0
+        self.commands_sent = 0
+        self.commands_throttled = 0
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Counters of commands enqueued, merged and sent
+        """
+        return {
+            "commands_enqueued": self.commands_enqueued,
+            "commands_merged": self.commands_merged,
+            "commands_sent": self.commands_sent,
+            "commands_throttled": self.commands_throttled,
+            "commands_pending": len(self._pending),
+        }
+
+    async def async_enqueue(self, unit, target_controls: dict):
+        """
+        Queue target controls for unit and wait until the message
+        carrying them has been sent
+        """
+        future = self._hass.loop.create_future()
+
+        self.commands_enqueued += 1
+
+        pending = self._pending.get(unit.unique_id)
+        if pending is None:
+            self._pending[unit.unique_id] = {
+                "unit": unit,
+                "target_controls": dict(target_controls),
+                "futures": [future],
+            }
+        else:
+            # Last write wins, the pending message carries both commands
+            self.commands_merged += 1
+
+            pending_controls = pending["target_controls"]
+            if "Colorsource" in target_controls:
+                for control in COLOR_CONTROLS:
+                    pending_controls.pop(control, None)
+
+            pending_controls.update(target_controls)
+            pending["unit"] = unit
+            pending["futures"].append(future)
+
+            _LOGGER.debug(
+                "async_enqueue: merged pending command for unit %s, target controls: %s",
+                unit.unique_id,
+                pending_controls,
+            )
+
+        if pending is None:
+            task = self._hass.async_create_background_task(
+                self._async_send_unit(unit.unique_id), "casambi_command_queue"
+            )
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        await future
+
+    async def _async_acquire_token(self):
+        """
+        Wait until the token bucket of all units allows another message
+        """
+        async with self._tokens_lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst,
+                    self._tokens + (now - self._tokens_updated) * self._rate,
+                )
+                self._tokens_updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                self.commands_throttled += 1
+
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    async def _async_send_unit(self, unique_id):
+        """
+        Send the pending command of a unit, once command_interval seconds
+        have passed since the last message to the unit and the rate limit
+        of all units allows it
+        """
+        last_sent = self._last_sent.get(unique_id)
+        if last_sent is not None:
+            delay = last_sent + self._command_interval - time.monotonic()
+            if delay > 0:
+                # Commands enqueued meanwhile are merged into this one
+                await asyncio.sleep(delay)
+
+        # Commands enqueued while throttled are merged as well
+        await self._async_acquire_token()
+
+        pending = self._pending.pop(unique_id, None)
+        if pending is None:
+            return
+
+        self._last_sent[unique_id] = time.monotonic()
+
+        await self._async_send(pending)
+
+    async def _async_send(self, pending):
+        """
+        Send a pending command and complete its futures
+        """
+        unit = pending["unit"]
+        futures = pending["futures"]
+
+        try:
+            await unit.set_unit_target_controls(
+                target_controls=pending["target_controls"]
+            )
+        except (
+            AiocasambiException,
+            CasambiException,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+        ) as err:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(err)
+        else:
+            self.commands_sent += 1
+
+            for future in futures:
+                if not future.done():
+                    future.set_result(None)
+        finally:
+            # Unexpected errors end the task, callers must not wait forever
+            for future in futures:
+                if not future.done():
+                    future.cancel()
+
+    def cancel(self):
+        """
+        Cancel the send tasks and all pending commands
+        """
+        for task in list(self._tasks):
+            task.cancel()
+
+        self._tasks = set()
+        self._last_sent = {}
+
+        for pending in self._pending.values():
+            for future in pending["futures"]:
+                future.cancel()
+
+        self._pending = {}
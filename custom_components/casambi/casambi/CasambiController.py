@@ -2,9 +2,16 @@
 Support for Casambi lights.
 """
 
+import asyncio
 import logging
+import time
+
+from collections import deque
+from datetime import timedelta
 
 import aiocasambi
+import aiohttp
+import async_timeout
 
 from aiocasambi.consts import (
     SIGNAL_DATA,
@@ -15,6 +22,36 @@ from aiocasambi.consts import (
     SIGNAL_UNIT_PULL_UPDATE,
 )
 
+from ..errors import CasambiException
+from ..const import (
+    DEFAULT_POLLING_TIME,
+    DEFAULT_POLL_TIMEOUT,
+    DEFAULT_RECONCILE_INTERVAL,
+    DEFAULT_COMMAND_INTERVAL,
+    DEFAULT_SERVICE_CONCURRENCY,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_COMMAND_BURST,
+    DEFAULT_RECONNECT_MIN_DELAY,
+    DEFAULT_RECONNECT_MAX_DELAY,
+    DEFAULT_RECONNECT_TIMEOUT,
+    DEFAULT_SESSION_REFRESH_AGE,
+    DEFAULT_SESSION_RETRY_DELAY,
+    DEFAULT_ACK_TIMEOUT,
+    DEFAULT_LATENCY_SAMPLES,
+    DEFAULT_LATENCY_NOTIFY_INTERVAL,
+    DEFAULT_DIAGNOSTICS_HISTORY,
+    DEFAULT_DIAGNOSTICS_MINUTES,
+    DEFAULT_FLUSH_SLICE_BUDGET,
+    DEFAULT_SLOW_CALLBACK_THRESHOLD,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
+    DEFAULT_START_WAIT_TIMEOUT,
+)
+
+from .CasambiCommandQueue import CasambiCommandQueue
+from .CasambiGroup import CasambiGroup
+from .CasambiLatencyTracker import CasambiLatencyTracker
+from .CasambiScene import CasambiScene
+from .CasambiReconnectSupervisor import CasambiReconnectSupervisor
 from .CasambiLightEntity import CasambiLightEntity
 
 _LOGGER = logging.getLogger(__name__)
@@ -23,12 +60,133 @@ _LOGGER = logging.getLogger(__name__)
 class CasambiController:
     """Manages a single Casambi Controller."""
 
-    def __init__(self, hass, network_retry_timer=30, entities=[]):
+    def __init__(
+        self,
+        hass,
+        entities=None,
+        update_window=0,
+        poll_timeout=DEFAULT_POLL_TIMEOUT,
+        command_interval=DEFAULT_COMMAND_INTERVAL,
+        session_refresh_age=DEFAULT_SESSION_REFRESH_AGE,
+        slow_callback_threshold=DEFAULT_SLOW_CALLBACK_THRESHOLD / 1000,
+        optimistic=False,
+        optimistic_timeout=DEFAULT_OPTIMISTIC_TIMEOUT,
+    ):
         """Initialize the system."""
         self._hass = hass
         self._aiocasambi_controller = None
-        self._network_retry_timer = network_retry_timer
-        self.entities = entities
+        self.reconnect_supervisor = CasambiReconnectSupervisor(
+            hass,
+            self.async_reconnect,
+            self.websockets_running,
+            min_delay=DEFAULT_RECONNECT_MIN_DELAY,
+            max_delay=DEFAULT_RECONNECT_MAX_DELAY,
+            max_history=DEFAULT_DIAGNOSTICS_HISTORY,
+        )
+
+        # Session is renewed in the background before it expires
+        self._session_refresh_age = session_refresh_age
+        self._session_created = None
+        self._session_lifetime = None
+        self._session_refresh_handle = None
+        self._session_refresh_task = None
+        self.session_refreshes = 0
+        self.session_refresh_failures = 0
+        self._poll_timeout = poll_timeout
+        self._reconnect_timeout = DEFAULT_RECONNECT_TIMEOUT
+        self.entities = []
+        self._entities_by_unit = {}
+
+        # Units restored from the topology cache, used until started
+        self._cached_units = []
+        self._unit_listeners = []
+        self.is_started = False
+
+        # Capability profiles shared by the units of the same fixture
+        self.unit_profiles = {}
+
+        # Set once the cached units are replaced by the live units, or
+        # when the controller is stopped
+        self._started_event = asyncio.Event()
+
+        # Websocket updates are coalesced and flushed once per window (seconds)
+        self._update_window = update_window
+        self._dirty_units = set()
+        self._refresh_all = False
+        self._flush_handle = None
+
+        # Entities of dirty units are updated in slices of at most this
+        # many seconds, the rest after yielding to the event loop
+        self._slice_budget = DEFAULT_FLUSH_SLICE_BUDGET
+        self._pending_entities = deque()
+        self._pending_entity_set = set()
+        self.flush_slices = 0
+
+        # Callbacks taking longer than this many seconds are logged
+        self._slow_callback_threshold = slow_callback_threshold
+        self.slow_callbacks = 0
+
+        self.messages_received = 0
+        self.state_writes = 0
+
+        # Runtime counters for the diagnostics download
+        self.signals_received = {}
+        self.callback_time_total = 0.0
+        self.callback_time_max = 0.0
+        self.flush_time_total = 0.0
+        self.flush_time_max = 0.0
+        self._state_writes_by_minute = deque(maxlen=DEFAULT_DIAGNOSTICS_MINUTES)
+        self.polls = 0
+        self.poll_failures = 0
+        self._poll_durations = deque(maxlen=DEFAULT_DIAGNOSTICS_HISTORY)
+
+        # Opt-in recorder of the signals, see CasambiTrafficRecorder
+        self.traffic_recorder = None
+
+        # Outbound unit commands, coalesced per unit
+        self.command_queue = CasambiCommandQueue(
+            hass,
+            command_interval,
+            rate=DEFAULT_COMMAND_RATE,
+            burst=DEFAULT_COMMAND_BURST,
+        )
+
+        # Light commands are published before the unit confirms them,
+        # see CasambiLightEntity.set_optimistic
+        self.optimistic = optimistic
+        self.optimistic_timeout = optimistic_timeout
+        self.optimistic_commands = 0
+        self.optimistic_confirmed = 0
+        self.optimistic_rolled_back = 0
+        self.optimistic_timeouts = 0
+
+        # Time from a light command until the unit reports its target
+        self.latency_tracker = CasambiLatencyTracker(
+            hass,
+            timeout=DEFAULT_ACK_TIMEOUT,
+            max_samples=DEFAULT_LATENCY_SAMPLES,
+            notify_interval=DEFAULT_LATENCY_NOTIFY_INTERVAL,
+        )
+
+        # Casambi groups and scenes, discovered from the network state
+        self.groups = {}
+        self.scenes = {}
+        self.group_entities = []
+        self._group_entities_by_unit = {}
+        self._group_listeners = []
+        self._scene_listeners = []
+
+        # Polling, see update_poll_interval
+        self.coordinator = None
+        self._adaptive_polling = False
+        self._scan_interval = DEFAULT_POLLING_TIME
+        self._reconcile_interval = DEFAULT_RECONCILE_INTERVAL
+        self._last_message_time = None
+        self.poll_interval = None
+        self.poll_interval_reason = None
+
+        for entity in entities or []:
+            self.add_entity(entity)
 
     @property
     def aiocasambi_controller(self):
@@ -53,98 +211,1032 @@ class CasambiController:
             _LOGGER.warning("aiocasambi controller is not set yet!")
             return
 
+        if not self.is_started:
+            # Controller is still connecting in the background
+            _LOGGER.debug("async_update_data: controller is not started yet")
+            return
+
+        start_time = time.monotonic()
+        self.polls += 1
+
         try:
-            await self._hass.async_add_executor_job(
-                self._aiocasambi_controller.get_network_state
-            )
-            # await self._aiocasambi_controller.get_network_state()
-        except aiocasambi.Unauthorized:
-            # Need to reconnect, session is invalid
-            await self.async_reconnect()
+            async with async_timeout.timeout(self._poll_timeout):
+                # Signals SIGNAL_UNIT_PULL_UPDATE for the polled units
+                network_states = await self._aiocasambi_controller.get_network_state()
+        except asyncio.TimeoutError:
+            self.poll_failures += 1
 
-        self.update_all_lights()
+            err_msg = "async_update_data: timed out fetching network state "
+            err_msg += f"after {self._poll_timeout} seconds"
+            _LOGGER.warning(err_msg)
+        except aiocasambi.AiocasambiException as err:
+            self.poll_failures += 1
 
-    async def async_reconnect(self):
+            # get_network_state swallows a 401 per network and only
+            # raises a generic error, probe the session to tell them apart
+            if await self.async_session_expired():
+                self.set_session_expired()
+            else:
+                _LOGGER.warning(
+                    f"async_update_data: failed to fetch network state: {err}"
+                )
+        else:
+            self.update_network_topology(network_states)
+
+            # Write the polled state right away instead of on the next tick
+            self.flush_unit_updates()
+
+        self._poll_durations.append(round(time.monotonic() - start_time, 3))
+
+        self.update_poll_interval()
+
+    def set_polling(
+        self,
+        coordinator,
+        scan_interval=DEFAULT_POLLING_TIME,
+        reconcile_interval=DEFAULT_RECONCILE_INTERVAL,
+        adaptive_polling=False,
+    ):
         """
-        Reconnect to the Internet API
+        Setup polling of the network state.
+
+        With adaptive polling the coordinator polls every reconcile_interval
+        seconds while all websockets are running and pushing messages, and
+        every scan_interval seconds otherwise.
         """
-        _LOGGER.debug("async_reconnect: trying to connect to casambi")
-        await self._aiocasambi_controller.reconnect()
+        self.coordinator = coordinator
+        self._scan_interval = scan_interval
+        self._reconcile_interval = reconcile_interval
+        self._adaptive_polling = adaptive_polling
+        self.poll_interval = scan_interval
+        self.poll_interval_reason = "fixed"
+
+    def get_poll_interval(self):
+        """
+        Returns a tuple of the poll interval in seconds and the reason for it
+        """
+        if not self._adaptive_polling:
+            return (self._scan_interval, "fixed")
+
+        if not self._aiocasambi_controller:
+            return (self._scan_interval, "controller not set")
 
-        all_running = True
         states = self._aiocasambi_controller.get_websockets_states()
+        if not states:
+            return (self._scan_interval, "no websockets")
+
         for state in states:
             if state != STATE_RUNNING:
-                all_running = False
+                return (self._scan_interval, f"websocket {state}")
+
+        if self._last_message_time is None:
+            return (self._scan_interval, "websocket silent")
 
-        if not all_running:
-            msg = "async_reconnect: could not connect to casambi. "
-            msg += f"trying again in {self._network_retry_timer} seconds"
-            msg += f" websockets: {self._aiocasambi_controller.get_websockets()}"
-            _LOGGER.debug(msg)
+        silent_time = time.monotonic() - self._last_message_time
+        if silent_time > self._reconcile_interval:
+            return (self._scan_interval, "websocket silent")
 
-            # Try again to reconnect
-            self._hass.loop.call_later(self._network_retry_timer, self.async_reconnect)
+        return (self._reconcile_interval, "websockets running")
 
-    def update_light_state(self, unit_unique_id):
+    def update_poll_interval(self, refresh=False):
         """
-        Update unit state
+        Apply the current poll interval to the coordinator, with refresh
+        set a poll is requested right away when the interval shrinks.
         """
+        interval, reason = self.get_poll_interval()
+
+        if interval == self.poll_interval and reason == self.poll_interval_reason:
+            return
+
         _LOGGER.debug(
-            f"update_light_state: unit: {unit_unique_id} lights: {self.entities}"
+            "update_poll_interval: poll interval %s seconds, reason: %s",
+            interval,
+            reason,
+        )
+
+        shrinking = self.poll_interval is not None and interval < self.poll_interval
+        self.poll_interval = interval
+        self.poll_interval_reason = reason
+
+        if not self.coordinator:
+            return
+
+        self.coordinator.update_interval = timedelta(seconds=interval)
+
+        if refresh and shrinking:
+            # Current poll is scheduled with the longer interval
+            self._hass.async_create_task(self.coordinator.async_request_refresh())
+
+    @property
+    def polling_state(self) -> dict:
+        """
+        Current poll interval and the reason for it, and the durations
+        of the latest polls in seconds
+        """
+        durations = list(self._poll_durations)
+
+        return {
+            "adaptive_polling": self._adaptive_polling,
+            "poll_interval": self.poll_interval,
+            "poll_interval_reason": self.poll_interval_reason,
+            "polls": self.polls,
+            "poll_failures": self.poll_failures,
+            "poll_durations": durations,
+            "poll_duration_max": max(durations) if durations else None,
+        }
+
+    @property
+    def optimistic_state(self) -> dict:
+        """
+        Optimistic light commands that were confirmed and rolled back
+        """
+        return {
+            "optimistic": self.optimistic,
+            "optimistic_timeout": self.optimistic_timeout,
+            "commands": self.optimistic_commands,
+            "confirmed": self.optimistic_confirmed,
+            "rolled_back": self.optimistic_rolled_back,
+            "timeouts": self.optimistic_timeouts,
+        }
+
+    @property
+    def websockets_state(self) -> dict:
+        """
+        Websocket state of every network
+        """
+        if not self._aiocasambi_controller:
+            return {"states": [], "networks": {}}
+
+        networks = {}
+        for websocket in self._aiocasambi_controller.get_websockets():
+            networks[str(websocket.network_id)] = websocket.state
+
+        return {
+            "states": self._aiocasambi_controller.get_websockets_states(),
+            "networks": networks,
+        }
+
+    @property
+    def entity_counts(self) -> dict:
+        """
+        Number of units, groups and scenes and of the entities per type
+        """
+        entities = {}
+        for entity in self.entities + self.group_entities:
+            name = type(entity).__name__
+            entities[name] = entities.get(name, 0) + 1
+
+        return {
+            "units": len(self.get_units()),
+            "groups": len(self.groups),
+            "scenes": len(self.scenes),
+            "entities": entities,
+        }
+
+    async def async_reconnect(self):
+        """
+        Reconnect to the Internet API, one attempt. Retries are run by
+        the reconnect supervisor, errors are raised to it.
+
+        aiocasambi's reconnect() is not used, it retries on its own with a
+        fixed delay and stays a no-op for good after an unexpected error.
+        A new session is created and the websockets that are not running
+        are started again with it.
+        """
+        _LOGGER.debug("async_reconnect: trying to connect to casambi")
+
+        aiocasambi_controller = self._aiocasambi_controller
+
+        async with async_timeout.timeout(self._reconnect_timeout):
+            await aiocasambi_controller.create_session()
+
+            for websocket in aiocasambi_controller.get_websockets():
+                if websocket.state == STATE_RUNNING:
+                    continue
+
+                websocket.stop()
+                await aiocasambi_controller.start_websocket(
+                    network_id=websocket.network_id
+                )
+
+        self.set_session_created()
+
+        if not self.websockets_running():
+            _LOGGER.debug(
+                "async_reconnect: could not connect to casambi, websockets: %s",
+                self._aiocasambi_controller.get_websockets_states(),
+            )
+
+    async def async_session_expired(self) -> bool:
+        """
+        Returns True if the Casambi API rejects the current session,
+        probed with the state of one unit
+        """
+        units = self._aiocasambi_controller.get_units()
+        if not units:
+            return False
+
+        try:
+            async with async_timeout.timeout(self._poll_timeout):
+                await self._aiocasambi_controller.get_unit_state(
+                    unit_id=units[0].unit_id, network_id=units[0].network_id
+                )
+        except aiocasambi.Unauthorized:
+            return True
+        except (
+            aiocasambi.AiocasambiException,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+        ) as err:
+            _LOGGER.debug("async_session_expired: probe failed: %s", err)
+
+        return False
+
+    def set_session_expired(self):
+        """
+        Session expired before it was renewed, remember its lifetime so
+        the next one is renewed in time, and reconnect with a new session
+        """
+        if self._session_created is not None:
+            self._session_lifetime = time.monotonic() - self._session_created
+
+        _LOGGER.warning(
+            "Casambi session expired after %s seconds, reconnecting",
+            None if self._session_lifetime is None else round(self._session_lifetime),
+        )
+
+        self.reconnect_supervisor.start()
+
+    def get_session_refresh_age(self) -> float:
+        """
+        Session age in seconds when it is renewed, shortened to 80% of
+        the lifetime of a session that expired before it was renewed
+        """
+        refresh_age = self._session_refresh_age
+
+        if self._session_lifetime is not None:
+            refresh_age = min(refresh_age, self._session_lifetime * 0.8)
+
+        return max(refresh_age, DEFAULT_SESSION_RETRY_DELAY)
+
+    def set_session_created(self):
+        """
+        Record that a new session was created and schedule its renewal
+        """
+        self._session_created = time.monotonic()
+
+        self.schedule_session_refresh(self.get_session_refresh_age())
+
+    def schedule_session_refresh(self, delay):
+        """
+        Renew the session in delay seconds
+        """
+        if self._session_refresh_handle is not None:
+            self._session_refresh_handle.cancel()
+
+        self._session_refresh_handle = self._hass.loop.call_later(
+            delay, self._start_session_refresh
         )
+
+    def _start_session_refresh(self):
+        """
+        Start renewing the session in the background
+        """
+        self._session_refresh_handle = None
+
+        if self._session_refresh_task is not None or not self.is_started:
+            return
+
+        self._session_refresh_task = self._hass.async_create_background_task(
+            self.async_refresh_session(), "casambi_session_refresh"
+        )
+
+    async def async_refresh_session(self):
+        """
+        Create a new session without touching the websockets, polling
+        picks up the new session on its next request. Websockets keep
+        their session until they reopen, which aiocasambi only does in
+        reconnect() after creating a session of its own.
+        """
+        _LOGGER.debug("async_refresh_session: renewing casambi session")
+
+        try:
+            await self._aiocasambi_controller.create_session()
+        except (
+            aiocasambi.AiocasambiException,
+            aiohttp.ClientError,
+            asyncio.TimeoutError,
+        ) as err:
+            self.session_refresh_failures += 1
+
+            warn_msg = f"Failed to renew Casambi session: {err}, "
+            warn_msg += f"trying again in {DEFAULT_SESSION_RETRY_DELAY} seconds"
+            _LOGGER.warning(warn_msg)
+
+            self.schedule_session_refresh(DEFAULT_SESSION_RETRY_DELAY)
+            return
+        finally:
+            self._session_refresh_task = None
+
+        self.session_refreshes += 1
+        self.set_session_created()
+
+    @property
+    def session_state(self) -> dict:
+        """
+        Session age and renewals
+        """
+        session_age = None
+        if self._session_created is not None:
+            session_age = round(time.monotonic() - self._session_created, 3)
+
+        return {
+            "session_age": session_age,
+            "session_refresh_age": self.get_session_refresh_age(),
+            "session_lifetime": (
+                None
+                if self._session_lifetime is None
+                else round(self._session_lifetime, 3)
+            ),
+            "session_refreshes": self.session_refreshes,
+            "session_refresh_failures": self.session_refresh_failures,
+        }
+
+    def websockets_running(self) -> bool:
+        """
+        Returns True if all websockets are running
+        """
+        states = self._aiocasambi_controller.get_websockets_states()
+
+        return all(state == STATE_RUNNING for state in states)
+
+    async def async_stop(self):
+        """
+        Tear down the controller, stops the websockets and cancels
+        pending timers and commands
+        """
+        _LOGGER.debug("async_stop: stopping controller")
+
+        self.is_started = False
+
+        # Release commands waiting for the start
+        self._started_event.set()
+
+        self.reconnect_supervisor.stop()
+
+        if self._session_refresh_handle is not None:
+            self._session_refresh_handle.cancel()
+            self._session_refresh_handle = None
+
+        if self._session_refresh_task is not None:
+            self._session_refresh_task.cancel()
+            self._session_refresh_task = None
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        self.command_queue.cancel()
+        self.latency_tracker.cancel_all()
+
+        if self.traffic_recorder is not None:
+            await self.traffic_recorder.async_stop()
+
+        self.entities = []
+        self._entities_by_unit = {}
+        self.group_entities = []
+        self._group_entities_by_unit = {}
+        self._unit_listeners = []
+        self._group_listeners = []
+        self._scene_listeners = []
+        self._dirty_units = set()
+        self._pending_entities = deque()
+        self._pending_entity_set = set()
+        self.coordinator = None
+
+        if self._aiocasambi_controller:
+            try:
+                await self._aiocasambi_controller.stop_websockets()
+            except aiocasambi.AiocasambiException as err:
+                _LOGGER.warning(f"async_stop: failed to stop websockets: {err}")
+
+    def set_cached_units(self, units):
+        """
+        Set units restored from the topology cache
+        """
+        self._cached_units = units
+
+    def get_units(self) -> list:
+        """
+        Getter for units, cached units are returned until the
+        aiocasambi controller has started
+        """
+        if self.is_started:
+            return self._aiocasambi_controller.get_units()
+
+        return self._cached_units
+
+    def add_units_listener(self, listener):
+        """
+        Register a listener that is called with units discovered
+        when reconciling the cached units with the live units
+        """
+        self._unit_listeners.append(listener)
+
+    def reconcile_units(self):
+        """
+        Replace cached units of the entities with the live units and
+        notify listeners of units that do not have any entities yet
+        """
+        self.is_started = True
+
+        units = {}
+        for unit in self._aiocasambi_controller.get_units():
+            units[unit.unique_id] = unit
+
         for entity in self.entities:
-            if entity._unit_unique_id == unit_unique_id:
-                entity.update_state()
+            if entity._unit_unique_id in units:
+                entity.set_unit(units[entity._unit_unique_id])
+            else:
+                _LOGGER.warning(f"reconcile_units: unit {entity.unit} is gone")
+
+        new_units = []
+        for unique_id, unit in units.items():
+            if unique_id not in self._entities_by_unit:
+                new_units.append(unit)
+
+        _LOGGER.debug(
+            "reconcile_units: %d units, %d new units", len(units), len(new_units)
+        )
+
+        if new_units:
+            for listener in self._unit_listeners:
+                listener(new_units)
+
+        self._cached_units = []
+        self.update_all_lights()
+
+        self._started_event.set()
+
+    def get_groups(self) -> list:
+        """
+        Getter for the discovered Casambi groups
+        """
+        return list(self.groups.values())
+
+    def get_scenes(self) -> list:
+        """
+        Getter for the discovered Casambi scenes
+        """
+        return list(self.scenes.values())
+
+    def add_groups_listener(self, listener):
+        """
+        Register a listener that is called with newly discovered groups
+        """
+        self._group_listeners.append(listener)
+
+    def add_scenes_listener(self, listener):
+        """
+        Register a listener that is called with newly discovered scenes
+        """
+        self._scene_listeners.append(listener)
+
+    @staticmethod
+    def get_member_unit_ids(units) -> list:
+        """
+        Extract unit ids of group or scene members.
+
+        Scenes list members as {"12": {"id": 12}}, groups as
+        [{"0": 12, "position": 0}].
+        """
+        if isinstance(units, dict):
+            units = units.values()
+
+        result = []
+        for item in units or []:
+            if isinstance(item, dict):
+                unit_id = item.get("id")
+                if unit_id is None:
+                    unit_ids = [value for key, value in item.items() if key != "position"]
+                    unit_id = unit_ids[0] if unit_ids else None
+            else:
+                unit_id = item
+
+            if unit_id is not None:
+                result.append(str(unit_id))
+
+        return result
+
+    def update_network_topology(self, network_states):
+        """
+        Discover groups and scenes from the network states returned by
+        get_network_state, listeners are called with new ones
+        """
+        units = {}
+        for unit in self.get_units():
+            units[(str(unit.network_id), str(unit.unit_id))] = unit
+
+        new_groups = []
+        new_scenes = []
+
+        for network_state in network_states or []:
+            network_id = network_state.get("id")
+            if network_id is None:
+                continue
+
+            new_groups += self._update_topology_items(
+                self.groups, CasambiGroup, network_id, network_state.get("groups"), units
+            )
+            new_scenes += self._update_topology_items(
+                self.scenes, CasambiScene, network_id, network_state.get("scenes"), units
+            )
+
+        self._group_entities_by_unit = {}
+        for entity in self.group_entities:
+            for unit_unique_id in entity.group.unit_ids:
+                self._group_entities_by_unit.setdefault(unit_unique_id, []).append(
+                    entity
+                )
+
+        if new_groups:
+            _LOGGER.debug("update_network_topology: %d new groups", len(new_groups))
+
+            for listener in self._group_listeners:
+                listener(new_groups)
+
+        if new_scenes:
+            _LOGGER.debug("update_network_topology: %d new scenes", len(new_scenes))
+
+            for listener in self._scene_listeners:
+                listener(new_scenes)
+
+    def _update_topology_items(self, items, item_class, network_id, data, units):
+        """
+        Create or update groups or scenes of a network, returns the new ones
+        """
+        result = []
+
+        for item_data in (data or {}).values():
+            item = item_class(self, network_id, item_data)
+
+            if item.unique_id in items:
+                item = items[item.unique_id]
+            else:
+                items[item.unique_id] = item
+                result.append(item)
+
+            members = []
+            for unit_id in self.get_member_unit_ids(item_data.get("units")):
+                if (str(network_id), unit_id) in units:
+                    members.append(units[(str(network_id), unit_id)])
+
+            item.update(item_data, members)
+
+        return result
+
+    def add_group_entity(self, entity):
+        """
+        Register group entity and index it by the unique ids of its members
+        """
+        self.group_entities.append(entity)
+
+        for unit_unique_id in entity.group.unit_ids:
+            self._group_entities_by_unit.setdefault(unit_unique_id, []).append(entity)
+
+    async def async_send_network_message(self, message: dict, network_id: str):
+        """
+        Send a network level message, like controlGroup or controlScene,
+        on the websocket of the network
+        """
+        if not self.is_started:
+            raise CasambiException("Casambi is not connected yet")
+
+        wire_id = None
+        for websocket in self._aiocasambi_controller.get_websockets():
+            if websocket.network_id == network_id:
+                wire_id = websocket.wire_id
+
+        if wire_id is None:
+            raise CasambiException(f"No websocket for Casambi network {network_id}")
+
+        message = dict(message, wire=wire_id)
+
+        await self._aiocasambi_controller.ws_send_message(message, network_id=network_id)
+
+    def add_entity(self, entity):
+        """
+        Register entity and index it by the unique id of its unit
+        """
+        self.entities.append(entity)
+        self._entities_by_unit.setdefault(entity._unit_unique_id, []).append(entity)
+
+    def get_unit(self, unit_unique_id):
+        """
+        Unit of the entities for a unit unique id, None if unknown
+        """
+        entities = self._entities_by_unit.get(unit_unique_id)
+        if not entities:
+            return None
+
+        return entities[0].unit
+
+    @staticmethod
+    def get_unit_unique_ids(data):
+        """
+        Extract the unique ids of the units referenced in a signal payload.
+
+        SIGNAL_DATA carries a dict of aiocasambi units keyed by
+        "<network_id>-<unit_id>", SIGNAL_UNIT_PULL_UPDATE a list of
+        unit unique ids.
+        """
+        if isinstance(data, dict):
+            data = data.values()
+        elif not isinstance(data, (list, tuple, set)):
+            return []
+
+        result = []
+        for item in data:
+            unique_id = getattr(item, "unique_id", item)
+            if isinstance(unique_id, str):
+                result.append(unique_id)
+
+        return result
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Counters of websocket messages received versus state writes emitted,
+        and of queued unit commands
+        """
+        suppressed_writes = 0
+        for entity in self.entities + self.group_entities:
+            suppressed_writes += entity.suppressed_writes
+
+        result = {
+            "messages_received": self.messages_received,
+            "signals_received": dict(self.signals_received),
+            "state_writes": self.state_writes,
+            "state_writes_suppressed": suppressed_writes,
+            "state_writes_per_minute": self.get_state_writes_per_minute(),
+            "signalling_callback_time_total": round(self.callback_time_total, 6),
+            "signalling_callback_time_max": round(self.callback_time_max, 6),
+            "flush_time_total": round(self.flush_time_total, 6),
+            "flush_time_max": round(self.flush_time_max, 6),
+            "flush_slices": self.flush_slices,
+            "flush_pending": len(self._pending_entities),
+            "slow_callbacks": self.slow_callbacks,
+        }
+        result.update(self.command_queue.statistics)
+
+        return result
+
+    async def async_queue_command(self, unit, target_controls: dict):
+        """
+        Send target controls to unit through the command queue, they are
+        merged with the pending command for the unit
+        """
+        try:
+            await self.command_queue.async_enqueue(unit, target_controls)
+        except Exception:
+            # Not sent, there is nothing to acknowledge
+            self.latency_tracker.cancel(unit)
+            raise
+
+    async def async_wait_started(self) -> None:
+        """
+        Wait for the controller to start, raises CasambiException if it
+        does not start within DEFAULT_START_WAIT_TIMEOUT seconds
+        """
+        _LOGGER.debug("async_wait_started: waiting for the controller to start")
+
+        try:
+            async with async_timeout.timeout(DEFAULT_START_WAIT_TIMEOUT):
+                await self._started_event.wait()
+        except asyncio.TimeoutError:
+            pass
+
+        if not self.is_started:
+            raise CasambiException("Casambi is not connected yet")
+
+    def get_light_entity(self, entity_id=None, unit_unique_id=None):
+        """
+        Find a light or group light entity by entity id, or a light
+        entity by the unique id of its unit
+        """
+        if entity_id is not None:
+            for entity in self.entities + self.group_entities:
+                if entity.entity_id == entity_id and hasattr(entity, "async_turn_on"):
+                    return entity
+
+            return None
+
+        for entity in self._entities_by_unit.get(unit_unique_id, []):
+            if isinstance(entity, CasambiLightEntity):
+                return entity
+
+        return None
+
+    async def async_set_units(
+        self, targets: list, concurrency=DEFAULT_SERVICE_CONCURRENCY
+    ) -> list:
+        """
+        Apply per unit targets concurrently, at most concurrency units at
+        a time. Targets are dicts with entity_id or unit_id and the
+        light turn on attributes, brightness 0 turns the unit off.
+        Returns the result for each target.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def async_set_unit(target):
+            entity_id = target.get("entity_id")
+            unit_id = target.get("unit_id")
+            result = {"entity_id": entity_id, "unit_id": unit_id, "success": False}
+
+            entity = self.get_light_entity(entity_id=entity_id, unit_unique_id=unit_id)
+            if entity is None:
+                result["error"] = "light not found"
+                return result
+
+            result["entity_id"] = entity.entity_id
+            result["unit_id"] = getattr(entity, "_unit_unique_id", unit_id)
+
+            params = {}
+            for key, value in target.items():
+                if key not in ("entity_id", "unit_id"):
+                    params[key] = value
+
+            async with semaphore:
+                try:
+                    if params.get("brightness") == 0:
+                        await entity.async_turn_off()
+                    else:
+                        await entity.async_turn_on(**params)
+                except (
+                    aiocasambi.AiocasambiException,
+                    CasambiException,
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                ) as err:
+                    result["error"] = str(err) or type(err).__name__
+                    return result
+
+            result["success"] = True
+            return result
+
+        results = await asyncio.gather(*[async_set_unit(item) for item in targets])
+
+        failed = [item for item in results if not item["success"]]
+        if failed:
+            _LOGGER.warning(f"async_set_units: {len(failed)} of {len(results)} failed: {failed}")
+
+        return list(results)
+
+    def add_state_writes(self, state_writes: int) -> None:
+        """
+        Count state writes, per minute for the latest minutes
+        """
+        if not state_writes:
+            return
+
+        self.state_writes += state_writes
+
+        minute = int(time.monotonic() // 60)
+        if self._state_writes_by_minute and self._state_writes_by_minute[-1][0] == minute:
+            self._state_writes_by_minute[-1][1] += state_writes
+        else:
+            self._state_writes_by_minute.append([minute, state_writes])
+
+    def get_state_writes_per_minute(self) -> list:
+        """
+        State writes of the latest minutes, oldest first and the current
+        minute last
+        """
+        minute = int(time.monotonic() // 60)
+        counts = dict(self._state_writes_by_minute)
+
+        return [
+            counts.get(item, 0)
+            for item in range(minute - self._state_writes_by_minute.maxlen + 1, minute + 1)
+        ]
 
     def update_all_lights(self):
         """
         Update all the lights state
         """
         _LOGGER.debug("update_all_lights: called!")
-        for entity in self.entities:
-            entity.update_state()
+        state_writes = 0
+
+        for entity in self.entities + self.group_entities:
+            if entity.update_state():
+                state_writes += 1
+
+        self.add_state_writes(state_writes)
+
+    def schedule_unit_updates(self, unit_unique_ids):
+        """
+        Mark units as dirty, an empty list marks all units as dirty.
+        Dirty units are flushed once per update window.
+        """
+        self.messages_received += 1
+
+        if unit_unique_ids:
+            self._dirty_units.update(unit_unique_ids)
+        else:
+            self._refresh_all = True
+
+        self.schedule_flush(self._update_window)
+
+    def schedule_flush(self, delay=0):
+        """
+        Flush dirty units in delay seconds, an earlier scheduled flush
+        is kept unless delay is 0
+        """
+        if self._flush_handle is not None:
+            if delay > 0:
+                # Flush already scheduled
+                return
+
+            self._flush_handle.cancel()
+
+        if delay > 0:
+            self._flush_handle = self._hass.loop.call_later(
+                delay, self.flush_unit_updates
+            )
+        else:
+            self._flush_handle = self._hass.loop.call_soon(self.flush_unit_updates)
+
+    def flush_unit_updates(self):
+        """
+        Write state once for every dirty unit, the time spent is counted
+        """
+        start_time = time.perf_counter()
+        updated = 0
+
+        try:
+            updated = self._flush_unit_updates()
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.flush_time_total += elapsed
+            self.flush_time_max = max(self.flush_time_max, elapsed)
+
+            if elapsed > self._slow_callback_threshold:
+                self.slow_callbacks += 1
+
+                _LOGGER.warning(
+                    "Updating %d Casambi entities blocked the event loop for %.3f seconds",
+                    updated,
+                    elapsed,
+                )
+
+    def _queue_entities(self, entities) -> None:
+        """
+        Queue entities for a state update, each one once
+        """
+        for entity in entities:
+            if entity not in self._pending_entity_set:
+                self._pending_entity_set.add(entity)
+                self._pending_entities.append(entity)
+
+    def _flush_unit_updates(self) -> int:
+        """
+        Update the entities of the dirty units for at most one slice
+        budget, the remaining ones are updated after yielding to the
+        event loop. Returns the number of entities updated.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        dirty_units = self._dirty_units
+        self._dirty_units = set()
+
+        if self._refresh_all:
+            self._refresh_all = False
+            self._queue_entities(self.entities + self.group_entities)
+        else:
+            for unit_unique_id in dirty_units:
+                self._queue_entities(self._entities_by_unit.get(unit_unique_id, ()))
+                self._queue_entities(
+                    self._group_entities_by_unit.get(unit_unique_id, ())
+                )
+
+        deadline = time.perf_counter() + self._slice_budget
+        pending = self._pending_entities
+        updated = 0
+        state_writes = 0
+
+        while pending:
+            entity = pending.popleft()
+            self._pending_entity_set.discard(entity)
+
+            if entity.update_state():
+                state_writes += 1
+            updated += 1
+
+            if pending and time.perf_counter() > deadline:
+                # Out of budget, continue on the next event loop iteration
+                self.flush_slices += 1
+                self._flush_handle = self._hass.loop.call_soon(self.flush_unit_updates)
+                break
+
+        self.add_state_writes(state_writes)
+
+        _LOGGER.debug(
+            "flush_unit_updates: %d entities updated, %d pending", updated, len(pending)
+        )
+
+        return updated
 
     def set_all_lights_offline(self):
         """
-        Set all lights to offline
+        Set all lights to offline, their state is written by the next flush
         """
         _LOGGER.debug("set_all_lights_offline: called!")
         for entity in self.entities:
             if isinstance(entity, CasambiLightEntity):
-                # Only CasambiLightEntity supports set_online,
-                # used when websocket goes down i.e. no Internet.
-                entity.set_online(False)
+                # Only lights are set offline, used when websocket goes
+                # down i.e. no Internet.
+                entity.unit.online = False
 
-        self.update_all_lights()
+        self._refresh_all = True
+        self.schedule_flush()
 
     def signalling_callback(self, signal, data):
         """
-        Signalling callback
+        Signalling callback, the time spent on the event loop is counted
+        """
+        start_time = time.perf_counter()
+
+        self.signals_received[signal] = self.signals_received.get(signal, 0) + 1
+
+        try:
+            self._handle_signal(signal, data)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.callback_time_total += elapsed
+            self.callback_time_max = max(self.callback_time_max, elapsed)
+
+            if elapsed > self._slow_callback_threshold:
+                self.slow_callbacks += 1
+
+                _LOGGER.warning(
+                    "Casambi %s signal with %d units blocked the event loop for %.3f seconds",
+                    signal,
+                    len(self.get_unit_unique_ids(data)),
+                    elapsed,
+                )
+
+    def _handle_signal(self, signal, data):
+        """
+        Handle a signal of the aiocasambi controller
         """
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            # Only unit ids, the payload holds whole units
+            _LOGGER.debug(
+                "signalling_callback called signal: %s units: %s",
+                signal,
+                self.get_unit_unique_ids(data) or data,
+            )
 
-        _LOGGER.debug(f"signalling_callback called signal: {signal} data: {data}")
+        if self.traffic_recorder is not None:
+            self.traffic_recorder.record(signal, data)
 
         if signal == SIGNAL_DATA:
-            for entity in self.entities:
-                entity.process_update(data)
+            self._last_message_time = time.monotonic()
+
+            if self.latency_tracker.has_pending and isinstance(data, dict):
+                self.latency_tracker.acknowledge(data.values())
+
+            # Payload that does not name any unit refreshes everything
+            self.schedule_unit_updates(self.get_unit_unique_ids(data))
         elif signal == SIGNAL_CONNECTION_STATE and (data == STATE_STOPPED):
             _LOGGER.debug("signalling_callback websocket STATE_STOPPED")
 
             # Set all units to offline
             self.set_all_lights_offline()
 
-            _LOGGER.debug("signalling_callback: creating reconnection")
-            self._hass.loop.async_create_task(self.async_reconnect())
+            # Poll fast while the websocket is down
+            self.update_poll_interval(refresh=True)
+
+            _LOGGER.debug("signalling_callback: starting reconnection")
+            self.reconnect_supervisor.start()
         elif signal == SIGNAL_CONNECTION_STATE and (data == STATE_DISCONNECTED):
             _LOGGER.debug("signalling_callback websocket STATE_DISCONNECTED")
 
             # Set all units to offline
             self.set_all_lights_offline()
 
-            _LOGGER.debug("signalling_callback: creating reconnection")
-            self._hass.loop.async_create_task(self.async_reconnect())
+            # Poll fast while the websocket is down
+            self.update_poll_interval(refresh=True)
+
+            _LOGGER.debug("signalling_callback: starting reconnection")
+            self.reconnect_supervisor.start()
+        elif signal == SIGNAL_CONNECTION_STATE and (data == STATE_RUNNING):
+            _LOGGER.debug("signalling_callback websocket STATE_RUNNING")
+
+            if self.websockets_running():
+                self.reconnect_supervisor.set_connected()
         elif signal == SIGNAL_UNIT_PULL_UPDATE:
             # Update units that is specified
-            for unit in data:
-                self.update_light_state(unit)
+            self.schedule_unit_updates(self.get_unit_unique_ids(data))
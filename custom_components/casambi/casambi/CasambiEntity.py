@@ -4,10 +4,13 @@ Support for Casambi lights.
 
 import logging
 
+from homeassistant.helpers import device_registry as dr
 from homeassistant.helpers.entity import DeviceInfo, Entity
 
 from ..const import DOMAIN
 
+from .CasambiUnitProfile import CasambiUnitProfile
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -25,7 +28,16 @@ class CasambiEntity(Entity):
         self._unit_unique_id = unit.unique_id
         self._attr_name = name
 
-        controller.entities.append(self)
+        # Number of state writes skipped because nothing changed
+        self.suppressed_writes = 0
+
+        # True while the state is restored from before the last restart
+        self._restored = False
+
+        self.profile = None
+        self.set_profile()
+
+        controller.add_entity(self)
 
         _LOGGER.debug("Casambi entity - init - end")
 
@@ -37,29 +49,61 @@ class CasambiEntity(Entity):
             name += f"_{self._attr_name}"
         return name.lower()
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return device information about this Casambi Key Light."""
+    def set_unit(self, unit) -> None:
+        """
+        Replace the unit, used when a cached unit is replaced by the live one
+        """
+        self.unit = unit
+        self.set_profile()
+
+    def set_profile(self) -> None:
+        """
+        Build capability profile and device information of the unit,
+        called at discovery and when firmware or fixture metadata changes
+        """
+        self.profile = CasambiUnitProfile.from_unit(
+            self.unit, self.controller.unit_profiles
+        )
 
-        device_info = DeviceInfo(
+        self._attr_device_info = DeviceInfo(
             identifiers={(DOMAIN, self.unit.unique_id)},
-            manufacturer=self.unit.oem,
+            manufacturer=self.profile.oem,
             name=self.unit.name,
-            model=self.unit.fixture_model,
-            sw_version=self.unit.firmware_version,
+            model=self.profile.fixture_model,
+            sw_version=self.profile.firmware_version,
             via_device=(DOMAIN, self.unit.network_id),
         )
 
-        _LOGGER.debug(f"device_info called returning: {device_info} unit: {self.unit}")
+        _LOGGER.debug("set_profile: %s for unit: %s", self.profile, self._unit_unique_id)
+
+    def update_profile(self) -> bool:
+        """
+        Rebuild the profile if firmware or fixture metadata of the unit
+        has changed, returns True if it was rebuilt
+        """
+        if not self.profile.is_stale(self.unit):
+            return False
+
+        self.set_profile()
 
-        return device_info
+        if self.device_entry is not None:
+            dr.async_get(self.hass).async_update_device(
+                self.device_entry.id,
+                manufacturer=self.profile.oem,
+                model=self.profile.fixture_model,
+                sw_version=self.profile.firmware_version,
+            )
+
+        return True
 
     @property
     def available(self) -> bool:
         """Return True if entity is available."""
         _available = self.unit.online
 
-        _LOGGER.debug(f"available is returning {_available} for unit={self.unit}")
+        _LOGGER.debug(
+            "available is returning %s for unit=%s", _available, self._unit_unique_id
+        )
 
         return _available
 
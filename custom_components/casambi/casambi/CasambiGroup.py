@@ -0,0 +1,53 @@
+"""
+Casambi group.
+"""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CasambiGroup:
+    """
+    Group of units in a Casambi network, discovered from the network state.
+
+    Commands for the group are sent as one controlGroup message, the
+    members apply them at the same time.
+    """
+
+    def __init__(self, controller, network_id: str, data: dict):
+        """Initialize group from its network state representation."""
+        self._controller = controller
+        self.network_id = network_id
+        self.group_id = data["id"]
+        self.unique_id = f"{network_id}-group-{self.group_id}"
+        self.name = data.get("name", f"Group {self.group_id}").strip()
+        self.unit_ids = []
+        self.units = []
+
+    def update(self, data: dict, units: list) -> None:
+        """
+        Update name and members from the network state
+        """
+        self.name = data.get("name", self.name).strip()
+        self.units = units
+        self.unit_ids = [unit.unique_id for unit in units]
+
+    async def set_unit_target_controls(self, *, target_controls) -> None:
+        """
+        Send target controls to all units of the group, same signature
+        as the unit method so group commands go through the command queue
+        """
+        message = {
+            "method": "controlGroup",
+            "id": int(self.group_id),
+            "targetControls": target_controls,
+        }
+
+        _LOGGER.debug("set_unit_target_controls: group: %s message: %s", self, message)
+
+        await self._controller.async_send_network_message(message, self.network_id)
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<Casambi group {self.name}: unique_id={self.unique_id}>"
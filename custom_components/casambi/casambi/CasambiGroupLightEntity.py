@@ -0,0 +1,136 @@
+"""
+Support for Casambi groups.
+"""
+
+import logging
+
+from typing import Any, Optional
+
+from homeassistant.components.light import LightEntity, ATTR_BRIGHTNESS, ColorMode
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CasambiGroupLightEntity(CoordinatorEntity, LightEntity):
+    """
+    Defines a Casambi group as a light.
+
+    The group is controlled with one network level command, its state is
+    derived from the member units.
+    """
+
+    _attr_color_mode = ColorMode.BRIGHTNESS
+    _attr_supported_color_modes = {ColorMode.BRIGHTNESS}
+
+    def __init__(self, coordinator, group, controller, hass):
+        """Initialize Casambi group light."""
+        CoordinatorEntity.__init__(self, coordinator)
+
+        self.group = group
+        self.controller = controller
+        self.hass = hass
+        self._attr_unique_id = group.unique_id.lower()
+
+        # Number of state writes skipped because nothing changed
+        self.suppressed_writes = 0
+        self._snapshot: Optional[tuple] = None
+
+        controller.add_group_entity(self)
+
+    @property
+    def name(self) -> str:
+        """Return the name of the group."""
+        return self.group.name
+
+    @property
+    def available(self) -> bool:
+        """
+        Return True if any member unit is online.
+        """
+        return any(unit.online for unit in self.group.units)
+
+    @property
+    def is_on(self) -> bool:
+        """
+        Return True if any member unit is on.
+        """
+        return any(unit.online and unit.value > 0 for unit in self.group.units)
+
+    @property
+    def brightness(self) -> Optional[int]:
+        """
+        Return the brightness of the brightest member between 1..255.
+        """
+        values = [unit.value for unit in self.group.units if unit.online]
+        if not values:
+            return None
+
+        return int(round(max(values) * 255))
+
+    @property
+    def extra_state_attributes(self):
+        """
+        Getter for extra state attributes
+        """
+        return {
+            "group_id": self.group.group_id,
+            "units": self.group.unit_ids,
+        }
+
+    def update_state(self) -> bool:
+        """
+        Update group state, returns True if a state write was emitted
+        """
+        if not self.enabled or self.entity_id is None:
+            return False
+
+        snapshot = (
+            self.available,
+            self.is_on,
+            self.brightness,
+            self.name,
+            tuple(self.group.unit_ids),
+        )
+        if snapshot == self._snapshot:
+            self.suppressed_writes += 1
+            return False
+
+        self._snapshot = snapshot
+        self.async_write_ha_state()
+
+        return True
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """
+        Handle updated data from the coordinator
+        """
+        self.update_state()
+
+    async def async_turn_off(self, **kwargs: Any) -> None:
+        """
+        Turn group off
+        """
+        _LOGGER.debug("async_turn_off %s", self)
+
+        await self.controller.async_queue_command(self.group, {"Dimmer": {"value": 0}})
+
+    async def async_turn_on(self, **kwargs: Any) -> None:
+        """
+        Turn group on
+        """
+        _LOGGER.debug("async_turn_on %s kwargs: %s", self, kwargs)
+
+        value = 1
+        if ATTR_BRIGHTNESS in kwargs:
+            value = round((kwargs[ATTR_BRIGHTNESS] / 255.0), 2)
+
+        await self.controller.async_queue_command(
+            self.group, {"Dimmer": {"value": value}}
+        )
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<Casambi group light {self.group.name}: group={self.group}>"
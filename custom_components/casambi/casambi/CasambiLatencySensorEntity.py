@@ -0,0 +1,97 @@
+"""
+Command latency sensors of a Casambi network.
+"""
+
+import logging
+
+from typing import Optional
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import UnitOfTime
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.entity import DeviceInfo, EntityCategory
+
+from ..const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CasambiLatencySensorEntity(SensorEntity):
+    """
+    Diagnostic sensor of the command to acknowledgement latency of a
+    Casambi network, a percentile in milliseconds or the number of
+    commands that timed out
+    """
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, network_id, controller, hass, percentile: Optional[int] = None):
+        """Initialize Casambi latency sensor."""
+        self.network_id = str(network_id)
+        self.controller = controller
+        self.hass = hass
+        self.percentile = percentile
+
+        if percentile is None:
+            self._attr_name = "Command timeouts"
+            self._attr_unique_id = f"{self.network_id}_command_timeouts"
+            self._attr_icon = "mdi:timer-alert-outline"
+            self._attr_state_class = SensorStateClass.TOTAL_INCREASING
+        else:
+            self._attr_name = f"Command latency p{percentile}"
+            self._attr_unique_id = f"{self.network_id}_command_latency_p{percentile}"
+            self._attr_device_class = SensorDeviceClass.DURATION
+            self._attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+            self._attr_state_class = SensorStateClass.MEASUREMENT
+
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, self.network_id)},
+            manufacturer="Casambi",
+            name=f"Casambi network {self.network_id}",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def native_value(self):
+        """
+        Latency percentile in milliseconds, or the number of timeouts
+        """
+        tracker = self.controller.latency_tracker
+
+        if self.percentile is None:
+            return tracker.get_timeouts(self.network_id)
+
+        return tracker.get_percentile(self.network_id, self.percentile)
+
+    @property
+    def extra_state_attributes(self):
+        """
+        Histogram of the acknowledged commands
+        """
+        if self.percentile is None:
+            return None
+
+        return {"histogram": self.controller.latency_tracker.get_histogram(self.network_id)}
+
+    async def async_added_to_hass(self) -> None:
+        """
+        Write state when the latency of the network changes, the tracker
+        reports the changes of a notify interval at once
+        """
+        await super().async_added_to_hass()
+
+        self.async_on_remove(
+            self.controller.latency_tracker.add_listener(
+                self.network_id, self.async_write_ha_state
+            )
+        )
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<Casambi latency sensor {self.name}: network={self.network_id}>"
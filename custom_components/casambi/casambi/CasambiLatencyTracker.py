@@ -0,0 +1,300 @@
+"""
+Command to acknowledgement latency of Casambi units.
+"""
+
+import logging
+import math
+import time
+
+from collections import deque
+
+_LOGGER = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets in milliseconds
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Difference between a target value and the reported value that confirms it
+VALUE_TOLERANCE = 0.02
+
+# Target controls and the unit attribute reporting them
+CONFIRMED_CONTROLS = {"Dimmer": "value", "Vertical": "distribution"}
+
+
+class CasambiLatencyTracker:
+    """
+    Measures the time from a light command until the unit reports the
+    target value.
+
+    A command is timestamped when the entity issues it and is confirmed
+    by the first SIGNAL_DATA update of the unit that carries the target
+    dimmer and vertical values, commands without any of them are
+    confirmed by the next update. Commands that are not confirmed
+    within timeout seconds are counted as timeouts. Latencies are kept
+    per network, as a histogram and as a window of the latest samples
+    for percentiles. Listeners of a network are called at most once per
+    notify_interval seconds.
+    """
+
+    def __init__(self, hass, timeout=10, max_samples=1000, notify_interval=10):
+        """Initialize the latency tracker."""
+        self._hass = hass
+        self._timeout = timeout
+        self._max_samples = max_samples
+        self._notify_interval = notify_interval
+
+        # unit unique id -> pending command
+        self._pending = {}
+        self._networks = {}
+        self._listeners = {}
+
+        # network id -> scheduled call of the listeners
+        self._notify_handles = {}
+
+    def _get_network(self, network_id) -> dict:
+        """
+        Latency counters of a network
+        """
+        network = self._networks.get(network_id)
+        if network is None:
+            network = self._networks[network_id] = {
+                "samples": deque(maxlen=self._max_samples),
+                # Samples in ascending order, None until a percentile is read
+                "sorted": None,
+                "buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "acknowledged": 0,
+                "timeouts": 0,
+                "superseded": 0,
+                "max": None,
+            }
+
+        return network
+
+    def add_listener(self, network_id, listener):
+        """
+        Register a listener called when the latency of a network changes,
+        returns a function that removes it
+        """
+        listeners = self._listeners.setdefault(str(network_id), [])
+        listeners.append(listener)
+
+        def remove_listener():
+            listeners.remove(listener)
+
+        return remove_listener
+
+    def _notify(self, network_id) -> None:
+        """
+        Schedule a call of the listeners of a network, changes within the
+        notify interval are reported by one call
+        """
+        if network_id in self._notify_handles:
+            return
+
+        self._notify_handles[network_id] = self._hass.loop.call_later(
+            self._notify_interval, self._call_listeners, network_id
+        )
+
+    def _call_listeners(self, network_id) -> None:
+        """
+        Call the listeners of a network
+        """
+        del self._notify_handles[network_id]
+
+        for listener in list(self._listeners.get(network_id, [])):
+            listener()
+
+    @staticmethod
+    def get_expected(target_controls: dict) -> dict:
+        """
+        Unit attributes and values that confirm the target controls
+        """
+        expected = {}
+        for control, attribute in CONFIRMED_CONTROLS.items():
+            if control in target_controls:
+                expected[attribute] = target_controls[control]["value"]
+
+        return expected
+
+    def start(self, unit, target_controls: dict) -> None:
+        """
+        Timestamp a command to unit, replaces a pending command of the unit
+        """
+        expected = self.get_expected(target_controls)
+
+        network_id = str(unit.network_id)
+
+        pending = self._pending.pop(unit.unique_id, None)
+        if pending is not None:
+            pending["handle"].cancel()
+            self._get_network(pending["network_id"])["superseded"] += 1
+
+        self._pending[unit.unique_id] = {
+            "network_id": network_id,
+            "start": time.monotonic(),
+            "expected": expected,
+            "handle": self._hass.loop.call_later(
+                self._timeout, self._handle_timeout, unit.unique_id
+            ),
+        }
+
+    def cancel(self, unit) -> None:
+        """
+        Forget the pending command of unit, used when it was not sent
+        """
+        pending = self._pending.pop(unit.unique_id, None)
+        if pending is not None:
+            pending["handle"].cancel()
+
+    def cancel_all(self) -> None:
+        """
+        Forget all pending commands and scheduled listener calls
+        """
+        for pending in self._pending.values():
+            pending["handle"].cancel()
+
+        for handle in self._notify_handles.values():
+            handle.cancel()
+
+        self._pending = {}
+        self._notify_handles = {}
+
+    @property
+    def has_pending(self) -> bool:
+        """
+        True while commands are waiting for their acknowledgement
+        """
+        return bool(self._pending)
+
+    @staticmethod
+    def is_confirmed(unit, expected: dict) -> bool:
+        """
+        True if unit reports the expected values
+        """
+        for attribute, value in expected.items():
+            reported = getattr(unit, attribute, None)
+            if reported is None or abs(reported - value) > VALUE_TOLERANCE:
+                return False
+
+        return True
+
+    def acknowledge(self, units) -> None:
+        """
+        Match units of a SIGNAL_DATA update to the pending commands
+        """
+        now = time.monotonic()
+
+        for unit in units:
+            pending = self._pending.get(getattr(unit, "unique_id", None))
+            if pending is None or not self.is_confirmed(unit, pending["expected"]):
+                continue
+
+            del self._pending[unit.unique_id]
+            pending["handle"].cancel()
+
+            self._add_sample(pending["network_id"], (now - pending["start"]) * 1000)
+
+    def _add_sample(self, network_id, latency: float) -> None:
+        """
+        Add a latency in milliseconds to the counters of a network
+        """
+        network = self._get_network(network_id)
+
+        index = 0
+        while index < len(LATENCY_BUCKETS) and latency > LATENCY_BUCKETS[index]:
+            index += 1
+
+        network["buckets"][index] += 1
+        network["samples"].append(latency)
+        network["sorted"] = None
+        network["acknowledged"] += 1
+        if network["max"] is None or latency > network["max"]:
+            network["max"] = latency
+
+        _LOGGER.debug("acknowledge: network %s latency %.1f ms", network_id, latency)
+
+        self._notify(network_id)
+
+    def _handle_timeout(self, unit_unique_id) -> None:
+        """
+        Count a command that was not confirmed in time
+        """
+        pending = self._pending.pop(unit_unique_id, None)
+        if pending is None:
+            return
+
+        self._get_network(pending["network_id"])["timeouts"] += 1
+
+        _LOGGER.debug(
+            "acknowledge: command to unit %s not confirmed within %s seconds",
+            unit_unique_id,
+            self._timeout,
+        )
+
+        self._notify(pending["network_id"])
+
+    def get_percentile(self, network_id, percentile: float):
+        """
+        Latency percentile in milliseconds of the latest samples of a
+        network, None without samples
+        """
+        network = self._networks.get(str(network_id))
+        if network is None or not network["samples"]:
+            return None
+
+        # Sorted once per change for all percentiles read
+        samples = network["sorted"]
+        if samples is None:
+            samples = network["sorted"] = sorted(network["samples"])
+
+        # Nearest rank
+        index = max(0, math.ceil(percentile / 100.0 * len(samples)) - 1)
+
+        return round(samples[index], 1)
+
+    def get_timeouts(self, network_id) -> int:
+        """
+        Number of commands to units of a network that timed out
+        """
+        network = self._networks.get(str(network_id))
+
+        return network["timeouts"] if network else 0
+
+    def get_histogram(self, network_id) -> dict:
+        """
+        Number of acknowledged commands per latency bucket, keyed by the
+        upper bound in milliseconds
+        """
+        network = self._networks.get(str(network_id))
+        buckets = network["buckets"] if network else [0] * (len(LATENCY_BUCKETS) + 1)
+
+        result = {}
+        for index, upper_bound in enumerate(LATENCY_BUCKETS):
+            result[f"le_{upper_bound}"] = buckets[index]
+        result["inf"] = buckets[-1]
+
+        return result
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Latency counters, percentiles and histogram per network
+        """
+        result = {}
+
+        for network_id, network in self._networks.items():
+            result[network_id] = {
+                "acknowledged": network["acknowledged"],
+                "timeouts": network["timeouts"],
+                "superseded": network["superseded"],
+                "p50": self.get_percentile(network_id, 50),
+                "p95": self.get_percentile(network_id, 95),
+                "p99": self.get_percentile(network_id, 99),
+                "max": round(network["max"], 1) if network["max"] else None,
+                "histogram": self.get_histogram(network_id),
+            }
+
+        return {
+            "timeout": self._timeout,
+            "pending": len(self._pending),
+            "networks": result,
+        }
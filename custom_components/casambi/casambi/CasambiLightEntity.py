@@ -13,23 +13,26 @@ from homeassistant.components.light import (
     ATTR_RGB_COLOR,
     ATTR_RGBW_COLOR,
 )
-from homeassistant.components.light import ColorMode
 
 try:
     from homeassistant.components.light import ATTR_DISTRIBUTION
 except ImportError:
     ATTR_DISTRIBUTION = "distribution"
 
+from homeassistant.const import STATE_ON, STATE_OFF
+from homeassistant.core import callback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from ..const import ATTR_SERV_BRIGHTNESS, ATTR_SERV_DISTRIBUTION
 
 from .CasambiEntity import CasambiEntity
+from .CasambiLatencyTracker import CasambiLatencyTracker
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class CasambiLightEntity(CoordinatorEntity, LightEntity, CasambiEntity):
+class CasambiLightEntity(CoordinatorEntity, RestoreEntity, LightEntity, CasambiEntity):
     """Defines a Casambi Key Light."""
 
     def __init__(self, coordinator, unit, controller, hass):
@@ -43,6 +46,32 @@ class CasambiLightEntity(CoordinatorEntity, LightEntity, CasambiEntity):
         self._state: Optional[bool] = None
         self._temperature: Optional[int] = None
 
+        # Last published attributes, used to suppress no-op state writes
+        self._snapshot: Optional[tuple] = None
+
+        # Commanded attributes published before the unit confirms them,
+        # see set_optimistic
+        self._optimistic: Optional[dict] = None
+        self._optimistic_expected: dict = {}
+        self._optimistic_sent = False
+        self._optimistic_handle = None
+
+        # Initial state from the already fetched unit data
+        self._refresh_state()
+
+    def set_profile(self) -> None:
+        """
+        Serve color modes and color temperature range from the profile
+        """
+        super().set_profile()
+
+        self._attr_color_mode = self.profile.color_mode
+        self._attr_supported_color_modes = self.profile.supported_color_modes
+
+        if self.profile.supports_color_temperature:
+            self._attr_min_mireds = self.profile.min_mireds
+            self._attr_max_mireds = self.profile.max_mireds
+
     @property
     def entity_registry_enabled_default(self) -> bool:
         """Whether or not the entity is enabled by default."""
@@ -55,7 +84,13 @@ class CasambiLightEntity(CoordinatorEntity, LightEntity, CasambiEntity):
         """
         _available = self.unit.online
 
-        _LOGGER.debug(f"available is returning {_available} for unit={self.unit}")
+        if self._restored and not self.controller.is_started:
+            # Restored state is shown until the controller has started
+            _available = True
+
+        _LOGGER.debug(
+            "available is returning %s for unit=%s", _available, self._unit_unique_id
+        )
 
         return _available
 
@@ -64,125 +99,82 @@ class CasambiLightEntity(CoordinatorEntity, LightEntity, CasambiEntity):
         """
         Return the brightness of this light between 1..255.
         """
-        return self._brightness
+        return self._get_optimistic(ATTR_BRIGHTNESS, self._brightness)
 
     @property
     def distribution(self) -> Optional[int]:
         """
         Return the distribution of this light between 1..255.
         """
-        return self._distribution
-
-    @property
-    def min_mireds(self) -> int:
-        """
-        Return the coldest color_temp that this light supports.
-
-        M = 1000000 / T
-
-        25000 K, has a mired value of M = 40 mireds
-        1000000 / 25000 = 40
-        """
-        return self.unit.get_min_mired()
-
-    @property
-    def max_mireds(self) -> int:
-        """
-        Return the warmest color_temp that this light supports.
-
-        M = 1000000 / T
-
-        25000 K, has a mired value of M = 40 mireds
-        1000000 / 25000 = 40
-
-        {
-            'Dimmer': {
-                'type': 'Dimmer',
-                'value': 0.0
-                },
-            'CCT': {
-                'min': 2200,
-                'max': 6000,
-                'level': 0.4631578947368421,
-                'type': 'CCT',
-                'value': 3960.0
-                }
-        }
-        """
-        return self.unit.get_max_mired()
+        return self._get_optimistic(ATTR_DISTRIBUTION, self._distribution)
 
     @property
     def color_temp(self) -> int:
         """
         Return the CT color value in mireds.
         """
-        return self.unit.get_color_temp()
+        return self._get_optimistic(ATTR_COLOR_TEMP, self.unit.get_color_temp())
 
     @property
     def rgb_color(self):
         """
         Getter for rgb color
         """
-        return self.unit.get_rgb_color()
+        return self._get_optimistic(ATTR_RGB_COLOR, self.unit.get_rgb_color())
 
     @property
     def rgbw_color(self):
         """
         Getter for rgbe color
         """
-        return self.unit.get_rgbw_color()
+        return self._get_optimistic(ATTR_RGBW_COLOR, self.unit.get_rgbw_color())
 
     @property
-    def color_mode(self):
+    def is_on(self) -> bool:
         """
-        Set color mode for this entity.
+        Return the state of the light.
         """
-        if self.unit.supports_rgbw():
-            return ColorMode.RGBW
-        if self.unit.supports_rgb():
-            return ColorMode.RGB
-        if self.unit.supports_color_temperature():
-            return ColorMode.COLOR_TEMP
-        if self.unit.supports_brightness():
-            return ColorMode.BRIGHTNESS
-
-        return None
+        return bool(self._get_optimistic("state", self._state))
 
     @property
-    def supported_color_modes(self):
+    def extra_state_attributes(self):
         """
-        Flag supported color_modes (in an array format).
+        Getter for extra state attributes
         """
-        supports = []
+        return {
+            "distribution": self.distribution,
+            "restored": self._restored,
+        }
 
-        if self.unit.supports_brightness():
-            supports.append(ColorMode.BRIGHTNESS)
+    async def async_added_to_hass(self) -> None:
+        """
+        Restore last known state until fresh data arrives
+        """
+        await super().async_added_to_hass()
 
-        if self.unit.supports_color_temperature():
-            supports.append(ColorMode.COLOR_TEMP)
+        if self.unit.online:
+            # Fresh data is already available
+            return
 
-        if self.unit.supports_rgbw():
-            supports.append(ColorMode.RGBW)
-        elif self.unit.supports_rgb():
-            supports.append(ColorMode.RGB)
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state not in (STATE_ON, STATE_OFF):
+            return
 
-        return supports
+        self._state = last_state.state == STATE_ON
+        self._brightness = last_state.attributes.get(ATTR_BRIGHTNESS)
+        self._distribution = last_state.attributes.get(ATTR_DISTRIBUTION)
+        self._restored = True
+        self._snapshot = None
 
-    @property
-    def is_on(self) -> bool:
-        """
-        Return the state of the light.
-        """
-        return bool(self._state)
+        _LOGGER.debug("async_added_to_hass: restored state %s for %s", last_state, self)
 
-    @property
-    def extra_state_attributes(self):
+    async def async_will_remove_from_hass(self) -> None:
         """
-        Getter for extra state attributes
+        Drop a pending optimistic state
         """
-        return {
-            "distribution": self._distribution,
-        }
+        await super().async_will_remove_from_hass()
+
+        self._clear_optimistic()
 
     def set_online(self, online):
         """
@@ -190,128 +182,321 @@ class CasambiLightEntity(CoordinatorEntity, LightEntity, CasambiEntity):
         """
         self.unit.online = online
 
-        dbg_msg = "set_online: Setting online to "
-        dbg_msg += f'"{online}" for unit {self}'
-        _LOGGER.debug(dbg_msg)
+        _LOGGER.debug('set_online: Setting online to "%s" for unit %s', online, self)
+
+        self.update_state()
+
+    def update_state(self) -> bool:
+        """
+        Update units state, returns True if a state write was emitted
+        """
+        if not self.enabled or self.entity_id is None:
+            # Device needs to be enabled and added for us to write state
+            return False
+
+        self.update_profile()
+        self._reconcile_optimistic()
+
+        if not self._refresh_state():
+            self.suppressed_writes += 1
+
+            _LOGGER.debug(
+                "update_state: state unchanged for %s, suppressed writes: %d",
+                self,
+                self.suppressed_writes,
+            )
+
+            return False
+
+        _LOGGER.debug("update_state %s", self)
+        self.async_write_ha_state()
 
-        if self.enabled:
-            # Device needs to be enabled for us to schedule updates
-            self.async_schedule_update_ha_state(True)
+        return True
 
-    def update_state(self):
+    @callback
+    def _handle_coordinator_update(self) -> None:
         """
-        Update units state
+        Handle updated data from the coordinator, nothing to do as the
+        polled units are written by the controller before it returns
         """
-        if self.enabled:
-            # Device needs to be enabled for us to schedule updates
-            _LOGGER.debug(f"update_state {self}")
-            self.async_schedule_update_ha_state(True)
 
-    def process_update(self, data):
-        """Process callback message, update home assistant light state"""
-        _LOGGER.debug(f"process_update: self: {self} data: {data}")
+    def _get_snapshot(self) -> tuple:
+        """
+        Snapshot of the attributes published to Home Assistant
+        """
+        color_temp = None
+        rgb_color = None
+        rgbw_color = None
+
+        if self.profile.supports_color_temperature:
+            color_temp = self.color_temp
+        if self.profile.supports_rgbw:
+            rgbw_color = self.rgbw_color
+        elif self.profile.supports_rgb:
+            rgb_color = self.rgb_color
+
+        return (
+            self.is_on,
+            self.brightness,
+            self.distribution,
+            color_temp,
+            rgb_color,
+            rgbw_color,
+            self.unit.online,
+            self._restored,
+        )
+
+    def _refresh_state(self) -> bool:
+        """
+        Recompute state from the unit, returns True if the published
+        attributes changed since the last call
+        """
+        if not self.unit.online:
+            _LOGGER.debug("async_update: unit is not online: %s", self)
+        else:
+            self._restored = False
 
-        if self.enabled:
-            # Device needs to be enabled for us to schedule updates
-            self.async_schedule_update_ha_state(True)
+            if self.unit.value > 0:
+                self._state = True
+                self._brightness = int(round(self.unit.value * 255))
+                self._distribution = int(round(self.unit.distribution * 255))
+            else:
+                self._state = False
+
+        snapshot = self._get_snapshot()
+        if snapshot == self._snapshot:
+            return False
+
+        self._snapshot = snapshot
+
+        return True
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """
         Turn light off
         """
-        _LOGGER.debug(f"async_turn_off {self}")
+        _LOGGER.debug("async_turn_off %s", self)
 
-        await self.unit.turn_unit_off()
+        if not self.controller.is_started:
+            # Restored from cache, the live unit replaces it on start
+            await self.controller.async_wait_started()
+
+        target_controls = {"Dimmer": {"value": 0}}
+
+        self.controller.latency_tracker.start(self.unit, target_controls)
+        await self._async_send_command(target_controls)
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn on the light."""
-        _LOGGER.debug(f"async_turn_on {self} unit: {self.unit} kwargs: {kwargs}")
-        brightness = 255
-        distribution = 255
+        _LOGGER.debug("async_turn_on %s kwargs: %s", self, kwargs)
 
-        if ATTR_COLOR_TEMP in kwargs:
-            dbg_msg = "async_turn_on: ATTR_COLOR_TEMP:"
-            dbg_msg += f" {kwargs[ATTR_COLOR_TEMP]}"
-            _LOGGER.debug(dbg_msg)
+        if not self.controller.is_started:
+            # Restored from cache, the live unit replaces it on start
+            await self.controller.async_wait_started()
 
-            color_temp = kwargs[ATTR_COLOR_TEMP]
+        target_controls = self.get_target_controls(**kwargs)
 
-            dbg_msg = "async_turn_on:"
-            dbg_msg += f"setting unit color name={self.name}"
-            dbg_msg += f" color_temp={color_temp}"
-            _LOGGER.debug(dbg_msg)
+        _LOGGER.debug(
+            "async_turn_on: name=%s target_controls=%s", self.name, target_controls
+        )
 
-            await self.unit.set_unit_color_temperature(value=color_temp, source="mired")
+        self.controller.latency_tracker.start(self.unit, target_controls)
+        await self._async_send_command(target_controls, **kwargs)
 
+    async def _async_send_command(self, target_controls: dict, **kwargs: Any) -> None:
+        """
+        Queue target controls for the unit, in optimistic mode the
+        commanded state is published before the command is sent
+        """
+        if not self.controller.optimistic:
+            await self.controller.async_queue_command(self.unit, target_controls)
             return
 
-        if ATTR_RGBW_COLOR in kwargs:
-            (red, green, blue, white) = kwargs[ATTR_RGBW_COLOR]
+        optimistic = self.set_optimistic(target_controls, **kwargs)
+
+        try:
+            await self.controller.async_queue_command(self.unit, target_controls)
+        except Exception:
+            # Never sent, publish the state of the unit again
+            if self._optimistic is optimistic:
+                self._rollback_optimistic()
+            raise
 
-            dbg_msg = "async_turn_on:"
-            dbg_msg += f"setting unit color name={self.name}"
-            dbg_msg += f" rgbw=({red}, {green}, {blue}, {white})"
-            _LOGGER.debug(dbg_msg)
+        if self._optimistic is optimistic:
+            # The next update of the unit confirms or rolls back
+            self._optimistic_sent = True
 
-            await self.unit.set_unit_rgbw(
-                color_value=(red, green, blue, white),
+    def _get_optimistic(self, key: str, value):
+        """
+        Commanded value of an attribute while it is not confirmed,
+        otherwise value
+        """
+        if self._optimistic is not None and key in self._optimistic:
+            return self._optimistic[key]
+
+        return value
+
+    def set_optimistic(self, target_controls: dict, **kwargs: Any) -> dict:
+        """
+        Publish the state commanded by target controls right away, it is
+        merged with a command that is not confirmed yet. Returns the
+        commanded attributes.
+        """
+        optimistic = dict(self._optimistic or {})
+
+        if "Dimmer" in target_controls:
+            value = target_controls["Dimmer"]["value"]
+
+            optimistic["state"] = value > 0
+            if value > 0:
+                optimistic[ATTR_BRIGHTNESS] = int(round(value * 255))
+        if "Vertical" in target_controls:
+            optimistic[ATTR_DISTRIBUTION] = int(
+                round(target_controls["Vertical"]["value"] * 255)
             )
+        if "ColorTemperature" in target_controls:
+            kelvin = target_controls["ColorTemperature"]["value"]
+
+            optimistic[ATTR_COLOR_TEMP] = round(1000000 / kelvin)
+        for key in (ATTR_RGB_COLOR, ATTR_RGBW_COLOR):
+            if key in kwargs:
+                optimistic[key] = tuple(kwargs[key])
+
+        expected = dict(self._optimistic_expected)
+        expected.update(CasambiLatencyTracker.get_expected(target_controls))
 
+        self._clear_optimistic()
+        self._optimistic = optimistic
+        self._optimistic_expected = expected
+        self._optimistic_handle = self.hass.loop.call_later(
+            self.controller.optimistic_timeout, self._handle_optimistic_timeout
+        )
+        self.controller.optimistic_commands += 1
+
+        _LOGGER.debug("set_optimistic: %s for %s", optimistic, self)
+
+        self._write_snapshot()
+
+        return optimistic
+
+    def _clear_optimistic(self) -> None:
+        """
+        Forget the commanded attributes
+        """
+        if self._optimistic_handle is not None:
+            self._optimistic_handle.cancel()
+            self._optimistic_handle = None
+
+        self._optimistic = None
+        self._optimistic_expected = {}
+        self._optimistic_sent = False
+
+    def _reconcile_optimistic(self) -> None:
+        """
+        Confirm or roll back the commanded attributes on the first update
+        of the unit after the command was sent
+        """
+        if self._optimistic is None or not self._optimistic_sent:
             return
 
-        if ATTR_RGB_COLOR in kwargs:
-            (red, green, blue) = kwargs[ATTR_RGB_COLOR]
+        if self.unit.online and CasambiLatencyTracker.is_confirmed(
+            self.unit, self._optimistic_expected
+        ):
+            self.controller.optimistic_confirmed += 1
+            self._clear_optimistic()
+        else:
+            self._rollback_optimistic(write=False)
+
+    def _rollback_optimistic(self, write=True) -> None:
+        """
+        Drop the commanded attributes, the state of the unit is published
+        """
+        _LOGGER.debug("rollback_optimistic: %s not confirmed by %s", self._optimistic, self)
 
-            dbg_msg = "async_turn_on:"
-            dbg_msg += f"setting unit color name={self.name}"
-            dbg_msg += f" rgb=({red}, {green}, {blue})"
-            _LOGGER.debug(dbg_msg)
+        self.controller.optimistic_rolled_back += 1
+        self._clear_optimistic()
 
-            await self.unit.set_unit_rgb(
-                color_value=(red, green, blue), send_rgb_format=True
-            )
+        if write:
+            self._write_snapshot()
 
+    def _handle_optimistic_timeout(self) -> None:
+        """
+        Roll back commanded attributes that were not confirmed in time
+        """
+        self._optimistic_handle = None
+        self.controller.optimistic_timeouts += 1
+        self._rollback_optimistic()
+
+    def _write_snapshot(self) -> None:
+        """
+        Write state if the published attributes changed
+        """
+        if not self.enabled or self.entity_id is None:
             return
 
-        if ATTR_BRIGHTNESS in kwargs:
-            brightness = round((kwargs[ATTR_BRIGHTNESS] / 255.0), 2)
+        if not self._refresh_state():
+            return
 
-        if brightness == 255:
-            dbg_msg = "async_turn_on:"
-            dbg_msg += f"turning unit on name={self.name}"
-            _LOGGER.debug(dbg_msg)
+        self.async_write_ha_state()
+        self.controller.add_state_writes(1)
 
-            await self.unit.turn_unit_on()
-        else:
-            dbg_msg = "async_turn_on:"
-            dbg_msg += f"setting units brightness name={self.name}"
-            dbg_msg += f" brightness={brightness}"
-            _LOGGER.debug(dbg_msg)
+    def get_target_controls(self, **kwargs: Any) -> dict:
+        """
+        Build the target controls of one controlUnit message for the
+        requested brightness, distribution and color
+        """
+        target_controls = {}
+
+        if ATTR_COLOR_TEMP in kwargs:
+            kelvin = self._mired_to_kelvin(kwargs[ATTR_COLOR_TEMP])
+
+            target_controls["ColorTemperature"] = {"value": kelvin}
+            target_controls["Colorsource"] = {"source": "TW"}
+        elif ATTR_RGBW_COLOR in kwargs:
+            (red, green, blue, white) = kwargs[ATTR_RGBW_COLOR]
+
+            target_controls["RGB"] = {"rgb": f"rgb({red}, {green}, {blue})"}
+            target_controls["Colorsource"] = {"source": "RGB"}
+            target_controls["White"] = {"value": white / 255.0}
+        elif ATTR_RGB_COLOR in kwargs:
+            (red, green, blue) = kwargs[ATTR_RGB_COLOR]
 
-            await self.unit.set_unit_value(value=brightness)
+            target_controls["RGB"] = {"rgb": f"rgb({red}, {green}, {blue})"}
+            target_controls["Colorsource"] = {"source": "RGB"}
+
+        if ATTR_BRIGHTNESS in kwargs:
+            brightness = round((kwargs[ATTR_BRIGHTNESS] / 255.0), 2)
+
+            target_controls["Dimmer"] = {"value": brightness}
+        elif not target_controls or not self.is_on:
+            # Turn on, a color change keeps the brightness of a lit unit
+            target_controls["Dimmer"] = {"value": 1}
 
         if ATTR_DISTRIBUTION in kwargs:
             distribution = round((kwargs[ATTR_DISTRIBUTION] / 255.0), 2)
 
-            dbg_msg = "async_turn_on:"
-            dbg_msg += f"setting units distribution name={self.name}"
-            dbg_msg += f" distribution={distribution}"
-            _LOGGER.debug(dbg_msg)
+            target_controls["Vertical"] = {"value": distribution}
+
+        return target_controls
+
+    def _mired_to_kelvin(self, mired: int) -> int:
+        """
+        Convert color temperature to kelvin, rounded up to the nearest
+        50 kelvin like the Casambi app and limited to the supported range
+        """
+        kelvin = round(1000000 / mired)
+
+        if kelvin % 50 != 0:
+            kelvin = int(kelvin / 50) * 50 + 50
 
-            await self.unit.set_unit_distribution(distribution=distribution)
+        return min(
+            max(kelvin, self.profile.min_kelvin), self.profile.max_kelvin
+        )
 
     async def async_update(self) -> None:
         """Update Casambi entity."""
-        if not self.unit.online:
-            _LOGGER.debug(f"async_update: unit is not online: {self}")
-        else:
-            if self.unit.value > 0:
-                self._state = True
-                self._brightness = int(round(self.unit.value * 255))
-                self._distribution = int(round(self.unit.distribution * 255))
-            else:
-                self._state = False
-        _LOGGER.debug(f"async_update {self}")
+        self._refresh_state()
+        _LOGGER.debug("async_update %s", self)
 
     async def async_handle_entity_service_light_turn_on(self, **kwargs: Any) -> None:
         """Handle turn on of Casambi light when setup from UI integration."""
@@ -319,19 +504,25 @@ class CasambiLightEntity(CoordinatorEntity, LightEntity, CasambiEntity):
         _brightness = kwargs.get(ATTR_SERV_BRIGHTNESS)
         _distribution = kwargs.get(ATTR_SERV_DISTRIBUTION, None)
 
-        dbg_msg = f"async_handle_entity_service_light_turn_on: self: {self}, "
-        dbg_msg += f"kwargs: {kwargs}, brightness: {_brightness}, "
-        dbg_msg += f"distribution: {_distribution}"
-        _LOGGER.debug(dbg_msg)
+        _LOGGER.debug(
+            "async_handle_entity_service_light_turn_on: self: %s, kwargs: %s, "
+            "brightness: %s, distribution: %s",
+            self,
+            kwargs,
+            _brightness,
+            _distribution,
+        )
 
         params = {}
         params["brightness"] = _brightness
         if _distribution is not None:
             params["distribution"] = _distribution
 
-        dbg_msg = "async_handle_entity_service_light_turn_on: entity: "
-        dbg_msg += f"{self.entity_id}, setting params: {params}"
-        _LOGGER.debug(dbg_msg)
+        _LOGGER.debug(
+            "async_handle_entity_service_light_turn_on: entity: %s, setting params: %s",
+            self.entity_id,
+            params,
+        )
 
         await self.async_turn_on(**params)
 
@@ -0,0 +1,182 @@
+"""
+Reconnect supervisor for the Casambi cloud connection.
+"""
+
+import asyncio
+import logging
+import random
+import time
+
+from collections import deque
+
+import aiohttp
+
+from aiocasambi import AiocasambiException
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CasambiReconnectSupervisor:
+    """
+    Runs reconnect attempts one at a time until the connection is back.
+
+    Attempts are retried with exponential backoff and jitter, the delay
+    doubles from min_delay up to max_delay and a random part of it is
+    skipped so several installations do not retry in lockstep.
+    """
+
+    def __init__(
+        self,
+        hass,
+        async_reconnect,
+        is_connected,
+        min_delay=5,
+        max_delay=300,
+        max_history=20,
+    ):
+        """Initialize the reconnect supervisor."""
+        self._hass = hass
+        self._async_reconnect = async_reconnect
+        self._is_connected = is_connected
+        self._min_delay = min_delay
+        self._max_delay = max_delay
+
+        self._task = None
+        self._stopped = False
+        self._disconnected_at = None
+        self._disconnected_time = None
+
+        # Latest outages, oldest first
+        self.history = deque(maxlen=max_history)
+
+        # Attempts during the current outage
+        self.attempts = 0
+        self.attempts_total = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.time_to_reconnect = None
+
+    @property
+    def is_reconnecting(self) -> bool:
+        """
+        True while reconnect attempts are running
+        """
+        return self._task is not None
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Attempts, last error and time to reconnect
+        """
+        outage_time = None
+        if self._disconnected_at is not None:
+            outage_time = round(time.monotonic() - self._disconnected_at, 3)
+
+        return {
+            "reconnecting": self.is_reconnecting,
+            "attempts": self.attempts,
+            "attempts_total": self.attempts_total,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+            "outage_time": outage_time,
+            "time_to_reconnect": self.time_to_reconnect,
+            "history": list(self.history),
+        }
+
+    def get_delay(self) -> float:
+        """
+        Delay before the next attempt, exponential backoff with jitter
+        """
+        delay = min(self._max_delay, self._min_delay * 2 ** max(self.attempts - 1, 0))
+
+        return random.uniform(delay / 2, delay)
+
+    def start(self) -> None:
+        """
+        Start reconnecting, does nothing if an attempt is already running
+        """
+        if self._stopped or self._task is not None:
+            return
+
+        if self._disconnected_at is None:
+            self._disconnected_at = time.monotonic()
+            self._disconnected_time = time.time()
+
+        self._task = self._hass.async_create_background_task(
+            self._async_run(), "casambi_reconnect"
+        )
+
+    def set_connected(self) -> None:
+        """
+        Connection is back, stop reconnecting and record the outage time
+        """
+        if self._disconnected_at is not None:
+            self.time_to_reconnect = round(time.monotonic() - self._disconnected_at, 3)
+            self.reconnects += 1
+
+            self.history.append(
+                {
+                    "disconnected": round(self._disconnected_time, 3),
+                    "time_to_reconnect": self.time_to_reconnect,
+                    "attempts": self.attempts,
+                    "last_error": self.last_error,
+                }
+            )
+
+            _LOGGER.debug(
+                "set_connected: reconnected after %s seconds and %d attempts",
+                self.time_to_reconnect,
+                self.attempts,
+            )
+
+        self._disconnected_at = None
+        self.attempts = 0
+
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+            self._task = None
+
+    def stop(self) -> None:
+        """
+        Stop reconnecting for good, used when the config entry is unloaded
+        """
+        self._stopped = True
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _async_run(self) -> None:
+        """
+        Run reconnect attempts until connected or stopped
+        """
+        try:
+            while not self._stopped:
+                self.attempts += 1
+                self.attempts_total += 1
+
+                try:
+                    await self._async_reconnect()
+                except (
+                    AiocasambiException,
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                ) as err:
+                    self.last_error = f"{type(err).__name__}: {err}"
+                else:
+                    if self._is_connected():
+                        self.set_connected()
+                        return
+
+                    self.last_error = "websockets are not running"
+
+                delay = self.get_delay()
+
+                warn_msg = f"Could not reconnect to Casambi ({self.last_error}), "
+                warn_msg += f"attempt {self.attempts}, trying again in {delay:.0f} seconds"
+                _LOGGER.warning(warn_msg)
+
+                await asyncio.sleep(delay)
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
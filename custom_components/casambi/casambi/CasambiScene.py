@@ -0,0 +1,49 @@
+"""
+Casambi scene.
+"""
+
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CasambiScene:
+    """
+    Scene of a Casambi network, discovered from the network state.
+
+    The scene is activated with one controlScene message.
+    """
+
+    def __init__(self, controller, network_id: str, data: dict):
+        """Initialize scene from its network state representation."""
+        self._controller = controller
+        self.network_id = network_id
+        self.scene_id = data["id"]
+        self.unique_id = f"{network_id}-scene-{self.scene_id}"
+        self.name = data.get("name", f"Scene {self.scene_id}").strip()
+        self.unit_ids = []
+
+    def update(self, data: dict, units: list) -> None:
+        """
+        Update name and members from the network state
+        """
+        self.name = data.get("name", self.name).strip()
+        self.unit_ids = [unit.unique_id for unit in units]
+
+    async def async_activate(self, level: float = 1) -> None:
+        """
+        Activate scene, level between 0 and 1
+        """
+        message = {
+            "method": "controlScene",
+            "id": int(self.scene_id),
+            "level": level,
+        }
+
+        _LOGGER.debug("async_activate: scene: %s message: %s", self, message)
+
+        await self._controller.async_send_network_message(message, self.network_id)
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<Casambi scene {self.name}: unique_id={self.unique_id}>"
@@ -0,0 +1,49 @@
+"""
+Support for Casambi scenes.
+"""
+
+import logging
+
+from typing import Any
+
+from homeassistant.components.scene import Scene
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class CasambiSceneEntity(Scene):
+    """Defines a Casambi scene."""
+
+    def __init__(self, scene, controller, hass):
+        """Initialize Casambi scene."""
+        self.scene = scene
+        self.controller = controller
+        self.hass = hass
+        self._attr_unique_id = scene.unique_id.lower()
+
+    @property
+    def name(self) -> str:
+        """Return the name of the scene."""
+        return self.scene.name
+
+    @property
+    def extra_state_attributes(self):
+        """
+        Getter for extra state attributes
+        """
+        return {
+            "scene_id": self.scene.scene_id,
+            "units": self.scene.unit_ids,
+        }
+
+    async def async_activate(self, **kwargs: Any) -> None:
+        """
+        Activate the scene with one network level command
+        """
+        _LOGGER.debug("async_activate %s", self)
+
+        await self.scene.async_activate()
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<Casambi scene entity {self.scene.name}: scene={self.scene}>"
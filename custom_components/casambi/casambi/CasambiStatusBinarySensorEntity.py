@@ -3,13 +3,14 @@ import logging
 from homeassistant.components.binary_sensor import BinarySensorDeviceClass
 from homeassistant.const import STATE_OFF, STATE_ON
 from homeassistant.helpers.entity import EntityCategory
+from homeassistant.helpers.restore_state import RestoreEntity
 
 from .CasambiBinarySensorEntity import CasambiBinarySensorEntity
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class CasambiStatusBinarySensorEntity(CasambiBinarySensorEntity):
+class CasambiStatusBinarySensorEntity(RestoreEntity, CasambiBinarySensorEntity):
     def __init__(self, unit, controller, hass):
         _LOGGER.debug("Casambi status binary sensor - init - start")
 
@@ -17,6 +18,8 @@ class CasambiStatusBinarySensorEntity(CasambiBinarySensorEntity):
             self, unit, controller, hass, "Status", BinarySensorDeviceClass.CONNECTIVITY
         )
 
+        self._restored_state = None
+
         _LOGGER.debug("Casambi status binary sensor - init - end")
 
     @property
@@ -32,22 +35,46 @@ class CasambiStatusBinarySensorEntity(CasambiBinarySensorEntity):
     @property
     def state(self):
         """Getter for state"""
+        if self._restored:
+            return self._restored_state
+
         return STATE_ON if self.unit.online else STATE_OFF
 
-    def update_state(self):
-        """Update units state"""
+    @property
+    def extra_state_attributes(self):
+        """Getter for extra state attributes"""
+        return {
+            "restored": self._restored,
+        }
+
+    async def async_added_to_hass(self) -> None:
+        """Restore last known state until the controller has started"""
+        await super().async_added_to_hass()
+
+        if self.controller.is_started:
+            # Fresh data is already available
+            return
+
+        last_state = await self.async_get_last_state()
+        if last_state is None or last_state.state not in (STATE_ON, STATE_OFF):
+            return
+
+        self._restored_state = last_state.state
+        self._restored = True
+
+    def update_state(self) -> bool:
+        """Update units state, returns True if a state write was scheduled"""
+        if self.controller.is_started:
+            self._restored = False
+
         if self.enabled:
             # Device needs to be enabled for us to schedule updates
-            _LOGGER.debug(f"update_state {self}")
+            _LOGGER.debug("update_state %s", self)
             self.async_schedule_update_ha_state(True)
 
-    def process_update(self, data):
-        """Process callback message, update home assistant light state"""
-        _LOGGER.debug(f"process_update: self: {self} data: {data}")
-        if self.enabled:
-            if self._unit_unique_id in data:
-                # Device needs to be enabled for us to schedule updates
-                self.async_schedule_update_ha_state(True)
+            return True
+
+        return False
 
     def __repr__(self) -> str:
         """Return the representation."""
@@ -0,0 +1,63 @@
+"""
+Persistent cache of the Casambi network topology.
+"""
+
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from ..const import DOMAIN
+
+from .CasambiCachedUnit import CasambiCachedUnit
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+
+
+class CasambiTopologyStore:
+    """
+    Stores the last known units of a config entry, so entities can be
+    registered before the Casambi cloud session is up.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        """Initialize the topology store."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.topology")
+
+    async def async_load_units(self) -> list:
+        """
+        Load cached units, returns an empty list if there is no cache
+        """
+        data = await self._store.async_load()
+
+        if not data or "units" not in data:
+            return []
+
+        result = []
+        for unit_data in data["units"]:
+            try:
+                result.append(CasambiCachedUnit(unit_data))
+            except KeyError as err:
+                _LOGGER.warning(f"Ignoring invalid cached unit, missing key: {err}")
+
+        _LOGGER.debug("async_load_units: loaded %d cached units", len(result))
+
+        return result
+
+    async def async_save_units(self, units: list) -> None:
+        """
+        Save the topology of the given units
+        """
+        data = {"units": [CasambiCachedUnit.as_dict(unit) for unit in units]}
+
+        await self._store.async_save(data)
+
+        _LOGGER.debug("async_save_units: saved %d units", len(units))
+
+    async def async_remove(self) -> None:
+        """
+        Remove the cache
+        """
+        await self._store.async_remove()
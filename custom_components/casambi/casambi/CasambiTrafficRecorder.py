@@ -0,0 +1,281 @@
+"""
+Recorder of the signals reaching the Casambi controller.
+"""
+
+import glob
+import json
+import logging
+import os
+import time
+
+from homeassistant.core import HomeAssistant
+
+from .CasambiCachedUnit import CasambiCachedUnit
+
+_LOGGER = logging.getLogger(__name__)
+
+# Signal of the record that starts every file, holds the units
+SIGNAL_TOPOLOGY = "topology"
+
+# Buffered bytes that are written right away instead of on the timer
+FLUSH_BYTES = 65536
+
+# Records are dropped while this many bytes wait to be written
+MAX_BUFFER_BYTES = 4194304
+
+
+class CasambiTrafficRecorder:
+    """
+    Appends every (signal, data) pair passed to signalling_callback to a
+    json lines file, so real traffic can be replayed offline.
+
+    A record holds the wall clock time, the signal and the state of the
+    units in the payload. Records are buffered and written in an
+    executor every flush_interval seconds. The file is rotated when it
+    exceeds max_bytes and every file starts with the topology of the
+    network.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        path: str,
+        get_units,
+        get_unit,
+        max_bytes=10485760,
+        backup_count=3,
+        flush_interval=1.0,
+    ):
+        """Initialize the traffic recorder."""
+        self._hass = hass
+        self.path = path
+        self._get_units = get_units
+        self._get_unit = get_unit
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._flush_interval = flush_interval
+
+        self._buffer = []
+        self._buffer_size = 0
+        self._file_size = None
+        self._flush_handle = None
+        self._flush_task = None
+        self._stopped = False
+
+        self.records = 0
+        self.records_dropped = 0
+        self.bytes_written = 0
+        self.rotations = 0
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Counters of records written and dropped
+        """
+        return {
+            "path": self.path,
+            "records": self.records,
+            "records_dropped": self.records_dropped,
+            "bytes_written": self.bytes_written,
+            "rotations": self.rotations,
+        }
+
+    @staticmethod
+    def get_unit_state(unit) -> dict:
+        """
+        Compact state of a unit, enough to replay its entities
+        """
+        controls = getattr(unit, "controls", None) or {}
+
+        return {
+            "o": unit.online,
+            "v": unit.value,
+            "d": unit.distribution,
+            "c": list(controls.values()),
+        }
+
+    def get_payload(self, data):
+        """
+        Serializable payload of a signal, units are stored by unique id
+        with their state at the time of the signal
+        """
+        if isinstance(data, dict):
+            units = {}
+            for key, unit in data.items():
+                unique_id = getattr(unit, "unique_id", key)
+                units[unique_id] = self.get_unit_state(unit)
+
+            return {"u": units}
+
+        if isinstance(data, (list, tuple, set)):
+            units = {}
+            for unique_id in data:
+                unit = self._get_unit(unique_id)
+                units[unique_id] = self.get_unit_state(unit) if unit else None
+
+            return {"u": units}
+
+        return data
+
+    def record(self, signal, data) -> None:
+        """
+        Record a signal, called from signalling_callback
+        """
+        if self._stopped:
+            return
+
+        try:
+            line = json.dumps(
+                {
+                    "t": round(time.time(), 4),
+                    "s": signal,
+                    "d": self.get_payload(data),
+                },
+                separators=(",", ":"),
+                default=str,
+            )
+        except (TypeError, ValueError) as err:
+            _LOGGER.debug("record: failed to serialize %s: %s", signal, err)
+            self.records_dropped += 1
+            return
+
+        if self._buffer_size > MAX_BUFFER_BYTES:
+            # Writer can not keep up, do not grow without bound
+            self.records_dropped += 1
+            return
+
+        self._buffer.append(line)
+        self._buffer_size += len(line) + 1
+        self.records += 1
+
+        if self._flush_task is not None:
+            # Picked up by the running flush
+            return
+
+        if self._buffer_size > FLUSH_BYTES:
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = self._hass.loop.call_later(
+                self._flush_interval, self._start_flush
+            )
+
+    def _start_flush(self) -> None:
+        """
+        Start writing the buffered records in the background
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        self._flush_task = self._hass.async_create_background_task(
+            self.async_flush(), "casambi_traffic_recorder"
+        )
+
+    def _get_topology(self) -> str:
+        """
+        Topology record that starts a file
+        """
+        units = [CasambiCachedUnit.as_dict(unit) for unit in self._get_units()]
+
+        return json.dumps(
+            {"t": round(time.time(), 4), "s": SIGNAL_TOPOLOGY, "d": units},
+            separators=(",", ":"),
+            default=str,
+        )
+
+    async def async_flush(self) -> None:
+        """
+        Write the buffered records, rotates the file when it is full
+        """
+        try:
+            while self._buffer:
+                lines = self._buffer
+                self._buffer = []
+                self._buffer_size = 0
+
+                if self._file_size is None:
+                    self._file_size = await self._hass.async_add_executor_job(
+                        self._get_file_size
+                    )
+
+                text = "\n".join(lines) + "\n"
+
+                rotate = self._file_size > 0 and (
+                    self._file_size + len(text) > self._max_bytes
+                )
+                if rotate or self._file_size == 0:
+                    text = self._get_topology() + "\n" + text
+
+                await self._hass.async_add_executor_job(self._write, text, rotate)
+
+                if rotate:
+                    self._file_size = 0
+                    self.rotations += 1
+
+                self._file_size += len(text)
+                self.bytes_written += len(text)
+        except OSError as err:
+            _LOGGER.warning("Failed to write Casambi traffic to %s: %s", self.path, err)
+        finally:
+            self._flush_task = None
+
+    def _get_file_size(self) -> int:
+        """
+        Size of the current file, runs in an executor
+        """
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _write(self, text: str, rotate: bool) -> None:
+        """
+        Append text to the file, rotating it first, runs in an executor
+        """
+        if rotate:
+            for index in range(self._backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+
+            if self._backup_count > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+
+        with open(self.path, "a", encoding="utf-8") as traffic_file:
+            traffic_file.write(text)
+
+    @staticmethod
+    def remove_files(path: str) -> int:
+        """
+        Remove a traffic file and its rotated backups, runs in an executor,
+        returns the number of files removed
+        """
+        removed = 0
+        for file_path in [path] + glob.glob(f"{glob.escape(path)}.*"):
+            if file_path != path and not file_path[len(path) + 1:].isdigit():
+                continue
+
+            try:
+                os.remove(file_path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+    async def async_stop(self) -> None:
+        """
+        Stop recording and write what is buffered
+        """
+        self._stopped = True
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if self._flush_task is not None:
+            await self._flush_task
+
+        await self.async_flush()
@@ -0,0 +1,114 @@
+"""
+Capability profile of Casambi units.
+"""
+
+from typing import NamedTuple, Optional
+
+from homeassistant.components.light import ColorMode
+
+
+class CasambiUnitProfile(NamedTuple):
+    """
+    Immutable capabilities and fixture metadata of a unit.
+
+    Built once from the fixture data of a unit and shared by all units
+    of the same fixture model of a controller, entities serve their capabilities from it
+    instead of asking the unit on every state write.
+    """
+
+    oem: Optional[str]
+    fixture_model: Optional[str]
+    fixture_id: Optional[int]
+    firmware_version: Optional[str]
+    supports_brightness: bool
+    supports_distribution: bool
+    supports_color_temperature: bool
+    supports_rgb: bool
+    supports_rgbw: bool
+    min_mireds: Optional[int]
+    max_mireds: Optional[int]
+    min_kelvin: Optional[int]
+    max_kelvin: Optional[int]
+
+    @classmethod
+    def from_unit(cls, unit, profiles: dict) -> "CasambiUnitProfile":
+        """
+        Profile of unit, the existing profile in profiles is returned for
+        units of an already known fixture
+        """
+        supports_color_temperature = unit.supports_color_temperature()
+
+        min_mireds = None
+        max_mireds = None
+        min_kelvin = None
+        max_kelvin = None
+        if supports_color_temperature:
+            min_mireds = unit.get_min_mired()
+            max_mireds = unit.get_max_mired()
+            (min_kelvin, max_kelvin, _) = unit.get_supported_color_temperature()
+
+        profile = cls(
+            oem=unit.oem,
+            fixture_model=unit.fixture_model,
+            fixture_id=unit.fixture_id,
+            firmware_version=unit.firmware_version,
+            supports_brightness=unit.supports_brightness(),
+            supports_distribution=unit.supports_distribution(),
+            supports_color_temperature=supports_color_temperature,
+            supports_rgb=unit.supports_rgb(),
+            supports_rgbw=unit.supports_rgbw(),
+            min_mireds=min_mireds,
+            max_mireds=max_mireds,
+            min_kelvin=min_kelvin,
+            max_kelvin=max_kelvin,
+        )
+
+        return profiles.setdefault(profile, profile)
+
+    def is_stale(self, unit) -> bool:
+        """
+        True if the firmware or fixture metadata of unit has changed
+        since the profile was built
+        """
+        return (
+            unit.firmware_version != self.firmware_version
+            or unit.fixture_id != self.fixture_id
+            or unit.fixture_model != self.fixture_model
+            or unit.oem != self.oem
+        )
+
+    @property
+    def color_mode(self) -> Optional[ColorMode]:
+        """
+        Color mode of the unit
+        """
+        if self.supports_rgbw:
+            return ColorMode.RGBW
+        if self.supports_rgb:
+            return ColorMode.RGB
+        if self.supports_color_temperature:
+            return ColorMode.COLOR_TEMP
+        if self.supports_brightness:
+            return ColorMode.BRIGHTNESS
+
+        return None
+
+    @property
+    def supported_color_modes(self) -> set:
+        """
+        Supported color modes of the unit
+        """
+        supports = set()
+
+        if self.supports_brightness:
+            supports.add(ColorMode.BRIGHTNESS)
+
+        if self.supports_color_temperature:
+            supports.add(ColorMode.COLOR_TEMP)
+
+        if self.supports_rgbw:
+            supports.add(ColorMode.RGBW)
+        elif self.supports_rgb:
+            supports.add(ColorMode.RGB)
+
+        return supports
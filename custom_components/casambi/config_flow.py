@@ -11,6 +11,7 @@ from homeassistant.const import (
     CONF_NAME,
     CONF_EMAIL,
     CONF_API_KEY,
+    CONF_SCAN_INTERVAL,
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 import voluptuous as vol
@@ -22,6 +23,18 @@ from .const import (
     DOMAIN,
     CONF_USER_PASSWORD,
     CONF_NETWORK_PASSWORD,
+    CONF_UPDATE_WINDOW,
+    CONF_SLOW_CALLBACK_THRESHOLD,
+    CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_ADAPTIVE_POLLING,
+    CONF_RECONCILE_INTERVAL,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_POLLING_TIME,
+    DEFAULT_UPDATE_WINDOW,
+    DEFAULT_SLOW_CALLBACK_THRESHOLD,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
+    DEFAULT_RECONCILE_INTERVAL,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -86,6 +99,12 @@ class CasambiConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     data: Optional[Dict[str, Any]] = {}
 
+    @staticmethod
+    @core.callback
+    def async_get_options_flow(config_entry: config_entries.ConfigEntry):
+        """Get the options flow for this handler."""
+        return CasambiOptionsFlowHandler(config_entry)
+
     async def async_step_user(self, user_input: Optional[Dict[str, Any]] = None):
         """Invoked when a user initiates a flow via the user interface."""
         errors: Dict[str, str] = {}
@@ -176,3 +195,77 @@ class CasambiConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             errors=errors,
             last_step=True,
         )
+
+
+class CasambiOptionsFlowHandler(config_entries.OptionsFlow):
+    """
+    Casambi options flow.
+    """
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._config_entry = config_entry
+
+    def _get_option(self, key: str, default: Any) -> Any:
+        """Current value of an option, falling back to entry data."""
+        if key in self._config_entry.options:
+            return self._config_entry.options[key]
+
+        return self._config_entry.data.get(key, default)
+
+    async def async_step_init(self, user_input: Optional[Dict[str, Any]] = None):
+        """Manage the options."""
+        if user_input is not None:
+            _LOGGER.debug(f"async_step_init user_input: {user_input}")
+            return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_SCAN_INTERVAL,
+                        default=self._get_option(
+                            CONF_SCAN_INTERVAL, DEFAULT_POLLING_TIME
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_ADAPTIVE_POLLING,
+                        default=self._get_option(CONF_ADAPTIVE_POLLING, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_RECONCILE_INTERVAL,
+                        default=self._get_option(
+                            CONF_RECONCILE_INTERVAL, DEFAULT_RECONCILE_INTERVAL
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_UPDATE_WINDOW,
+                        default=self._get_option(
+                            CONF_UPDATE_WINDOW, DEFAULT_UPDATE_WINDOW
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_SLOW_CALLBACK_THRESHOLD,
+                        default=self._get_option(
+                            CONF_SLOW_CALLBACK_THRESHOLD,
+                            DEFAULT_SLOW_CALLBACK_THRESHOLD,
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_OPTIMISTIC,
+                        default=self._get_option(CONF_OPTIMISTIC, False),
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_OPTIMISTIC_TIMEOUT,
+                        default=self._get_option(
+                            CONF_OPTIMISTIC_TIMEOUT, DEFAULT_OPTIMISTIC_TIMEOUT
+                        ),
+                    ): cv.positive_int,
+                    vol.Optional(
+                        CONF_RECORD_TRAFFIC,
+                        default=self._get_option(CONF_RECORD_TRAFFIC, False),
+                    ): cv.boolean,
+                }
+            ),
+        )
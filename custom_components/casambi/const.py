@@ -11,18 +11,55 @@ MAX_START_UP_TIME = 300
 
 DEFAULT_NETWORK_TIMEOUT = 300
 DEFAULT_POLLING_TIME = 60
+DEFAULT_POLL_TIMEOUT = 60
+DEFAULT_UPDATE_WINDOW = 0
+DEFAULT_RECONCILE_INTERVAL = 900
+DEFAULT_COMMAND_INTERVAL = 0.05
+DEFAULT_COMMAND_RATE = 20
+DEFAULT_COMMAND_BURST = 10
+DEFAULT_SERVICE_CONCURRENCY = 10
+DEFAULT_RECONNECT_MIN_DELAY = 5
+DEFAULT_RECONNECT_MAX_DELAY = 300
+DEFAULT_RECONNECT_TIMEOUT = 60
+DEFAULT_SESSION_REFRESH_AGE = 21600
+DEFAULT_SESSION_RETRY_DELAY = 60
+DEFAULT_RECORD_MAX_BYTES = 10485760
+DEFAULT_RECORD_BACKUP_COUNT = 3
+DEFAULT_ACK_TIMEOUT = 10
+DEFAULT_LATENCY_SAMPLES = 1000
+DEFAULT_LATENCY_NOTIFY_INTERVAL = 10
+DEFAULT_DIAGNOSTICS_HISTORY = 20
+DEFAULT_DIAGNOSTICS_MINUTES = 15
+DEFAULT_FLUSH_SLICE_BUDGET = 0.01
+DEFAULT_SLOW_CALLBACK_THRESHOLD = 100
+DEFAULT_OPTIMISTIC_TIMEOUT = 5
+DEFAULT_START_WAIT_TIMEOUT = 30
 
 CONF_USER_PASSWORD = "user_password"
 CONF_NETWORK_PASSWORD = "network_password"
 CONF_NETWORK_TIMEOUT = "network_timeout"
+CONF_UPDATE_WINDOW = "update_window"
+CONF_ADAPTIVE_POLLING = "adaptive_polling"
+CONF_RECONCILE_INTERVAL = "reconcile_interval"
+CONF_RECORD_TRAFFIC = "record_traffic"
+CONF_SLOW_CALLBACK_THRESHOLD = "slow_callback_threshold"
+CONF_OPTIMISTIC = "optimistic"
+CONF_OPTIMISTIC_TIMEOUT = "optimistic_timeout"
 CONF_CONTROLLER = "controller"
 CONF_COORDINATOR = "coordinator"
+CONF_LIFECYCLE = "lifecycle"
 
 SERVICE_CASAMBI_LIGHT_TURN_ON = "light_turn_on"
 ATTR_SERV_BRIGHTNESS = "brightness"
 ATTR_SERV_DISTRIBUTION = "distribution"
 ATTR_SERV_ENTITY_ID = "entity_id"
 
+SERVICE_CASAMBI_SET_UNITS = "set_units"
+ATTR_SERV_UNITS = "units"
+ATTR_SERV_UNIT_ID = "unit_id"
+ATTR_SERV_COLOR_TEMP = "color_temp"
+ATTR_SERV_RGB_COLOR = "rgb_color"
+
 CONFIG_SCHEMA = vol.Schema(
     {
         DOMAIN: vol.Schema(
@@ -37,6 +74,22 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Optional(
                     CONF_SCAN_INTERVAL, default=DEFAULT_POLLING_TIME
                 ): cv.positive_int,
+                vol.Optional(
+                    CONF_UPDATE_WINDOW, default=DEFAULT_UPDATE_WINDOW
+                ): cv.positive_int,
+                vol.Optional(CONF_ADAPTIVE_POLLING, default=False): cv.boolean,
+                vol.Optional(
+                    CONF_RECONCILE_INTERVAL, default=DEFAULT_RECONCILE_INTERVAL
+                ): cv.positive_int,
+                vol.Optional(CONF_RECORD_TRAFFIC, default=False): cv.boolean,
+                vol.Optional(
+                    CONF_SLOW_CALLBACK_THRESHOLD,
+                    default=DEFAULT_SLOW_CALLBACK_THRESHOLD,
+                ): cv.positive_int,
+                vol.Optional(CONF_OPTIMISTIC, default=False): cv.boolean,
+                vol.Optional(
+                    CONF_OPTIMISTIC_TIMEOUT, default=DEFAULT_OPTIMISTIC_TIMEOUT
+                ): cv.positive_int,
             }
         )
     },
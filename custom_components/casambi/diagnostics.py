@@ -0,0 +1,61 @@
+"""Diagnostics support for Casambi."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_API_KEY, CONF_EMAIL
+from homeassistant.core import HomeAssistant
+
+from .const import (
+    DOMAIN,
+    CONF_CONTROLLER,
+    CONF_LIFECYCLE,
+    CONF_USER_PASSWORD,
+    CONF_NETWORK_PASSWORD,
+)
+
+TO_REDACT = {
+    CONF_API_KEY,
+    CONF_EMAIL,
+    CONF_USER_PASSWORD,
+    CONF_NETWORK_PASSWORD,
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, config_entry: ConfigEntry
+) -> dict[str, Any]:
+    """
+    Return diagnostics for a config entry.
+    """
+    result = {
+        "config_entry": {
+            "data": async_redact_data(dict(config_entry.data), TO_REDACT),
+            "options": async_redact_data(dict(config_entry.options), TO_REDACT),
+        },
+    }
+
+    lifecycle = hass.data.get(DOMAIN, {}).get(CONF_LIFECYCLE, {})
+    result["lifecycle"] = lifecycle.get(config_entry.entry_id, {})
+
+    controller = hass.data.get(DOMAIN, {}).get(config_entry.entry_id, {}).get(
+        CONF_CONTROLLER
+    )
+    if controller:
+        result["websockets"] = controller.websockets_state
+        result["entities"] = controller.entity_counts
+        result["polling"] = controller.polling_state
+        result["statistics"] = controller.statistics
+        result["reconnect"] = controller.reconnect_supervisor.statistics
+        result["session"] = controller.session_state
+        result["latency"] = controller.latency_tracker.statistics
+        result["optimistic"] = controller.optimistic_state
+
+        if controller.traffic_recorder is not None:
+            result["traffic_recorder"] = controller.traffic_recorder.statistics
+
+    # Nothing from the controller should carry credentials, redact anyway
+    return async_redact_data(result, TO_REDACT)
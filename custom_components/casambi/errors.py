@@ -9,3 +9,7 @@ class CasambiException(HomeAssistantError):
 
 class ConfigurationError(CasambiException):
     """Invalid configuration"""
+
+
+class AuthenticationError(CasambiException):
+    """Credentials rejected by the Casambi cloud"""
@@ -4,7 +4,9 @@ For more details about this component, please refer to the documentation at
 https://home-assistant.io/components/@todo
 """
 
+import asyncio
 import logging
+import time
 import voluptuous as vol
 
 from homeassistant.components.light import ATTR_BRIGHTNESS
@@ -15,8 +17,15 @@ except ImportError:
     ATTR_DISTRIBUTION = "distribution"
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, ServiceCall, callback
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
 from homeassistant.helpers import entity_platform
+import homeassistant.helpers.config_validation as cv
 
 from .const import (
     DOMAIN,
@@ -26,15 +35,124 @@ from .const import (
     ATTR_SERV_BRIGHTNESS,
     ATTR_SERV_DISTRIBUTION,
     ATTR_SERV_ENTITY_ID,
+    SERVICE_CASAMBI_SET_UNITS,
+    ATTR_SERV_UNITS,
+    ATTR_SERV_UNIT_ID,
+    ATTR_SERV_COLOR_TEMP,
+    ATTR_SERV_RGB_COLOR,
 )
 
 from .casambi.CasambiLightEntity import CasambiLightEntity
-from .utils import async_create_controller, async_create_coordinator
+from .casambi.CasambiGroupLightEntity import CasambiGroupLightEntity
+from .utils import async_create_controller, async_create_coordinator, get_controllers
 
 _LOGGER = logging.getLogger(__name__)
 
 CASAMBI_CONTROLLER = None
 
+SET_UNITS_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_SERV_UNITS): vol.All(
+            cv.ensure_list,
+            [
+                vol.All(
+                    {
+                        vol.Optional(ATTR_SERV_ENTITY_ID): cv.entity_id,
+                        vol.Optional(ATTR_SERV_UNIT_ID): cv.string,
+                        vol.Optional(ATTR_SERV_BRIGHTNESS): vol.All(
+                            vol.Coerce(int), vol.Range(min=0, max=255)
+                        ),
+                        vol.Optional(ATTR_SERV_DISTRIBUTION): vol.All(
+                            vol.Coerce(int), vol.Range(min=0, max=255)
+                        ),
+                        vol.Optional(ATTR_SERV_COLOR_TEMP): vol.All(
+                            vol.Coerce(int), vol.Range(min=1)
+                        ),
+                        vol.Optional(ATTR_SERV_RGB_COLOR): vol.All(
+                            vol.Coerce(tuple),
+                            vol.ExactSequence((cv.byte, cv.byte, cv.byte)),
+                        ),
+                    },
+                    cv.has_at_least_one_key(ATTR_SERV_ENTITY_ID, ATTR_SERV_UNIT_ID),
+                )
+            ],
+        ),
+    }
+)
+
+
+@callback
+def async_register_set_units_service(hass: HomeAssistant) -> None:
+    """
+    Register the casambi.set_units service, applies per unit targets
+    in one call and responds with the result for each unit
+    """
+    if hass.services.has_service(DOMAIN, SERVICE_CASAMBI_SET_UNITS):
+        return
+
+    async def async_handle_set_units(call: ServiceCall) -> ServiceResponse:
+        """Handle casambi.set_units"""
+        _LOGGER.debug(f"ServiceCall {call.domain}.{call.service}, data: {call.data}")
+
+        results = await async_set_units(hass, call.data[ATTR_SERV_UNITS])
+
+        return {ATTR_SERV_UNITS: results}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_CASAMBI_SET_UNITS,
+        async_handle_set_units,
+        schema=SET_UNITS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+async def async_set_units(hass: HomeAssistant, targets: list) -> list:
+    """
+    Apply targets through the controller of the config entry that owns
+    each light, the controllers work concurrently. Results are returned
+    in the order of the targets.
+    """
+    controllers = get_controllers(hass)
+    if not controllers:
+        return [
+            {
+                ATTR_SERV_ENTITY_ID: target.get(ATTR_SERV_ENTITY_ID),
+                ATTR_SERV_UNIT_ID: target.get(ATTR_SERV_UNIT_ID),
+                "success": False,
+                "error": "Casambi is not set up",
+            }
+            for target in targets
+        ]
+
+    # Targets that no controller knows are reported by the first one
+    targets_by_controller = {}
+    for index, target in enumerate(targets):
+        owner = controllers[0]
+        for controller in controllers:
+            if controller.get_light_entity(
+                entity_id=target.get(ATTR_SERV_ENTITY_ID),
+                unit_unique_id=target.get(ATTR_SERV_UNIT_ID),
+            ):
+                owner = controller
+                break
+
+        targets_by_controller.setdefault(owner, []).append((index, target))
+
+    controller_results = await asyncio.gather(
+        *[
+            controller.async_set_units([target for _, target in items])
+            for controller, items in targets_by_controller.items()
+        ]
+    )
+
+    results = [None] * len(targets)
+    for items, item_results in zip(targets_by_controller.values(), controller_results):
+        for (index, _), result in zip(items, item_results):
+            results[index] = result
+
+    return results
+
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -44,16 +162,50 @@ async def async_setup_entry(
     """
     Setup sensors from a config entry created in the integrations UI.
     """
-    controller = hass.data[DOMAIN][CONF_CONTROLLER]
-    coordinator = hass.data[DOMAIN][CONF_COORDINATOR]
+    start_time = time.monotonic()
 
-    units = controller.aiocasambi_controller.get_units()
-    for unit in units:
-        if not unit.is_light():
-            continue
+    controller = hass.data[DOMAIN][config_entry.entry_id][CONF_CONTROLLER]
+    coordinator = hass.data[DOMAIN][config_entry.entry_id][CONF_COORDINATOR]
+
+    @callback
+    def async_add_units(units):
+        """Add light entities for units"""
+        casambi_lights = []
+
+        for unit in units:
+            if not unit.is_light():
+                continue
+
+            # Initial state is taken from the unit, no update before add
+            casambi_lights.append(
+                CasambiLightEntity(coordinator, unit, controller, hass)
+            )
+
+        if casambi_lights:
+            async_add_entities(casambi_lights)
+
+        return len(casambi_lights)
+
+    @callback
+    def async_add_groups(groups):
+        """Add light entities for Casambi groups"""
+        casambi_groups = [
+            CasambiGroupLightEntity(coordinator, group, controller, hass)
+            for group in groups
+        ]
+
+        if casambi_groups:
+            async_add_entities(casambi_groups)
 
-        casambi_light = CasambiLightEntity(coordinator, unit, controller, hass)
-        async_add_entities([casambi_light], True)
+        return len(casambi_groups)
+
+    # Units can be cached ones, units discovered later are added by listener
+    num_lights = async_add_units(controller.get_units())
+    controller.add_units_listener(async_add_units)
+
+    # Groups are known once the network state has been fetched
+    num_lights += async_add_groups(controller.get_groups())
+    controller.add_groups_listener(async_add_groups)
 
     # add entity service to turn on Casambi light
     platform = entity_platform.async_get_current_platform()
@@ -70,6 +222,12 @@ async def async_setup_entry(
         "async_handle_entity_service_light_turn_on",
     )
 
+    async_register_set_units_service(hass)
+
+    dbg_msg = f"Set up {num_lights} light entities for {config_entry.entry_id} "
+    dbg_msg += f"in {time.monotonic() - start_time:.3f} seconds"
+    _LOGGER.debug(dbg_msg)
+
     return True
 
 
@@ -87,32 +245,28 @@ async def async_setup_platform(
     warn_msg += "switch to configuration flow!"
     _LOGGER.warning(warn_msg)
 
-    if CONF_CONTROLLER in hass.data[DOMAIN]:
+    config = hass.data[DOMAIN][config_entry.entry_id]
+
+    if CONF_CONTROLLER in config:
         dbg_msg = "async_setup_platform CasambiController already created!"
         _LOGGER.debug(dbg_msg)
         return
 
-    config = hass.data[DOMAIN][config_entry.entry_id]
-    controller = hass.data[DOMAIN][CONF_CONTROLLER] = await async_create_controller(
-        hass, config
-    )
+    controller = config[CONF_CONTROLLER] = await async_create_controller(hass, config)
     if not controller:
         return False
-    coordinator = hass.data[DOMAIN][CONF_COORDINATOR] = await async_create_coordinator(
+    coordinator = config[CONF_COORDINATOR] = await async_create_coordinator(
         hass, config, controller
     )
 
-    units = controller.aiocasambi_controller.get_units()
-    for unit in units:
+    casambi_lights = []
+    for unit in controller.get_units():
         if not unit.is_light():
             continue
 
-        casambi_light = CasambiLightEntity(
-            coordinator, unit, controller.aiocasambi_controller, hass
-        )
-        async_add_entities([casambi_light], True)
+        casambi_lights.append(CasambiLightEntity(coordinator, unit, controller, hass))
 
-        controller.lights[casambi_light.unique_id] = casambi_light
+    async_add_entities(casambi_lights)
 
     @callback
     async def async_handle_platform_service_light_turn_on(call: ServiceCall) -> None:
@@ -147,23 +301,17 @@ async def async_setup_platform(
 
         _LOGGER.debug(dbg_msg)
 
-        _lights = hass.data[DOMAIN]["controller"].lights
+        targets = []
+        for _entity_id in cv.ensure_list(_entity_ids):
+            target = {}
+            target[ATTR_SERV_ENTITY_ID] = _entity_id
+            target["brightness"] = _brightness
+            if _distribution is not None:
+                target["distribution"] = _distribution
 
-        for _entity_id in _entity_ids:
-            for casambi_light in _lights.values():
-                if casambi_light.entity_id == _entity_id:
-                    # entity found
-                    params = {}
-                    params["brightness"] = _brightness
-                    if _distribution is not None:
-                        params["distribution"] = _distribution
+            targets.append(target)
 
-                    dbg_msg = "async_handle_platform_service_light_turn_on: "
-                    dbg_msg += f"entity found: {_entity_id}, "
-                    dbg_msg += f"setting params: {params}"
-                    _LOGGER.debug(dbg_msg)
-
-                    await casambi_light.async_turn_on(**params)
+        await controller.async_set_units(targets)
 
     # add platform service to turn on Casambi light
     hass.services.async_register(
@@ -172,4 +320,6 @@ async def async_setup_platform(
         async_handle_platform_service_light_turn_on,
     )
 
+    async_register_set_units_service(hass)
+
     return True
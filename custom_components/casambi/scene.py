@@ -0,0 +1,47 @@
+"""
+Scene implementation for Casambi
+"""
+
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .casambi.CasambiSceneEntity import CasambiSceneEntity
+from .const import (
+    DOMAIN,
+    CONF_CONTROLLER,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities
+):
+    """
+    Setting up scenes
+    """
+    _LOGGER.debug(f"Setting up scene entities. config_entry:{config_entry}")
+
+    controller = hass.data[DOMAIN][config_entry.entry_id][CONF_CONTROLLER]
+
+    @callback
+    def async_add_scenes(scenes):
+        """Add scene entities for Casambi scenes"""
+        casambi_scenes = [
+            CasambiSceneEntity(scene, controller, hass) for scene in scenes
+        ]
+
+        if casambi_scenes:
+            async_add_entities(casambi_scenes)
+
+        return len(casambi_scenes)
+
+    # Scenes are known once the network state has been fetched
+    num_scenes = async_add_scenes(controller.get_scenes())
+    controller.add_scenes_listener(async_add_scenes)
+
+    _LOGGER.debug(f"Set up {num_scenes} scene entities for {config_entry.entry_id}")
+
+    return True
@@ -0,0 +1,62 @@
+"""
+Sensor implementation for Casambi
+"""
+
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+
+from .casambi.CasambiLatencySensorEntity import CasambiLatencySensorEntity
+from .const import (
+    DOMAIN,
+    CONF_CONTROLLER,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Latency percentiles with a sensor per network
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities
+):
+    """
+    Setting up sensors
+    """
+    _LOGGER.debug(f"Setting up sensor entities. config_entry:{config_entry}")
+
+    controller = hass.data[DOMAIN][config_entry.entry_id][CONF_CONTROLLER]
+    network_ids = set()
+
+    @callback
+    def async_add_networks(units):
+        """Add latency sensor entities for networks of units"""
+        sensors = []
+
+        for unit in units:
+            network_id = str(unit.network_id)
+            if network_id in network_ids:
+                continue
+
+            network_ids.add(network_id)
+
+            for percentile in LATENCY_PERCENTILES:
+                sensors.append(
+                    CasambiLatencySensorEntity(network_id, controller, hass, percentile)
+                )
+            sensors.append(CasambiLatencySensorEntity(network_id, controller, hass))
+
+        if sensors:
+            async_add_entities(sensors)
+
+        return len(sensors)
+
+    # Networks of units discovered later are added by listener
+    num_sensors = async_add_networks(controller.get_units())
+    controller.add_units_listener(async_add_networks)
+
+    _LOGGER.debug(f"Set up {num_sensors} sensor entities for {config_entry.entry_id}")
+
+    return True
@@ -22,19 +22,43 @@ from homeassistant.const import (
 )
 
 from .casambi.CasambiController import CasambiController
-from .errors import ConfigurationError
+from .errors import AuthenticationError, ConfigurationError
 
 from .const import (
+    DOMAIN,
+    CONF_CONTROLLER,
     CONF_USER_PASSWORD,
     CONF_NETWORK_PASSWORD,
     CONF_NETWORK_TIMEOUT,
+    CONF_UPDATE_WINDOW,
+    CONF_SLOW_CALLBACK_THRESHOLD,
+    CONF_OPTIMISTIC,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_ADAPTIVE_POLLING,
+    CONF_RECONCILE_INTERVAL,
     DEFAULT_NETWORK_TIMEOUT,
     DEFAULT_POLLING_TIME,
+    DEFAULT_UPDATE_WINDOW,
+    DEFAULT_SLOW_CALLBACK_THRESHOLD,
+    DEFAULT_OPTIMISTIC_TIMEOUT,
+    DEFAULT_RECONCILE_INTERVAL,
 )
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def get_controllers(hass: HomeAssistant) -> list:
+    """
+    Controllers of all config entries that are set up
+    """
+    result = []
+    for data in hass.data.get(DOMAIN, {}).values():
+        if isinstance(data, dict) and data.get(CONF_CONTROLLER):
+            result.append(data[CONF_CONTROLLER])
+
+    return result
+
+
 async def async_create_ssl_context(hass: HomeAssistant):
     """
     Create SSL context in an executor to avoid blocking the event loop.
@@ -46,7 +70,24 @@ async def async_create_controller(
     hass: HomeAssistant, config: ConfigEntry
 ) -> CasambiController:
     """
-    Creates a Controller for the Casambi API.
+    Creates a Controller for the Casambi API and connects it.
+    """
+    controller = await async_build_controller(hass, config)
+
+    try:
+        if not await async_start_controller(controller):
+            return None
+    except AuthenticationError:
+        return None
+
+    return controller
+
+
+async def async_build_controller(
+    hass: HomeAssistant, config: ConfigEntry
+) -> CasambiController:
+    """
+    Creates a Controller for the Casambi API without connecting it.
     """
     api_key = config[CONF_API_KEY]
 
@@ -70,14 +111,36 @@ async def async_create_controller(
     if CONF_NETWORK_TIMEOUT in config:
         network_timeout = config[CONF_NETWORK_TIMEOUT]
 
+    # Window in milliseconds for coalescing websocket updates
+    update_window = DEFAULT_UPDATE_WINDOW
+    if CONF_UPDATE_WINDOW in config:
+        update_window = config[CONF_UPDATE_WINDOW]
+
+    # Milliseconds on the event loop before a callback is logged as slow
+    slow_callback_threshold = DEFAULT_SLOW_CALLBACK_THRESHOLD
+    if CONF_SLOW_CALLBACK_THRESHOLD in config:
+        slow_callback_threshold = config[CONF_SLOW_CALLBACK_THRESHOLD]
+
+    # Seconds until a light command that is published right away is
+    # rolled back if the unit has not confirmed it
+    optimistic_timeout = DEFAULT_OPTIMISTIC_TIMEOUT
+    if CONF_OPTIMISTIC_TIMEOUT in config:
+        optimistic_timeout = config[CONF_OPTIMISTIC_TIMEOUT]
+
     if not user_password and not network_password:
         err_msg = f"{CONF_USER_PASSWORD} or {CONF_NETWORK_PASSWORD} "
         err_msg += "must be set in config!"
         raise ConfigurationError(err_msg)
 
-    controller = CasambiController(hass)
+    controller = CasambiController(
+        hass,
+        update_window=update_window / 1000,
+        slow_callback_threshold=slow_callback_threshold / 1000,
+        optimistic=config.get(CONF_OPTIMISTIC, False),
+        optimistic_timeout=optimistic_timeout,
+    )
 
-    aiocasambi_controller = controller.aiocasambi_controller = aiocasambi.Controller(
+    controller.aiocasambi_controller = aiocasambi.Controller(
         email=email,
         user_password=user_password,
         network_password=network_password,
@@ -88,32 +151,45 @@ async def async_create_controller(
         network_timeout=network_timeout,
     )
 
+    return controller
+
+
+async def async_start_controller(controller: CasambiController) -> bool:
+    """
+    Connects the Controller to the Casambi API, raises AuthenticationError
+    if the credentials are rejected.
+    """
+    aiocasambi_controller = controller.aiocasambi_controller
+
     try:
         await aiocasambi_controller.create_session()
         await aiocasambi_controller.initialize()
         await aiocasambi_controller.start_websockets()
 
-    except aiocasambi.Unauthorized:
+    except aiocasambi.Unauthorized as err:
         _LOGGER.error("Connected to casambi but couldn't log in")
-        return None
+        raise AuthenticationError("Casambi credentials were rejected") from err
 
     except asyncio.TimeoutError:
         err_msg = "Error connecting to the Casambi, "
         err_msg += "caught asyncio.TimeoutError"
         _LOGGER.error(err_msg)
-        return None
+        return False
 
     except aiocasambi.AiocasambiException as err:
         err_msg = "Unknown Casambi communication error occurred! "
         err_msg += f"err: {err}"
         _LOGGER.error(err_msg)
-        return None
+        return False
 
     # Sleep so we get some websocket messages,
     # oem and other settings needs to be set
     # await asyncio.sleep(2)
 
-    return controller
+    controller.is_started = True
+    controller.set_session_created()
+
+    return True
 
 
 async def async_create_coordinator(
@@ -126,6 +202,14 @@ async def async_create_coordinator(
     if CONF_SCAN_INTERVAL in config:
         scan_interval = config[CONF_SCAN_INTERVAL]
 
+    adaptive_polling = False
+    if CONF_ADAPTIVE_POLLING in config:
+        adaptive_polling = config[CONF_ADAPTIVE_POLLING]
+
+    reconcile_interval = DEFAULT_RECONCILE_INTERVAL
+    if CONF_RECONCILE_INTERVAL in config:
+        reconcile_interval = config[CONF_RECONCILE_INTERVAL]
+
     _LOGGER.debug(
         f"Creating coordinator with scan_interval: {scan_interval} hass: {hass} config: {config} controller: {controller}"
     )
@@ -140,6 +224,13 @@ async def async_create_coordinator(
         update_interval=timedelta(seconds=scan_interval),
     )
 
+    controller.set_polling(
+        coordinator,
+        scan_interval=scan_interval,
+        reconcile_interval=reconcile_interval,
+        adaptive_polling=adaptive_polling,
+    )
+
     await coordinator.async_refresh()
 
     return coordinator
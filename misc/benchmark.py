@@ -0,0 +1,470 @@
+"""
+Benchmarks for the update fan-out and command paths of the integration.
+
+Every size runs in its own process: an in-process Home Assistant core
+with only the casambi integration loaded, connected to the local
+Casambi cloud simulator. Measured per size:
+
+- signalling_callback throughput for SIGNAL_DATA and SIGNAL_UNIT_PULL_UPDATE
+- update_all_lights cost, with changed and with unchanged state
+- cost of the light entity properties read on every state write
+- async_turn_on latency per attribute combination
+- peak memory (max resident set size of the process)
+
+Results are written as json so runs of different releases can be compared:
+
+    python misc/benchmark.py --units 10 100 1000 5000 --output benchmark.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from unittest.mock import patch
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(MISC_DIR)
+
+sys.path.insert(0, MISC_DIR)
+
+DEFAULT_SIZES = (10, 100, 1000, 5000)
+
+# Number of SIGNAL_DATA messages per size, one unit per message
+DATA_MESSAGES = 2000
+
+# Rounds of SIGNAL_UNIT_PULL_UPDATE and update_all_lights per size
+ROUNDS = 5
+
+# async_turn_on calls per attribute combination
+TURN_ON_SAMPLES = 20
+
+# Light entity properties Home Assistant reads on every state write
+ENTITY_PROPERTIES = (
+    "available",
+    "device_info",
+    "supported_color_modes",
+    "color_mode",
+    "min_mireds",
+    "max_mireds",
+    "extra_state_attributes",
+)
+
+TURN_ON_COMBINATIONS = {
+    "on": ({}, None),
+    "brightness": ({"brightness": 128}, None),
+    "brightness_distribution": ({"brightness": 128, "distribution": 64}, None),
+    "color_temp": ({"color_temp": 300}, "supports_color_temperature"),
+    "brightness_color_temp": (
+        {"brightness": 200, "color_temp": 250},
+        "supports_color_temperature",
+    ),
+    "rgb_color": ({"rgb_color": (255, 32, 0)}, "supports_rgb"),
+    "rgbw_color": ({"rgbw_color": (255, 32, 0, 128)}, "supports_rgbw"),
+}
+
+
+def get_max_rss() -> int:
+    """
+    Max resident set size of the process in kilobytes
+    """
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # Reported in bytes on macOS
+        max_rss //= 1024
+
+    return max_rss
+
+
+def get_percentile(values: list, percentile: float) -> float:
+    """
+    Percentile of values, nearest rank
+    """
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(percentile / 100 * len(values)) - 1))
+
+    return values[index]
+
+
+def set_dimmer(unit, value: float) -> None:
+    """
+    Change the dimmer level of an aiocasambi unit like a websocket event
+    """
+    unit.controls = {"type": "Dimmer", "value": value}
+
+
+async def async_setup(config_dir: str, num_units: int):
+    """
+    Start the simulator and a Home Assistant core with the casambi
+    integration set up against it
+    """
+    # pylint: disable=import-outside-toplevel
+    from homeassistant import bootstrap, config_entries, loader
+    from homeassistant.core import CoreState, HomeAssistant
+    from homeassistant.helpers import aiohttp_client
+    from simulator import CasambiSimulator, SimulatorSession
+
+    simulator = CasambiSimulator(num_units=num_units)
+    url = await simulator.async_start()
+
+    hass = HomeAssistant(config_dir)
+    loader.async_setup(hass)
+    hass.config.skip_pip = True
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    hass.set_state(CoreState.running)
+
+    from custom_components.casambi import utils
+
+    # Memory of the core and the integration modules, before any unit
+    core_rss = get_max_rss()
+
+    get_clientsession = aiohttp_client.async_get_clientsession
+
+    with patch.object(
+        utils.aiohttp_client,
+        "async_get_clientsession",
+        lambda hass: SimulatorSession(get_clientsession(hass), url),
+    ):
+        entry = config_entries.ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain="casambi",
+            title="Casambi benchmark",
+            data={
+                "api_key": simulator.api_key,
+                "email": simulator.email,
+                "user_password": simulator.password,
+                "network_timeout": 1,
+                # No polling while measuring
+                "scan_interval": 86400,
+            },
+            source="user",
+            options={},
+        )
+
+        start_time = time.perf_counter()
+        await hass.config_entries.async_add(entry)
+        await hass.async_block_till_done()
+        setup_time = time.perf_counter() - start_time
+
+    controller = hass.data["casambi"][entry.entry_id]["controller"]
+
+    return hass, simulator, controller, setup_time, core_rss
+
+
+async def async_bench_signal_data(hass, controller, lights: list) -> dict:
+    """
+    SIGNAL_DATA messages for one unit each, flushed one by one like
+    messages arriving on the websocket
+    """
+    # pylint: disable=import-outside-toplevel
+    from aiocasambi.consts import SIGNAL_DATA
+
+    state_writes = controller.state_writes
+
+    start_time = time.perf_counter()
+    for index in range(DATA_MESSAGES):
+        unit = lights[index % len(lights)]
+        set_dimmer(unit, 0.1 + (index % 9) / 10)
+
+        controller.signalling_callback(SIGNAL_DATA, {unit.unique_id: unit})
+
+        # Let the flush run
+        await asyncio.sleep(0)
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start_time
+
+    return {
+        "messages": DATA_MESSAGES,
+        "seconds": round(elapsed, 4),
+        "messages_per_second": round(DATA_MESSAGES / elapsed, 1),
+        "us_per_message": round(elapsed / DATA_MESSAGES * 1e6, 2),
+        "state_writes": controller.state_writes - state_writes,
+    }
+
+
+async def async_bench_pull_update(hass, controller, lights: list) -> dict:
+    """
+    SIGNAL_UNIT_PULL_UPDATE for all units with changed state, like a poll
+    """
+    # pylint: disable=import-outside-toplevel
+    from aiocasambi.consts import SIGNAL_UNIT_PULL_UPDATE
+
+    unique_ids = [unit.unique_id for unit in controller.get_units()]
+
+    times = []
+    for index in range(ROUNDS):
+        for unit in lights:
+            set_dimmer(unit, 0.2 + index / 10)
+
+        start_time = time.perf_counter()
+        controller.signalling_callback(SIGNAL_UNIT_PULL_UPDATE, unique_ids)
+        await asyncio.sleep(0)
+        times.append(time.perf_counter() - start_time)
+
+        await hass.async_block_till_done()
+
+    return {
+        "units": len(unique_ids),
+        "rounds": ROUNDS,
+        "ms_per_update_min": round(min(times) * 1e3, 3),
+        "ms_per_update_mean": round(statistics.mean(times) * 1e3, 3),
+        "us_per_unit": round(min(times) / len(unique_ids) * 1e6, 2),
+    }
+
+
+async def async_bench_update_all_lights(hass, controller, lights: list) -> dict:
+    """
+    update_all_lights with changed state and with unchanged state
+    """
+    changed = []
+    unchanged = []
+    for index in range(ROUNDS):
+        for unit in lights:
+            set_dimmer(unit, 0.3 + index / 10)
+
+        start_time = time.perf_counter()
+        controller.update_all_lights()
+        changed.append(time.perf_counter() - start_time)
+
+        await hass.async_block_till_done()
+
+        start_time = time.perf_counter()
+        controller.update_all_lights()
+        unchanged.append(time.perf_counter() - start_time)
+
+        await hass.async_block_till_done()
+
+    entities = len(controller.entities) + len(controller.group_entities)
+
+    return {
+        "entities": entities,
+        "rounds": ROUNDS,
+        "ms_changed_min": round(min(changed) * 1e3, 3),
+        "ms_changed_mean": round(statistics.mean(changed) * 1e3, 3),
+        "ms_unchanged_min": round(min(unchanged) * 1e3, 3),
+        "ms_unchanged_mean": round(statistics.mean(unchanged) * 1e3, 3),
+    }
+
+
+def bench_entity_properties(controller) -> dict:
+    """
+    Cost of one read of each light entity property, debug logging off
+    """
+    entities = [
+        entity for entity in controller.entities if hasattr(entity, "async_turn_on")
+    ]
+
+    # The mired range is only read for lights with a color temperature
+    color_temp_entities = [
+        entity for entity in entities if "color_temp" in entity.supported_color_modes
+    ]
+
+    result = {"entities": len(entities), "rounds": ROUNDS}
+    for name in ENTITY_PROPERTIES:
+        measured = entities
+        if name in ("min_mireds", "max_mireds"):
+            measured = color_temp_entities
+        if not measured:
+            continue
+
+        times = []
+        for _ in range(ROUNDS):
+            start_time = time.perf_counter()
+            for entity in measured:
+                getattr(entity, name)
+            times.append(time.perf_counter() - start_time)
+
+        result[f"us_{name}"] = round(min(times) / len(measured) * 1e6, 3)
+
+    return result
+
+
+async def async_bench_turn_on(hass, controller) -> dict:
+    """
+    async_turn_on latency until the command is sent, per attribute
+    combination, with an idle command queue
+    """
+    # pylint: disable=import-outside-toplevel
+    from custom_components.casambi.const import DEFAULT_COMMAND_INTERVAL
+
+    lights = [
+        entity
+        for entity in controller.entities
+        if hasattr(entity, "async_turn_on") and entity.unit.supports_brightness()
+    ]
+
+    result = {}
+    for name, (kwargs, capability) in TURN_ON_COMBINATIONS.items():
+        entities = [
+            entity
+            for entity in lights
+            if capability is None or getattr(entity.unit, capability)()
+        ]
+        if not entities:
+            continue
+
+        latencies = []
+        for index in range(TURN_ON_SAMPLES):
+            entity = entities[index % len(entities)]
+
+            start_time = time.perf_counter()
+            await entity.async_turn_on(**kwargs)
+            latencies.append(time.perf_counter() - start_time)
+
+            # Wait for the queue to become idle again
+            await asyncio.sleep(DEFAULT_COMMAND_INTERVAL * 2)
+
+        result[name] = {
+            "samples": len(latencies),
+            "ms_p50": round(get_percentile(latencies, 50) * 1e3, 3),
+            "ms_p95": round(get_percentile(latencies, 95) * 1e3, 3),
+            "ms_max": round(max(latencies) * 1e3, 3),
+        }
+
+    await hass.async_block_till_done()
+
+    return result
+
+
+async def async_run(num_units: int) -> dict:
+    """
+    Run all benchmarks for num_units units
+    """
+    config_dir = tempfile.mkdtemp(prefix="casambi_benchmark_")
+    os.symlink(
+        os.path.join(REPO_DIR, "custom_components"),
+        os.path.join(config_dir, "custom_components"),
+    )
+    sys.path.insert(0, config_dir)
+
+    try:
+        hass, simulator, controller, setup_time, core_rss = await async_setup(
+            config_dir, num_units
+        )
+        setup_rss = get_max_rss()
+
+        lights = [unit for unit in controller.get_units() if unit.supports_brightness()]
+
+        result = {
+            "units": num_units,
+            "lights": len(lights),
+            "entities": len(controller.entities) + len(controller.group_entities),
+            "setup_seconds": round(setup_time, 3),
+            "signal_data": await async_bench_signal_data(hass, controller, lights),
+            "signal_unit_pull_update": await async_bench_pull_update(
+                hass, controller, lights
+            ),
+            "update_all_lights": await async_bench_update_all_lights(
+                hass, controller, lights
+            ),
+            "entity_properties": bench_entity_properties(controller),
+            "turn_on": await async_bench_turn_on(hass, controller),
+        }
+
+        result["memory"] = {
+            "core_max_rss_kb": core_rss,
+            "setup_max_rss_kb": setup_rss,
+            "peak_max_rss_kb": get_max_rss(),
+            "kb_per_unit": round((get_max_rss() - core_rss) / num_units, 2),
+        }
+
+        for entry in hass.config_entries.async_entries("casambi"):
+            await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_stop()
+        await simulator.async_stop()
+    finally:
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+    return result
+
+
+def get_metadata() -> dict:
+    """
+    Versions the results were measured with
+    """
+    # pylint: disable=import-outside-toplevel
+    from importlib.metadata import PackageNotFoundError, version
+
+    with open(
+        os.path.join(REPO_DIR, "custom_components", "casambi", "manifest.json"),
+        encoding="utf-8",
+    ) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    metadata = {
+        "integration_version": manifest["version"],
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+    for package in ("homeassistant", "aiocasambi"):
+        try:
+            metadata[package] = version(package)
+        except PackageNotFoundError:
+            metadata[package] = None
+
+    try:
+        metadata["git_commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        metadata["git_commit"] = None
+
+    return metadata
+
+
+def main() -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Casambi integration benchmarks")
+    parser.add_argument("--units", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--run", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.run:
+        # One size, in a process of its own so peak memory is per size
+        print(json.dumps(asyncio.run(async_run(args.run))))
+        return
+
+    results = {"metadata": get_metadata(), "results": []}
+
+    for num_units in args.units:
+        print(f"Running benchmark for {num_units} units", file=sys.stderr)
+
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run", str(num_units)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        results["results"].append(result)
+
+        print(json.dumps(result, indent=2), file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2)
+
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
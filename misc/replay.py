@@ -0,0 +1,313 @@
+"""
+Replay traffic recorded with the record_traffic option.
+
+Feeds a capture back through a CasambiController and its light and
+status entities in an in-process Home Assistant core, at the recorded
+speed or faster, optionally under cProfile:
+
+    python misc/replay.py casambi_traffic_<entry_id>.jsonl --speed 10 --profile replay.prof
+
+Rotated files (.1, .2, ...) next to the capture are replayed first,
+oldest first.
+"""
+
+import argparse
+import asyncio
+import cProfile
+import importlib
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from datetime import timedelta
+
+from aiocasambi.consts import SIGNAL_DATA, SIGNAL_UNIT_PULL_UPDATE
+
+MISC_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(MISC_DIR)
+
+sys.path.insert(0, REPO_DIR)
+
+# Integration modules are found once the repository is on the path
+CasambiCachedUnit = importlib.import_module(
+    "custom_components.casambi.casambi.CasambiCachedUnit"
+).CasambiCachedUnit
+SIGNAL_TOPOLOGY = importlib.import_module(
+    "custom_components.casambi.casambi.CasambiTrafficRecorder"
+).SIGNAL_TOPOLOGY
+
+_LOGGER = logging.getLogger(__name__)
+
+RGB_REGEXP = re.compile(r"rgb\(\s*(?P<red>\d+),\s*(?P<green>\d+),\s*(?P<blue>\d+)\)")
+
+
+class ReplayUnit(CasambiCachedUnit):
+    """
+    Unit restored from the topology record of a capture, its state is
+    set from the recorded unit states
+    """
+
+    def __init__(self, data: dict):
+        """Initialize replay unit."""
+        super().__init__(data)
+        self.online = True
+        self.controls = {}
+
+    def set_state(self, state: dict) -> None:
+        """
+        Set the recorded state of the unit
+        """
+        self.online = state["o"]
+        self.value = state["v"]
+        self.distribution = state["d"]
+        self.controls = {
+            control["type"]: control for control in state["c"] if "type" in control
+        }
+
+    def get_color_temp(self):
+        """Color temperature in mireds"""
+        if "CCT" not in self.controls:
+            return None
+
+        return round(1000000 / self.controls["CCT"]["value"])
+
+    def get_rgb_color(self):
+        """Rgb color"""
+        match = RGB_REGEXP.match(self.controls.get("Color", {}).get("rgb", ""))
+        if not match:
+            return None
+
+        return (int(match["red"]), int(match["green"]), int(match["blue"]))
+
+    def get_rgbw_color(self):
+        """Rgbw color"""
+        rgb_color = self.get_rgb_color()
+        if rgb_color is None:
+            return None
+
+        white = self.controls.get("White", {}).get("value", 0)
+
+        return rgb_color + (int(round(white * 255)),)
+
+
+def get_capture_files(path: str) -> list:
+    """
+    Files of a capture, rotated files first, oldest first
+    """
+    result = []
+
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        result.insert(0, f"{path}.{index}")
+        index += 1
+
+    if os.path.exists(path):
+        result.append(path)
+
+    return result
+
+
+def read_records(path: str):
+    """
+    Records of a capture, in recorded order
+    """
+    for capture_file in get_capture_files(path):
+        with open(capture_file, encoding="utf-8") as records_file:
+            for line in records_file:
+                line = line.strip()
+                if not line:
+                    continue
+
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    _LOGGER.warning("Skipping invalid record in %s", capture_file)
+
+
+async def async_setup(config_dir: str, topology: list):
+    """
+    Home Assistant core with a controller and entities for the units
+    of the topology record
+    """
+    # pylint: disable=import-outside-toplevel
+    from homeassistant import bootstrap, config_entries, loader
+    from homeassistant.core import CoreState, HomeAssistant
+    from homeassistant.helpers.entity_platform import EntityPlatform
+    from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+    from custom_components.casambi.casambi.CasambiController import (
+        CasambiController,
+    )
+    from custom_components.casambi.casambi.CasambiLightEntity import (
+        CasambiLightEntity,
+    )
+    from custom_components.casambi.casambi.CasambiStatusBinarySensorEntity import (
+        CasambiStatusBinarySensorEntity,
+    )
+
+    hass = HomeAssistant(config_dir)
+    loader.async_setup(hass)
+    hass.config.skip_pip = True
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    hass.set_state(CoreState.running)
+
+    units = {}
+    for unit_data in topology:
+        unit = ReplayUnit(unit_data)
+        units[unit.unique_id] = unit
+
+    controller = CasambiController(hass)
+    controller.set_cached_units(list(units.values()))
+    controller.is_started = True
+
+    coordinator = DataUpdateCoordinator(hass, _LOGGER, name="replay")
+    controller.coordinator = coordinator
+
+    lights = [
+        CasambiLightEntity(coordinator, unit, controller, hass)
+        for unit in units.values()
+        if unit.is_light()
+    ]
+    binary_sensors = [
+        CasambiStatusBinarySensorEntity(unit, controller, hass)
+        for unit in units.values()
+    ]
+
+    for domain, entities in (("light", lights), ("binary_sensor", binary_sensors)):
+        platform = EntityPlatform(
+            hass=hass,
+            logger=_LOGGER,
+            domain=domain,
+            platform_name="casambi",
+            platform=None,
+            scan_interval=timedelta(seconds=60),
+            entity_namespace=None,
+        )
+        await platform.async_add_entities(entities)
+
+    await hass.async_block_till_done()
+
+    return hass, controller, units
+
+
+async def async_replay(records: list, controller, units: dict, speed: float) -> dict:
+    """
+    Feed records to the controller, speed 0 replays as fast as possible
+    """
+    signals = {}
+    skipped = 0
+    max_lag = 0.0
+
+    first_time = records[0]["t"] if records else 0
+    start_time = time.monotonic()
+
+    for record in records:
+        signal = record["s"]
+
+        if speed > 0:
+            due = start_time + (record["t"] - first_time) / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+
+        if signal not in (SIGNAL_DATA, SIGNAL_UNIT_PULL_UPDATE):
+            # Connection states would start reconnects, nothing to reconnect
+            skipped += 1
+            continue
+
+        payload = {}
+        for unique_id, state in record["d"]["u"].items():
+            unit = units.get(unique_id)
+            if unit is None:
+                continue
+
+            if state is not None:
+                unit.set_state(state)
+            payload[unique_id] = unit
+
+        if signal == SIGNAL_DATA:
+            controller.signalling_callback(signal, payload)
+        else:
+            controller.signalling_callback(signal, list(payload))
+
+        signals[signal] = signals.get(signal, 0) + 1
+
+        # Let the flush run like between websocket messages
+        await asyncio.sleep(0)
+
+    return {
+        "records": len(records),
+        "signals": signals,
+        "skipped": skipped,
+        "seconds": round(time.monotonic() - start_time, 3),
+        "recorded_seconds": round(records[-1]["t"] - first_time, 3) if records else 0,
+        "max_lag_seconds": round(max_lag, 4),
+    }
+
+
+async def async_main(args) -> dict:
+    """
+    Replay a capture and return the summary
+    """
+    records = list(read_records(args.capture))
+    if not records or records[0]["s"] != SIGNAL_TOPOLOGY:
+        raise SystemExit(f"{args.capture} does not start with a topology record")
+
+    topology = records[0]["d"]
+    records = [record for record in records if record["s"] != SIGNAL_TOPOLOGY]
+
+    config_dir = tempfile.mkdtemp(prefix="casambi_replay_")
+    try:
+        hass, controller, units = await async_setup(config_dir, topology)
+
+        profiler = cProfile.Profile() if args.profile else None
+        if profiler:
+            profiler.enable()
+
+        summary = await async_replay(records, controller, units, args.speed)
+        await hass.async_block_till_done()
+
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            summary["profile"] = args.profile
+
+        summary["units"] = len(units)
+        summary["statistics"] = controller.statistics
+
+        await controller.async_stop()
+        await hass.async_stop()
+    finally:
+        shutil.rmtree(config_dir, ignore_errors=True)
+
+    return summary
+
+
+def main() -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Replay recorded Casambi traffic")
+    parser.add_argument("capture", help="capture file written by record_traffic")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="replay speed, 1 is real time and 0 as fast as possible",
+    )
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+
+    print(json.dumps(asyncio.run(async_main(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,779 @@
+"""
+Local stand-in for the Casambi cloud API.
+
+Implements the REST and websocket endpoints used by aiocasambi for a
+synthetic network of units, so the integration can be exercised and
+load tested without the real Casambi cloud.
+
+Run standalone:
+
+    python misc/simulator.py --units 100 --port 8765
+
+or from a test or benchmark:
+
+    simulator = CasambiSimulator(num_units=100)
+    url = await simulator.async_start()
+    websession = SimulatorSession(aiohttp.ClientSession(), url)
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import uuid
+
+from aiohttp import WSMsgType, web
+
+_LOGGER = logging.getLogger(__name__)
+
+CASAMBI_URL = "https://door.casambi.com/v1"
+CASAMBI_WS_URL = "wss://door.casambi.com/v1"
+
+DEFAULT_API_KEY = "simulator"
+DEFAULT_EMAIL = "simulator@example.com"
+DEFAULT_PASSWORD = "simulator"
+
+# Synthetic fixtures, fixture id -> fixture information and controls
+FIXTURES = {
+    1001: {
+        "vendor": "Simulator",
+        "model": "SIM Dimmer",
+        "type": "Luminaire",
+        "controls": ("Dimmer",),
+    },
+    1002: {
+        "vendor": "Simulator",
+        "model": "SIM Up Down",
+        "type": "Luminaire",
+        "controls": ("Dimmer", "Vertical"),
+    },
+    1003: {
+        "vendor": "Simulator",
+        "model": "SIM Tunable White",
+        "type": "Luminaire",
+        "controls": ("Dimmer", "CCT", "Colorsource"),
+    },
+    1004: {
+        "vendor": "Simulator",
+        "model": "SIM RGB",
+        "type": "Driver",
+        "controls": ("Dimmer", "Color", "Colorsource"),
+    },
+    1005: {
+        "vendor": "Simulator",
+        "model": "SIM RGBW",
+        "type": "Driver",
+        "controls": ("Dimmer", "Color", "White", "Colorsource"),
+    },
+    1006: {
+        "vendor": "Simulator",
+        "model": "SIM Presence",
+        "type": "Sensor",
+        "controls": ("Presence",),
+    },
+}
+
+# Share of each fixture in a generated network
+FIXTURE_WEIGHTS = {1001: 30, 1002: 15, 1003: 25, 1004: 10, 1005: 15, 1006: 5}
+
+UNITS_PER_GROUP = 10
+
+
+def get_initial_control(control_type: str) -> dict:
+    """
+    Initial state of a unit control
+    """
+    if control_type == "CCT":
+        return {"type": "CCT", "min": 2200, "max": 6000, "value": 4000, "level": 0.5}
+    if control_type == "Color":
+        return {"type": "Color", "rgb": "rgb(255, 255, 255)", "hue": 0.0, "sat": 0.0}
+    if control_type == "Colorsource":
+        return {"type": "Colorsource", "source": "TW"}
+    if control_type == "Presence":
+        return {"type": "Presence", "status": "absent"}
+
+    return {"type": control_type, "value": 0.0}
+
+
+class SimulatedNetwork:
+    """
+    Synthetic Casambi network with units of mixed fixtures, one group
+    per UNITS_PER_GROUP units and an all on scene
+    """
+
+    def __init__(self, network_id: str, num_units: int, rng: random.Random):
+        """Initialize the network."""
+        self.network_id = network_id
+        self.name = f"Simulated network {network_id[-4:]}"
+        self.address = f"{rng.getrandbits(48):012x}"
+        self.online = True
+
+        # unit id -> unit
+        self.units = {}
+        fixture_ids = rng.choices(
+            list(FIXTURE_WEIGHTS), weights=list(FIXTURE_WEIGHTS.values()), k=num_units
+        )
+        for unit_id, fixture_id in enumerate(fixture_ids, start=1):
+            fixture = FIXTURES[fixture_id]
+
+            self.units[unit_id] = {
+                "id": unit_id,
+                "address": f"{rng.getrandbits(48):012x}",
+                "name": f"{fixture['model']} {unit_id}",
+                "position": unit_id,
+                "fixtureId": fixture_id,
+                "firmwareVersion": "32.10",
+                "type": fixture["type"],
+                "online": True,
+                "controls": {
+                    control: get_initial_control(control)
+                    for control in fixture["controls"]
+                },
+            }
+
+        light_ids = [
+            unit_id
+            for unit_id, unit in self.units.items()
+            if "Dimmer" in unit["controls"]
+        ]
+
+        # group id -> unit ids
+        self.groups = {}
+        for index in range(0, len(light_ids), UNITS_PER_GROUP):
+            group_id = index // UNITS_PER_GROUP + 1
+            self.groups[group_id] = light_ids[index:index + UNITS_PER_GROUP]
+
+        # scene id -> unit ids
+        self.scenes = {1: light_ids}
+
+    def get_unit_data(self, unit: dict) -> dict:
+        """
+        REST representation of a unit
+        """
+        data = {key: value for key, value in unit.items() if key != "controls"}
+        data["controls"] = [list(unit["controls"].values())]
+        data["dimLevel"] = unit["controls"].get("Dimmer", {}).get("value", 0)
+        data["details"] = {
+            "OEM": FIXTURES[unit["fixtureId"]]["vendor"],
+            "fixture_model": FIXTURES[unit["fixtureId"]]["model"],
+        }
+
+        return data
+
+    def get_information(self) -> dict:
+        """
+        Response of GET /networks/{id}
+        """
+        units = {}
+        for unit_id, unit in self.units.items():
+            units[str(unit_id)] = {
+                "id": unit_id,
+                "address": unit["address"],
+                "name": unit["name"],
+                "position": unit["position"],
+                "fixtureId": unit["fixtureId"],
+                "groupId": 0,
+                "type": unit["type"],
+            }
+
+        return {
+            "id": self.network_id,
+            "name": self.name,
+            "address": self.address,
+            "type": "OPEN",
+            "grade": "EVOLUTION",
+            "units": units,
+            "scenes": self.get_scenes(),
+            "groups": self.get_groups(),
+        }
+
+    def get_state(self) -> dict:
+        """
+        Response of GET /networks/{id}/state
+        """
+        return {
+            "id": self.network_id,
+            "name": self.name,
+            "address": self.address,
+            "revision": 1,
+            "grade": "EVOLUTION",
+            "type": "OPEN",
+            "activeScenes": [],
+            "units": {
+                str(unit_id): self.get_unit_data(unit)
+                for unit_id, unit in self.units.items()
+            },
+            "scenes": self.get_scenes(),
+            "groups": self.get_groups(),
+        }
+
+    def get_scenes(self) -> dict:
+        """
+        Scenes in the Casambi representation
+        """
+        return {
+            str(scene_id): {
+                "id": scene_id,
+                "name": "All on",
+                "position": scene_id,
+                "type": "REGULAR",
+                "hidden": False,
+                "units": {str(unit_id): {"id": unit_id} for unit_id in unit_ids},
+            }
+            for scene_id, unit_ids in self.scenes.items()
+        }
+
+    def get_groups(self) -> dict:
+        """
+        Groups in the Casambi representation
+        """
+        return {
+            str(group_id): {
+                "id": group_id,
+                "name": f"Group {group_id}",
+                "position": group_id,
+                "units": [
+                    {"0": unit_id, "position": position}
+                    for position, unit_id in enumerate(unit_ids)
+                ],
+            }
+            for group_id, unit_ids in self.groups.items()
+        }
+
+    def get_unit_changed(self, unit: dict, wire: int) -> dict:
+        """
+        unitChanged websocket event for a unit
+        """
+        fixture = FIXTURES[unit["fixtureId"]]
+
+        return {
+            "method": "unitChanged",
+            "wire": wire,
+            "id": unit["id"],
+            "on": True,
+            "online": unit["online"],
+            "status": "ok",
+            "condition": 0.0,
+            "activeSceneId": 0,
+            "priority": 3.0,
+            "sensors": [],
+            "controls": list(unit["controls"].values()),
+            "details": {
+                "OEM": fixture["vendor"],
+                "fixture_model": fixture["model"],
+                "fixture": float(unit["fixtureId"]),
+                "name": unit["name"],
+                "address": unit["address"],
+                "_name": unit["address"],
+            },
+        }
+
+    @staticmethod
+    def set_target_controls(unit: dict, target_controls: dict) -> None:
+        """
+        Apply targetControls of a controlUnit message to a unit
+        """
+        controls = unit["controls"]
+
+        for control_type, target in target_controls.items():
+            if control_type == "RGB" and "Color" in controls:
+                controls["Color"]["rgb"] = target["rgb"]
+            elif control_type == "ColorTemperature" and "CCT" in controls:
+                controls["CCT"]["value"] = target["value"]
+            elif control_type in controls:
+                controls[control_type].update(target)
+
+
+class CasambiSimulator:
+    """
+    aiohttp server implementing the Casambi cloud API for simulated
+    networks.
+
+    Latency is added before every REST response and websocket event,
+    disconnects close all websockets and refuse new ones for a while,
+    expired sessions answer 401 until a new session is created.
+    """
+
+    def __init__(
+        self,
+        num_units=10,
+        num_networks=1,
+        api_key=DEFAULT_API_KEY,
+        email=DEFAULT_EMAIL,
+        password=DEFAULT_PASSWORD,
+        latency=0.0,
+        seed=0,
+    ):
+        """Initialize the simulator."""
+        self.api_key = api_key
+        self.email = email
+        self.password = password
+        self.latency = latency
+
+        self._rng = random.Random(seed)
+        self.networks = {}
+        for _ in range(num_networks):
+            network_id = f"{self._rng.getrandbits(128):032x}"
+            self.networks[network_id] = SimulatedNetwork(
+                network_id, num_units, self._rng
+            )
+
+        # session id -> network ids
+        self._sessions = {}
+
+        # websocket -> (network id, wire id)
+        self._websockets = {}
+        self._refuse_until = 0.0
+
+        self._runner = None
+        self.url = None
+
+        self.requests = 0
+        self.sessions_created = 0
+        self.commands_received = 0
+        self.events_sent = 0
+
+    @property
+    def statistics(self) -> dict:
+        """
+        Counters of requests, sessions, commands and events
+        """
+        return {
+            "requests": self.requests,
+            "sessions_created": self.sessions_created,
+            "commands_received": self.commands_received,
+            "events_sent": self.events_sent,
+            "websockets": len(self._websockets),
+        }
+
+    def create_app(self) -> web.Application:
+        """
+        aiohttp application with the Casambi endpoints
+        """
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_post("/v1/users/session", self._handle_user_session)
+        app.router.add_post("/v1/networks/session", self._handle_network_session)
+        app.router.add_get("/v1/networks/{network_id}", self._handle_network)
+        app.router.add_get(
+            "/v1/networks/{network_id}/state", self._handle_network_state
+        )
+        app.router.add_get(
+            "/v1/networks/{network_id}/units/{unit_id}/state", self._handle_unit_state
+        )
+        app.router.add_get("/v1/fixtures/{fixture_id}", self._handle_fixture)
+        app.router.add_get("/v1/bridge/", self._handle_websocket)
+
+        return app
+
+    async def async_start(self, host="127.0.0.1", port=0) -> str:
+        """
+        Start serving, returns the base url of the simulator
+        """
+        self._runner = web.AppRunner(self.create_app())
+        await self._runner.setup()
+
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+
+        port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+        self.url = f"http://{host}:{port}"
+
+        _LOGGER.info("Casambi simulator listening on %s", self.url)
+
+        return self.url
+
+    async def async_stop(self) -> None:
+        """
+        Close all websockets and stop serving
+        """
+        for web_sock in list(self._websockets):
+            await web_sock.close()
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        """
+        Count requests, add latency and check the api key
+        """
+        self.requests += 1
+
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        api_key = request.headers.get("X-Casambi-Key")
+        if api_key is None:
+            api_key = request.headers.get("Sec-WebSocket-Protocol")
+        if api_key != self.api_key:
+            raise web.HTTPUnauthorized(text="invalid api key")
+
+        return await handler(request)
+
+    def _get_network(self, request) -> SimulatedNetwork:
+        """
+        Network of the request, checks the session
+        """
+        network_id = request.match_info["network_id"]
+        session_id = request.headers.get("X-Casambi-Session")
+
+        if network_id not in self._sessions.get(session_id, ()):
+            raise web.HTTPUnauthorized(text="invalid session")
+
+        return self.networks[network_id]
+
+    def _create_session(self, request_data: dict, password: str) -> str:
+        """
+        Check credentials and create a session for all networks
+        """
+        if request_data.get("email") != self.email or password != self.password:
+            raise web.HTTPUnauthorized(text="invalid credentials")
+
+        session_id = uuid.uuid4().hex
+        self._sessions[session_id] = set(self.networks)
+        self.sessions_created += 1
+
+        return session_id
+
+    async def _handle_user_session(self, request):
+        """
+        POST /users/session
+        """
+        data = await request.json()
+        session_id = self._create_session(data, data.get("password"))
+
+        networks = {}
+        for network_id, network in self.networks.items():
+            networks[network_id] = {
+                "id": network_id,
+                "address": network.address,
+                "name": network.name,
+                "type": "OPEN",
+                "grade": "EVOLUTION",
+                "role": "ADMIN",
+            }
+
+        return web.json_response(
+            {
+                "sessionId": session_id,
+                "sites": {"simulated": {"name": "Simulated", "networks": networks}},
+                "networks": networks,
+            }
+        )
+
+    async def _handle_network_session(self, request):
+        """
+        POST /networks/session
+        """
+        data = await request.json()
+        session_id = self._create_session(data, data.get("password"))
+
+        result = {}
+        for network_id, network in self.networks.items():
+            result[network_id] = {
+                "id": network_id,
+                "address": network.address,
+                "mac": network.address,
+                "name": network.name,
+                "type": "PROTECTED",
+                "grade": "EVOLUTION",
+                "sessionId": session_id,
+            }
+
+        return web.json_response(result)
+
+    async def _handle_network(self, request):
+        """
+        GET /networks/{id}
+        """
+        return web.json_response(self._get_network(request).get_information())
+
+    async def _handle_network_state(self, request):
+        """
+        GET /networks/{id}/state
+        """
+        return web.json_response(self._get_network(request).get_state())
+
+    async def _handle_unit_state(self, request):
+        """
+        GET /networks/{id}/units/{unit_id}/state
+        """
+        network = self._get_network(request)
+
+        unit = network.units.get(int(request.match_info["unit_id"]))
+        if unit is None:
+            raise web.HTTPNotFound(text="unit not found")
+
+        return web.json_response(network.get_unit_data(unit))
+
+    async def _handle_fixture(self, request):
+        """
+        GET /fixtures/{id}
+        """
+        fixture_id = int(request.match_info["fixture_id"])
+
+        fixture = FIXTURES.get(fixture_id)
+        if fixture is None:
+            raise web.HTTPNotFound(text="fixture not found")
+
+        return web.json_response(
+            {
+                "id": fixture_id,
+                "type": fixture["type"],
+                "vendor": fixture["vendor"],
+                "model": fixture["model"],
+                "controls": [
+                    {"type": control.lower(), "id": index, "readonly": False}
+                    for index, control in enumerate(fixture["controls"])
+                ],
+            }
+        )
+
+    async def _handle_websocket(self, request):
+        """
+        GET /bridge/, websocket with the open, ping and control methods
+        """
+        if time.monotonic() < self._refuse_until:
+            raise web.HTTPServiceUnavailable(text="simulated outage")
+
+        web_sock = web.WebSocketResponse(protocols=(self.api_key,))
+        await web_sock.prepare(request)
+
+        try:
+            async for msg in web_sock:
+                if msg.type != WSMsgType.TEXT:
+                    break
+
+                await self._handle_message(web_sock, json.loads(msg.data))
+        finally:
+            self._websockets.pop(web_sock, None)
+
+        return web_sock
+
+    async def _handle_message(self, web_sock, message: dict) -> None:
+        """
+        Handle a message from a websocket client
+        """
+        method = message.get("method")
+        wire = message.get("wire")
+
+        if method == "open":
+            if message.get("id") not in self._sessions.get(message.get("session"), ()):
+                await web_sock.send_json({"wire": wire, "response": "invalidSession"})
+                await web_sock.close()
+                return
+
+            self._websockets[web_sock] = (message["id"], wire)
+            await web_sock.send_json({"wire": wire, "response": "ok"})
+            return
+
+        if method == "ping":
+            await web_sock.send_json({"wire": wire, "response": "pong"})
+            return
+
+        if web_sock not in self._websockets:
+            return
+
+        self.commands_received += 1
+
+        network = self.networks[self._websockets[web_sock][0]]
+
+        unit_ids = []
+        if method == "controlUnit":
+            unit_ids = [message["id"]]
+        elif method == "controlGroup":
+            unit_ids = network.groups.get(message["id"], [])
+        elif method == "controlScene":
+            unit_ids = network.scenes.get(message["id"], [])
+            message["targetControls"] = {"Dimmer": {"value": message.get("level", 1)}}
+
+        units = [network.units[unit_id] for unit_id in unit_ids if unit_id in network.units]
+        for unit in units:
+            network.set_target_controls(unit, message.get("targetControls", {}))
+
+        await self.async_send_unit_changed(network.network_id, units)
+
+    async def async_send_unit_changed(self, network_id: str, units: list) -> None:
+        """
+        Send unitChanged events for units to the clients of a network
+        """
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        network = self.networks[network_id]
+
+        for web_sock, (ws_network_id, wire) in list(self._websockets.items()):
+            if ws_network_id != network_id:
+                continue
+
+            for unit in units:
+                try:
+                    await web_sock.send_json(network.get_unit_changed(unit, wire))
+                except ConnectionError:
+                    self._websockets.pop(web_sock, None)
+                    break
+
+                self.events_sent += 1
+
+    async def async_burst(self, count: int, interval: float = 0.0) -> None:
+        """
+        Send count unitChanged events for random lights with random
+        dimmer levels, interval seconds apart
+        """
+        lights = [
+            (network_id, unit)
+            for network_id, network in self.networks.items()
+            for unit in network.units.values()
+            if "Dimmer" in unit["controls"]
+        ]
+
+        for _ in range(count):
+            network_id, unit = self._rng.choice(lights)
+            unit["controls"]["Dimmer"]["value"] = round(self._rng.random(), 2)
+
+            await self.async_send_unit_changed(network_id, [unit])
+
+            if interval > 0:
+                await asyncio.sleep(interval)
+
+    async def async_disconnect(self, duration: float = 0.0) -> None:
+        """
+        Close all websockets, new websockets are refused for duration seconds
+        """
+        self._refuse_until = time.monotonic() + duration
+
+        for web_sock in list(self._websockets):
+            self._websockets.pop(web_sock, None)
+            await web_sock.close()
+
+    def expire_sessions(self) -> None:
+        """
+        Invalidate all sessions, requests answer 401 until a new session
+        is created
+        """
+        self._sessions = {}
+
+    async def async_run_script(self, steps: list) -> None:
+        """
+        Run scripted steps, for example:
+
+        [
+            {"burst": 500, "interval": 0.001},
+            {"sleep": 2},
+            {"latency": 0.2},
+            {"disconnect": 10},
+            {"expire_sessions": true}
+        ]
+        """
+        for step in steps:
+            _LOGGER.info("Running script step %s", step)
+
+            if "burst" in step:
+                await self.async_burst(step["burst"], step.get("interval", 0.0))
+            if "latency" in step:
+                self.latency = step["latency"]
+            if "disconnect" in step:
+                await self.async_disconnect(step["disconnect"])
+            if step.get("expire_sessions"):
+                self.expire_sessions()
+            if "sleep" in step:
+                await asyncio.sleep(step["sleep"])
+
+
+class SimulatorSession:
+    """
+    aiohttp client session that sends requests for the Casambi cloud
+    to the simulator instead, pass it as websession to aiocasambi
+    """
+
+    def __init__(self, websession, url: str):
+        """Initialize the session."""
+        self._websession = websession
+        self._url = url
+
+    def _rewrite(self, url: str) -> str:
+        """
+        Simulator url for a Casambi cloud url
+        """
+        for casambi_url in (CASAMBI_URL, CASAMBI_WS_URL):
+            if str(url).startswith(casambi_url):
+                return f"{self._url}/v1{str(url)[len(casambi_url):]}"
+
+        return url
+
+    def request(self, method, url, **kwargs):
+        """Make a request"""
+        kwargs.pop("ssl", None)
+        return self._websession.request(method, self._rewrite(url), **kwargs)
+
+    def ws_connect(self, url, **kwargs):
+        """Connect a websocket"""
+        kwargs.pop("ssl", None)
+        return self._websession.ws_connect(self._rewrite(url), **kwargs)
+
+    def __getattr__(self, name):
+        """Everything else is handled by the wrapped session"""
+        return getattr(self._websession, name)
+
+
+async def async_main(args, script=None) -> None:
+    """
+    Serve the simulator until interrupted, script steps are run first
+    """
+    simulator = CasambiSimulator(
+        num_units=args.units,
+        num_networks=args.networks,
+        api_key=args.api_key,
+        latency=args.latency,
+        seed=args.seed,
+    )
+
+    url = await simulator.async_start(args.host, args.port)
+
+    print(f"Casambi simulator listening on {url}")
+    print(f"api key: {simulator.api_key} email: {simulator.email} password: {simulator.password}")
+    print(f"networks: {', '.join(simulator.networks)}")
+
+    try:
+        if script:
+            await simulator.async_run_script(script)
+
+        # Until interrupted
+        await asyncio.Event().wait()
+    finally:
+        print(f"statistics: {simulator.statistics}")
+        await simulator.async_stop()
+
+
+def main() -> None:
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Local Casambi cloud simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--units", type=int, default=10, help="units per network")
+    parser.add_argument("--networks", type=int, default=1)
+    parser.add_argument("--api-key", default=DEFAULT_API_KEY)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--script", help="json file with script steps")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Read before the event loop starts, the file is not read on the loop
+    script = None
+    if args.script:
+        with open(args.script, encoding="utf-8") as script_file:
+            script = json.load(script_file)
+
+    try:
+        asyncio.run(async_main(args, script))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
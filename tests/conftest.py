@@ -0,0 +1,95 @@
+"""
+Fixtures for the casambi tests.
+"""
+
+import pytest_asyncio
+from homeassistant.core import HomeAssistant
+
+
+class FakeUnit:
+    """
+    Stand-in for an aiocasambi unit, records the target controls sent
+    """
+
+    def __init__(self, unit_id, network_id="network", controls=("Dimmer",)):
+        """Initialize the fake unit."""
+        self.unit_id = unit_id
+        self.network_id = network_id
+        self.unique_id = f"{network_id}-{unit_id:012x}"
+        self.name = f"Unit {unit_id}"
+        self.type = "Luminaire"
+        self.oem = "OEM"
+        self.fixture_model = "Model"
+        self.fixture_id = 1
+        self.firmware_version = "1.0"
+        self.online = True
+        self.value = 0.0
+        self.distribution = 0.0
+        self.controls = {}
+        self.cct_min = 2000
+        self.cct_max = 6500
+        self.color_temp = 250
+
+        self._controls = set(controls)
+
+        self.sent = []
+        self.error = None
+
+    def supports_brightness(self) -> bool:
+        """Dimmer control"""
+        return "Dimmer" in self._controls
+
+    def supports_distribution(self) -> bool:
+        """Vertical control"""
+        return "Vertical" in self._controls
+
+    def supports_color_temperature(self) -> bool:
+        """CCT control"""
+        return "CCT" in self._controls
+
+    def supports_rgb(self) -> bool:
+        """Color control"""
+        return "Color" in self._controls
+
+    def supports_rgbw(self) -> bool:
+        """Color and White controls"""
+        return "Color" in self._controls and "White" in self._controls
+
+    def get_min_mired(self) -> int:
+        """Coldest color temperature"""
+        return round(1000000 / self.cct_max)
+
+    def get_max_mired(self) -> int:
+        """Warmest color temperature"""
+        return round(1000000 / self.cct_min)
+
+    def get_supported_color_temperature(self) -> tuple:
+        """Color temperature range in kelvin and the current one"""
+        return (self.cct_min, self.cct_max, 0)
+
+    def get_color_temp(self) -> int:
+        """Current color temperature in mireds"""
+        return self.color_temp
+
+    async def set_unit_target_controls(self, *, target_controls) -> None:
+        """Record the target controls, raises error when set"""
+        if self.error is not None:
+            raise self.error
+
+        self.sent.append(dict(target_controls))
+
+    def __repr__(self) -> str:
+        """Return the representation."""
+        return f"<FakeUnit {self.unique_id}>"
+
+
+@pytest_asyncio.fixture
+async def hass(tmp_path):
+    """
+    Home Assistant core without any integration loaded
+    """
+    hass = HomeAssistant(str(tmp_path))
+
+    yield hass
+
+    await hass.async_stop(force=True)
@@ -0,0 +1,141 @@
+"""
+Tests for CasambiCommandQueue.
+"""
+
+import asyncio
+import time
+
+import pytest
+from aiocasambi import AiocasambiException
+
+from custom_components.casambi.casambi.CasambiCommandQueue import CasambiCommandQueue
+
+from .conftest import FakeUnit
+
+
+@pytest.mark.asyncio
+async def test_merges_pending_commands(hass):
+    """Commands to a unit waiting for the interval are sent as one message"""
+    queue = CasambiCommandQueue(hass, command_interval=0.05)
+    unit = FakeUnit(1)
+
+    await queue.async_enqueue(unit, {"Dimmer": {"value": 0.1}})
+
+    await asyncio.gather(
+        queue.async_enqueue(unit, {"Dimmer": {"value": 0.2}}),
+        queue.async_enqueue(unit, {"Vertical": {"value": 0.5}}),
+        queue.async_enqueue(unit, {"Dimmer": {"value": 0.3}}),
+    )
+
+    assert unit.sent == [
+        {"Dimmer": {"value": 0.1}},
+        {"Dimmer": {"value": 0.3}, "Vertical": {"value": 0.5}},
+    ]
+    assert queue.statistics == {
+        "commands_enqueued": 4,
+        "commands_merged": 2,
+        "commands_sent": 2,
+        "commands_throttled": 0,
+        "commands_pending": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_new_color_source_replaces_color_controls(hass):
+    """A merged color replaces the pending color of another source"""
+    queue = CasambiCommandQueue(hass, command_interval=0.05)
+    unit = FakeUnit(1)
+
+    await queue.async_enqueue(unit, {"Dimmer": {"value": 1}})
+
+    await asyncio.gather(
+        queue.async_enqueue(
+            unit,
+            {"ColorTemperature": {"value": 3000}, "Colorsource": {"source": "TW"}},
+        ),
+        queue.async_enqueue(
+            unit,
+            {"RGB": {"rgb": "rgb(255, 0, 0)"}, "Colorsource": {"source": "RGB"}},
+        ),
+    )
+
+    assert unit.sent[-1] == {
+        "RGB": {"rgb": "rgb(255, 0, 0)"},
+        "Colorsource": {"source": "RGB"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_units_are_sent_concurrently(hass):
+    """Only repeat messages to the same unit wait for the interval"""
+    queue = CasambiCommandQueue(hass, command_interval=0.2, rate=1000, burst=20)
+    units = [FakeUnit(unit_id) for unit_id in range(20)]
+
+    start_time = time.monotonic()
+    await asyncio.gather(
+        *[queue.async_enqueue(unit, {"Dimmer": {"value": 1}}) for unit in units]
+    )
+    assert time.monotonic() - start_time < 0.2
+
+    start_time = time.monotonic()
+    await queue.async_enqueue(units[0], {"Dimmer": {"value": 0}})
+    assert time.monotonic() - start_time >= 0.15
+
+    assert queue.commands_sent == 21
+
+
+@pytest.mark.asyncio
+async def test_send_error_is_raised_to_all_callers(hass):
+    """Callers of a merged command all get the error of the send"""
+    queue = CasambiCommandQueue(hass, command_interval=0.05)
+    unit = FakeUnit(1)
+
+    await queue.async_enqueue(unit, {"Dimmer": {"value": 1}})
+
+    unit.error = AiocasambiException("failed")
+    results = await asyncio.gather(
+        queue.async_enqueue(unit, {"Dimmer": {"value": 0.5}}),
+        queue.async_enqueue(unit, {"Dimmer": {"value": 0.6}}),
+        return_exceptions=True,
+    )
+
+    assert [type(result) for result in results] == [AiocasambiException] * 2
+    assert queue.commands_sent == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_releases_waiting_callers(hass):
+    """Pending commands are cancelled with the queue"""
+    queue = CasambiCommandQueue(hass, command_interval=10)
+    unit = FakeUnit(1)
+
+    await queue.async_enqueue(unit, {"Dimmer": {"value": 1}})
+
+    pending = asyncio.ensure_future(queue.async_enqueue(unit, {"Dimmer": {"value": 0}}))
+    await asyncio.sleep(0)
+
+    queue.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await pending
+
+    assert queue.statistics["commands_pending"] == 0
+    assert len(unit.sent) == 1
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_of_all_units(hass):
+    """Messages to different units are limited to rate per second after a burst"""
+    queue = CasambiCommandQueue(hass, command_interval=0, rate=100, burst=2)
+    units = [FakeUnit(unit_id) for unit_id in range(6)]
+
+    start = time.monotonic()
+    await asyncio.gather(
+        *[queue.async_enqueue(unit, {"Dimmer": {"value": 1}}) for unit in units]
+    )
+    elapsed = time.monotonic() - start
+
+    # Two messages of the burst, the other four wait 10 ms each
+    assert elapsed >= 0.035
+    assert queue.commands_sent == 6
+    assert queue.commands_throttled >= 4
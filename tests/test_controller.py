@@ -0,0 +1,294 @@
+"""
+Tests for CasambiController.
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+from aiocasambi import AiocasambiException
+from aiocasambi.consts import (
+    SIGNAL_CONNECTION_STATE,
+    SIGNAL_DATA,
+    SIGNAL_UNIT_PULL_UPDATE,
+    STATE_DISCONNECTED,
+    STATE_RUNNING,
+    STATE_STOPPED,
+)
+
+from custom_components.casambi.casambi.CasambiController import CasambiController
+from custom_components.casambi.casambi.CasambiReconnectSupervisor import (
+    CasambiReconnectSupervisor,
+)
+
+from .conftest import FakeUnit
+from .test_reconnect_supervisor import wait_until
+
+
+class FakeWebsocket:
+    """
+    Stand-in for an aiocasambi websocket
+    """
+
+    def __init__(self, network_id, state=STATE_RUNNING):
+        """Initialize the fake websocket."""
+        self.network_id = network_id
+        self.state = state
+
+    def stop(self):
+        """Stop the websocket"""
+        self.state = STATE_STOPPED
+
+
+class FakeAiocasambiController:
+    """
+    Stand-in for the aiocasambi controller, create_session fails with the
+    queued errors and hangs for the queued None entries
+    """
+
+    def __init__(self, network_ids=("network",), session_errors=()):
+        """Initialize the fake controller."""
+        self.websockets = {
+            network_id: FakeWebsocket(network_id) for network_id in network_ids
+        }
+        self.session_errors = list(session_errors)
+        self.sessions_created = 0
+        self.websockets_started = 0
+
+    async def create_session(self):
+        """Fail or hang with the next queued error"""
+        if self.session_errors:
+            error = self.session_errors.pop(0)
+            if error is None:
+                await asyncio.sleep(10)
+            raise error
+
+        self.sessions_created += 1
+
+    async def start_websocket(self, *, network_id):
+        """Replace the websocket of network_id with a running one"""
+        self.websockets[network_id] = FakeWebsocket(network_id)
+        self.websockets_started += 1
+
+    async def stop_websockets(self):
+        """Stop the websockets of all networks"""
+        for websocket in self.websockets.values():
+            websocket.stop()
+
+    def get_websockets(self) -> list:
+        """Websockets of all networks"""
+        return list(self.websockets.values())
+
+    def get_websockets_states(self) -> list:
+        """States of all websockets"""
+        return [websocket.state for websocket in self.websockets.values()]
+
+
+class FakeEntity:
+    """
+    Stand-in for an entity of a unit, counts its state updates
+    """
+
+    def __init__(self, unit):
+        """Initialize the fake entity."""
+        self.unit = unit
+        self._unit_unique_id = unit.unique_id
+        self.updates = 0
+        self.suppressed_writes = 0
+
+    def update_state(self) -> bool:
+        """Count the update, the state is always written"""
+        self.updates += 1
+        return True
+
+
+def add_entities(controller, count) -> list:
+    """Register an entity for each of count units"""
+    entities = [FakeEntity(FakeUnit(unit_id)) for unit_id in range(count)]
+    for entity in entities:
+        controller.add_entity(entity)
+
+    return entities
+
+
+def set_reconnect_supervisor(
+    hass, controller, min_delay=0.001, max_delay=0.01
+) -> CasambiReconnectSupervisor:
+    """Replace the reconnect supervisor by one with short delays"""
+    controller.reconnect_supervisor = CasambiReconnectSupervisor(
+        hass,
+        controller.async_reconnect,
+        controller.websockets_running,
+        min_delay=min_delay,
+        max_delay=max_delay,
+    )
+
+    return controller.reconnect_supervisor
+
+
+@pytest_asyncio.fixture
+async def controller(hass):
+    """
+    Started controller without any entity
+    """
+    controller = CasambiController(hass, command_interval=0)
+    controller.is_started = True
+
+    yield controller
+
+    await controller.async_stop()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_retries_failed_attempts(hass, controller):
+    """
+    Failing and hanging attempts are retried by the supervisor, only the
+    websockets that are not running are started again
+    """
+    aiocasambi_controller = FakeAiocasambiController(
+        network_ids=("network", "other"),
+        session_errors=[AiocasambiException("quota"), None],
+    )
+    aiocasambi_controller.websockets["network"].state = STATE_DISCONNECTED
+
+    controller.aiocasambi_controller = aiocasambi_controller
+    controller._reconnect_timeout = 0.01
+
+    supervisor = set_reconnect_supervisor(hass, controller)
+    supervisor.start()
+
+    await wait_until(lambda: not supervisor.is_reconnecting)
+
+    assert supervisor.attempts_total == 3
+    assert supervisor.reconnects == 1
+    assert supervisor.last_error.startswith("TimeoutError")
+
+    assert aiocasambi_controller.sessions_created == 1
+    assert aiocasambi_controller.websockets_started == 1
+    assert controller.websockets_running()
+
+
+@pytest.mark.asyncio
+async def test_data_updates_only_the_entities_of_its_units(controller):
+    """SIGNAL_DATA and SIGNAL_UNIT_PULL_UPDATE reach the entities of their units"""
+    entities = add_entities(controller, 3)
+    units = [entity.unit for entity in entities]
+
+    controller.signalling_callback(SIGNAL_DATA, {units[1].unique_id: units[1]})
+    controller.flush_unit_updates()
+
+    assert [entity.updates for entity in entities] == [0, 1, 0]
+
+    controller.signalling_callback(
+        SIGNAL_UNIT_PULL_UPDATE, [units[0].unique_id, "unknown"]
+    )
+    controller.flush_unit_updates()
+
+    assert [entity.updates for entity in entities] == [1, 1, 0]
+    assert controller.signals_received == {SIGNAL_DATA: 1, SIGNAL_UNIT_PULL_UPDATE: 1}
+    assert controller.statistics["state_writes"] == 2
+
+
+@pytest.mark.asyncio
+async def test_data_without_units_updates_all_entities(controller):
+    """A payload that does not name any unit refreshes every entity"""
+    entities = add_entities(controller, 3)
+
+    controller.signalling_callback(SIGNAL_DATA, None)
+    controller.flush_unit_updates()
+
+    assert [entity.updates for entity in entities] == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_disconnected_websocket_starts_reconnect(hass, controller):
+    """A websocket going down starts the supervisor"""
+    aiocasambi_controller = FakeAiocasambiController()
+    aiocasambi_controller.websockets["network"].state = STATE_DISCONNECTED
+    controller.aiocasambi_controller = aiocasambi_controller
+
+    supervisor = set_reconnect_supervisor(hass, controller)
+
+    controller.signalling_callback(SIGNAL_CONNECTION_STATE, STATE_DISCONNECTED)
+    assert supervisor.is_reconnecting
+
+    await wait_until(lambda: not supervisor.is_reconnecting)
+
+    assert supervisor.reconnects == 1
+    assert aiocasambi_controller.websockets_started == 1
+
+
+@pytest.mark.asyncio
+async def test_running_websockets_end_the_outage(hass, controller):
+    """The supervisor stops waiting once all websockets run again"""
+    aiocasambi_controller = FakeAiocasambiController(
+        session_errors=[AiocasambiException("down")]
+    )
+    aiocasambi_controller.websockets["network"].state = STATE_STOPPED
+    controller.aiocasambi_controller = aiocasambi_controller
+
+    supervisor = set_reconnect_supervisor(hass, controller, min_delay=10, max_delay=10)
+
+    controller.signalling_callback(SIGNAL_CONNECTION_STATE, STATE_STOPPED)
+    await wait_until(lambda: supervisor.attempts_total == 1)
+
+    # Websocket reconnected while the supervisor waits for the next attempt
+    aiocasambi_controller.websockets["network"].state = STATE_RUNNING
+    controller.signalling_callback(SIGNAL_CONNECTION_STATE, STATE_RUNNING)
+
+    assert not supervisor.is_reconnecting
+    assert supervisor.reconnects == 1
+    assert aiocasambi_controller.sessions_created == 0
+
+
+@pytest.mark.asyncio
+async def test_updates_in_one_window_are_flushed_once(hass):
+    """Several signals for a unit within the update window write state once"""
+    controller = CasambiController(hass, update_window=0.01)
+    entities = add_entities(controller, 2)
+    unit = entities[0].unit
+
+    for _ in range(3):
+        controller.signalling_callback(SIGNAL_DATA, {unit.unique_id: unit})
+
+    assert entities[0].updates == 0
+
+    await asyncio.sleep(0.05)
+
+    assert [entity.updates for entity in entities] == [1, 0]
+    assert controller.statistics["messages_received"] == 3
+    assert controller.statistics["state_writes"] == 1
+
+    await controller.async_stop()
+
+
+@pytest.mark.asyncio
+async def test_flush_yields_when_out_of_budget(controller):
+    """A flush over its slice budget continues on the next loop iteration"""
+    entities = add_entities(controller, 3)
+    controller._slice_budget = 0
+
+    controller.signalling_callback(SIGNAL_DATA, None)
+    controller.flush_unit_updates()
+
+    # Every entity after the first one is over the budget
+    assert [entity.updates for entity in entities] == [1, 0, 0]
+    assert controller.flush_slices == 1
+    assert controller.statistics["flush_pending"] == 2
+
+    await asyncio.sleep(0)
+    assert [entity.updates for entity in entities] == [1, 1, 0]
+
+    await asyncio.sleep(0)
+    assert [entity.updates for entity in entities] == [1, 1, 1]
+    assert controller.flush_slices == 2
+    assert controller.statistics["flush_pending"] == 0
+
+    # Entities still pending are not queued twice by a new update
+    controller.signalling_callback(SIGNAL_DATA, None)
+    controller.flush_unit_updates()
+    controller.signalling_callback(SIGNAL_DATA, None)
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert [entity.updates for entity in entities] == [3, 2, 2]
@@ -0,0 +1,150 @@
+"""
+Tests for CasambiLatencyTracker.
+"""
+
+import asyncio
+
+import pytest
+
+from custom_components.casambi.casambi.CasambiLatencyTracker import (
+    CasambiLatencyTracker,
+)
+
+from .conftest import FakeUnit
+
+
+@pytest.mark.asyncio
+async def test_acknowledged_by_target_value(hass):
+    """A command is confirmed by the first update with the target value"""
+    tracker = CasambiLatencyTracker(hass)
+    unit = FakeUnit(1)
+    other = FakeUnit(2)
+
+    tracker.start(unit, {"Dimmer": {"value": 0.5}, "Vertical": {"value": 0.2}})
+    assert tracker.has_pending
+
+    # Other units and intermediate values do not confirm it
+    unit.value = 0.3
+    tracker.acknowledge([other, unit])
+    assert tracker.has_pending
+
+    unit.value = 0.51
+    unit.distribution = 0.2
+    tracker.acknowledge([unit])
+    assert not tracker.has_pending
+
+    network = tracker.statistics["networks"]["network"]
+    assert network["acknowledged"] == 1
+    assert network["timeouts"] == 0
+    assert network["p50"] is not None
+    assert sum(network["histogram"].values()) == 1
+
+
+@pytest.mark.asyncio
+async def test_command_without_values_confirmed_by_next_update(hass):
+    """Commands without dimmer or vertical are confirmed by any update"""
+    tracker = CasambiLatencyTracker(hass)
+    unit = FakeUnit(1)
+
+    tracker.start(unit, {"RGB": {"rgb": "rgb(255, 0, 0)"}})
+    tracker.acknowledge([unit])
+
+    assert not tracker.has_pending
+    assert tracker.statistics["networks"]["network"]["acknowledged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timeouts_and_superseded_commands(hass):
+    """Newer commands replace pending ones, unconfirmed ones time out"""
+    listener_calls = []
+
+    tracker = CasambiLatencyTracker(hass, timeout=0.01, notify_interval=0.01)
+    tracker.add_listener("network", lambda: listener_calls.append(True))
+    unit = FakeUnit(1)
+
+    tracker.start(unit, {"Dimmer": {"value": 1}})
+    tracker.start(unit, {"Dimmer": {"value": 0.5}})
+
+    await asyncio.sleep(0.05)
+
+    assert not tracker.has_pending
+    assert tracker.get_timeouts("network") == 1
+    assert tracker.statistics["networks"]["network"]["superseded"] == 1
+    assert listener_calls == [True]
+
+
+@pytest.mark.asyncio
+async def test_cancel_forgets_pending_command(hass):
+    """A command that was not sent is neither acknowledged nor timed out"""
+    tracker = CasambiLatencyTracker(hass, timeout=0.01)
+    unit = FakeUnit(1)
+
+    tracker.start(unit, {"Dimmer": {"value": 1}})
+    tracker.cancel(unit)
+
+    await asyncio.sleep(0.05)
+
+    assert tracker.get_timeouts("network") == 0
+    assert tracker.statistics["networks"] == {}
+
+
+@pytest.mark.asyncio
+async def test_percentiles_and_histogram(hass):
+    """Percentiles are nearest rank, buckets are keyed by upper bound"""
+    tracker = CasambiLatencyTracker(hass)
+
+    for latency in range(10, 1010, 10):
+        tracker._add_sample("network", latency)
+
+    assert tracker.get_percentile("network", 50) == 500
+    assert tracker.get_percentile("network", 95) == 950
+    assert tracker.get_percentile("network", 99) == 990
+    assert tracker.get_percentile("other", 50) is None
+
+    histogram = tracker.get_histogram("network")
+    assert histogram["le_50"] == 5
+    assert histogram["le_100"] == 5
+    assert histogram["le_1000"] == 50
+    assert histogram["inf"] == 0
+    assert sum(histogram.values()) == 100
+
+
+@pytest.mark.asyncio
+async def test_listeners_called_once_per_interval(hass):
+    """Changes within the notify interval are reported by one call"""
+    listener_calls = []
+
+    tracker = CasambiLatencyTracker(hass, notify_interval=0.02)
+    tracker.add_listener("network", lambda: listener_calls.append(True))
+
+    for latency in range(100):
+        tracker._add_sample("network", latency)
+    assert listener_calls == []
+
+    await asyncio.sleep(0.05)
+    assert listener_calls == [True]
+
+    tracker._add_sample("network", 10)
+    tracker.cancel_all()
+
+    await asyncio.sleep(0.05)
+    assert listener_calls == [True]
+
+
+@pytest.mark.asyncio
+async def test_samples_sorted_once_per_change(hass):
+    """Percentiles read between two samples share one sort"""
+    tracker = CasambiLatencyTracker(hass)
+
+    tracker._add_sample("network", 30)
+    tracker._add_sample("network", 10)
+    assert tracker.get_percentile("network", 50) == 10
+
+    samples = tracker._networks["network"]["sorted"]
+    assert tracker.get_percentile("network", 99) == 30
+    assert tracker._networks["network"]["sorted"] is samples
+
+    tracker._add_sample("network", 20)
+    assert tracker.get_percentile("network", 50) == 20
+
+    tracker.cancel_all()
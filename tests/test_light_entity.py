@@ -0,0 +1,75 @@
+"""
+Tests for CasambiLightEntity.
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+from homeassistant.components.light import ATTR_COLOR_TEMP
+
+from custom_components.casambi.casambi.CasambiController import CasambiController
+from custom_components.casambi.casambi.CasambiLightEntity import CasambiLightEntity
+
+from .conftest import FakeUnit
+
+
+def get_light(hass, unit) -> CasambiLightEntity:
+    """Light entity of unit"""
+    controller = CasambiController(hass, command_interval=0)
+    controller.is_started = True
+
+    entity = CasambiLightEntity(MagicMock(), unit, controller, hass)
+    entity.entity_id = f"light.unit_{unit.unit_id}"
+
+    return entity
+
+
+@pytest.mark.asyncio
+async def test_color_temperature_limited_to_the_unit_range(hass):
+    """
+    Color temperatures are rounded up to 50 kelvin and limited to the exact
+    kelvin range of the unit, not to the range of its rounded mireds
+    """
+    unit = FakeUnit(1, controls=("Dimmer", "CCT"))
+    unit.cct_min = 2200
+    unit.cct_max = 6500
+    light = get_light(hass, unit)
+
+    def get_kelvin(mired):
+        target_controls = light.get_target_controls(**{ATTR_COLOR_TEMP: mired})
+        return target_controls["ColorTemperature"]["value"]
+
+    assert (light.min_mireds, light.max_mireds) == (154, 455)
+
+    assert get_kelvin(light.min_mireds) == 6500
+    assert get_kelvin(light.max_mireds) == 2200
+    assert get_kelvin(100) == 6500
+    assert get_kelvin(500) == 2200
+    assert get_kelvin(250) == 4000
+    assert get_kelvin(251) == 4000
+
+
+@pytest.mark.asyncio
+async def test_unchanged_state_is_not_written(hass):
+    """State is written only when a published attribute changed"""
+    unit = FakeUnit(1)
+    light = get_light(hass, unit)
+    light.async_write_ha_state = MagicMock(wraps=light.async_write_ha_state)
+
+    # Unit state has not changed since the entity was created
+    assert not light.update_state()
+    assert light.suppressed_writes == 1
+    assert light.async_write_ha_state.call_count == 0
+
+    unit.value = 0.5
+    assert light.update_state()
+    assert hass.states.get(light.entity_id).state == "on"
+
+    assert not light.update_state()
+    assert light.suppressed_writes == 2
+
+    unit.online = False
+    assert light.update_state()
+    assert hass.states.get(light.entity_id).state == "unavailable"
+
+    assert light.async_write_ha_state.call_count == 2
@@ -0,0 +1,116 @@
+"""
+Tests for the optimistic state of CasambiLightEntity.
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+from aiocasambi import AiocasambiException
+
+from custom_components.casambi.casambi.CasambiController import CasambiController
+from custom_components.casambi.casambi.CasambiLightEntity import CasambiLightEntity
+
+from .conftest import FakeUnit
+
+OPTIMISTIC_TIMEOUT = 0.05
+
+
+@pytest_asyncio.fixture
+async def light(hass):
+    """
+    Light entity of an off unit with optimistic state enabled
+    """
+    controller = CasambiController(
+        hass,
+        command_interval=0,
+        optimistic=True,
+        optimistic_timeout=OPTIMISTIC_TIMEOUT,
+    )
+    controller.is_started = True
+
+    entity = CasambiLightEntity(MagicMock(), FakeUnit(1), controller, hass)
+    entity.entity_id = "light.unit_1"
+    entity.update_state()
+
+    yield entity
+
+    controller.latency_tracker.cancel_all()
+
+
+def get_state(light) -> str:
+    """Published state of light"""
+    return light.hass.states.get(light.entity_id).state
+
+
+@pytest.mark.asyncio
+async def test_commanded_state_is_published_before_the_send(light):
+    """The commanded state is written before the command is sent"""
+    published = []
+
+    async def set_unit_target_controls(*, target_controls):
+        published.append(get_state(light))
+
+    light.unit.set_unit_target_controls = set_unit_target_controls
+
+    await light.async_turn_on(brightness=128)
+
+    assert published == ["on"]
+    assert light.brightness == 128
+    assert light.controller.optimistic_commands == 1
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_when_the_send_fails(light):
+    """A command that could not be sent publishes the unit state again"""
+    light.unit.error = AiocasambiException("failed")
+
+    with pytest.raises(AiocasambiException):
+        await light.async_turn_on(brightness=128)
+
+    assert get_state(light) == "off"
+    assert light.brightness is None
+    assert light.controller.optimistic_rolled_back == 1
+
+
+@pytest.mark.asyncio
+async def test_confirmed_by_the_unit(light):
+    """An update with the commanded value confirms the state"""
+    await light.async_turn_on(brightness=255)
+
+    light.unit.value = 1.0
+    light.update_state()
+
+    assert get_state(light) == "on"
+    assert light.controller.optimistic_confirmed == 1
+    assert light.controller.optimistic_rolled_back == 0
+
+    # Confirmed, the timeout does not roll back any more
+    await asyncio.sleep(OPTIMISTIC_TIMEOUT * 2)
+    assert light.controller.optimistic_timeouts == 0
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_by_a_different_update(light):
+    """The first update after the send rolls back a state it does not report"""
+    await light.async_turn_on(brightness=255)
+    assert get_state(light) == "on"
+
+    light.update_state()
+
+    assert get_state(light) == "off"
+    assert light.controller.optimistic_rolled_back == 1
+
+
+@pytest.mark.asyncio
+async def test_rolled_back_after_the_timeout(light):
+    """A state that is not confirmed in time is rolled back"""
+    await light.async_turn_on(brightness=255)
+    assert get_state(light) == "on"
+
+    await asyncio.sleep(OPTIMISTIC_TIMEOUT * 2)
+
+    assert get_state(light) == "off"
+    assert light.controller.optimistic_timeouts == 1
+    assert light.controller.optimistic_rolled_back == 1
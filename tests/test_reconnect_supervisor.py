@@ -0,0 +1,142 @@
+"""
+Tests for CasambiReconnectSupervisor.
+"""
+
+import asyncio
+
+import aiohttp
+import async_timeout
+import pytest
+from aiocasambi import AiocasambiException
+
+from custom_components.casambi.casambi.CasambiReconnectSupervisor import (
+    CasambiReconnectSupervisor,
+)
+
+
+class FakeConnection:
+    """
+    Connection that comes back after a number of failed reconnects
+    """
+
+    def __init__(self, errors):
+        """Initialize the fake connection."""
+        self.errors = list(errors)
+        self.connected = False
+        self.attempts = 0
+
+    async def async_reconnect(self):
+        """Fail with the next error, connect when there is none left"""
+        self.attempts += 1
+
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+            return
+
+        self.connected = True
+
+    def is_connected(self) -> bool:
+        """Websockets are running"""
+        return self.connected
+
+
+async def wait_until(condition, timeout=2):
+    """Wait until condition() is true"""
+    async with async_timeout.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.001)
+
+
+@pytest.mark.asyncio
+async def test_retries_until_connected(hass):
+    """Errors are retried and the outage is recorded once connected"""
+    connection = FakeConnection(
+        [AiocasambiException("failed"), aiohttp.ClientError("down"), None]
+    )
+    supervisor = CasambiReconnectSupervisor(
+        hass,
+        connection.async_reconnect,
+        connection.is_connected,
+        min_delay=0.001,
+        max_delay=0.01,
+    )
+
+    supervisor.start()
+    assert supervisor.is_reconnecting
+
+    await wait_until(lambda: not supervisor.is_reconnecting)
+
+    assert connection.attempts == 4
+    assert supervisor.attempts == 0
+    assert supervisor.attempts_total == 4
+    assert supervisor.reconnects == 1
+    assert supervisor.time_to_reconnect is not None
+
+    # Not connected after the third attempt although it did not raise
+    assert supervisor.last_error == "websockets are not running"
+
+    [outage] = supervisor.history
+    assert outage["attempts"] == 4
+
+
+@pytest.mark.asyncio
+async def test_start_runs_one_attempt_at_a_time(hass):
+    """Starting again while reconnecting does not start another task"""
+    connection = FakeConnection([asyncio.TimeoutError()] * 3)
+    supervisor = CasambiReconnectSupervisor(
+        hass,
+        connection.async_reconnect,
+        connection.is_connected,
+        min_delay=0.001,
+        max_delay=0.001,
+    )
+
+    supervisor.start()
+    supervisor.start()
+
+    await wait_until(lambda: not supervisor.is_reconnecting)
+
+    assert connection.attempts == 4
+    assert supervisor.reconnects == 1
+
+
+@pytest.mark.asyncio
+async def test_backoff_is_capped(hass):
+    """The delay doubles per attempt up to max_delay"""
+    supervisor = CasambiReconnectSupervisor(
+        hass, None, None, min_delay=5, max_delay=300
+    )
+
+    supervisor.attempts = 1
+    assert 2.5 <= supervisor.get_delay() <= 5
+
+    supervisor.attempts = 4
+    assert 20 <= supervisor.get_delay() <= 40
+
+    supervisor.attempts = 20
+    assert 150 <= supervisor.get_delay() <= 300
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_attempts(hass):
+    """A stopped supervisor does not reconnect any more"""
+    connection = FakeConnection([AiocasambiException("failed")] * 100)
+    supervisor = CasambiReconnectSupervisor(
+        hass,
+        connection.async_reconnect,
+        connection.is_connected,
+        min_delay=10,
+        max_delay=10,
+    )
+
+    supervisor.start()
+    await wait_until(lambda: connection.attempts == 1)
+
+    supervisor.stop()
+    assert not supervisor.is_reconnecting
+
+    supervisor.start()
+    assert not supervisor.is_reconnecting
+    assert connection.attempts == 1
@@ -0,0 +1,85 @@
+"""
+Tests for setting up a Casambi config entry.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.exceptions import ConfigEntryError, ConfigEntryNotReady
+from homeassistant.helpers import issue_registry as ir
+
+from custom_components.casambi import (
+    async_setup_entry,
+    async_start_cached_controller,
+    get_auth_issue_id,
+)
+from custom_components.casambi.casambi.CasambiController import CasambiController
+from custom_components.casambi.const import DOMAIN
+from custom_components.casambi.errors import AuthenticationError
+
+
+def get_config_entry() -> ConfigEntry:
+    """Config entry of a Casambi network"""
+    return ConfigEntry(
+        version=1,
+        minor_version=1,
+        domain=DOMAIN,
+        title="Casambi",
+        data={},
+        source="user",
+    )
+
+
+async def setup_entry(hass, config_entry, start_controller):
+    """Set up config_entry without any cached unit, started by start_controller"""
+    await ir.async_load(hass)
+
+    with patch(
+        "custom_components.casambi.async_build_controller",
+        AsyncMock(return_value=CasambiController(hass)),
+    ), patch("custom_components.casambi.async_start_controller", start_controller):
+        await async_setup_entry(hass, config_entry)
+
+
+@pytest.mark.asyncio
+async def test_failed_start_is_retried_by_home_assistant(hass):
+    """A failed start leaves nothing behind for the next setup attempt"""
+    config_entry = get_config_entry()
+
+    with pytest.raises(ConfigEntryNotReady):
+        await setup_entry(hass, config_entry, AsyncMock(return_value=False))
+
+    assert config_entry.entry_id not in hass.data[DOMAIN]
+    assert config_entry.update_listeners == []
+
+
+@pytest.mark.asyncio
+async def test_rejected_credentials_raise_an_issue(hass):
+    """Rejected credentials fail the setup for good and raise an issue"""
+    config_entry = get_config_entry()
+    start_controller = AsyncMock(side_effect=AuthenticationError("rejected"))
+
+    with pytest.raises(ConfigEntryError):
+        await setup_entry(hass, config_entry, start_controller)
+
+    assert config_entry.entry_id not in hass.data[DOMAIN]
+    assert ir.async_get(hass).async_get_issue(DOMAIN, get_auth_issue_id(config_entry))
+
+
+@pytest.mark.asyncio
+async def test_cached_start_stops_on_rejected_credentials(hass):
+    """A cached start is not retried once the credentials are rejected"""
+    await ir.async_load(hass)
+    config_entry = get_config_entry()
+    controller = MagicMock()
+    start_controller = AsyncMock(side_effect=AuthenticationError("rejected"))
+
+    with patch("custom_components.casambi.async_start_controller", start_controller):
+        await async_start_cached_controller(
+            hass, config_entry, controller, MagicMock(), MagicMock()
+        )
+
+    assert start_controller.await_count == 1
+    controller.reconcile_units.assert_not_called()
+    assert ir.async_get(hass).async_get_issue(DOMAIN, get_auth_issue_id(config_entry))
@@ -0,0 +1,113 @@
+"""
+Tests for CasambiTrafficRecorder.
+"""
+
+import json
+import os
+
+import pytest
+from aiocasambi.consts import SIGNAL_DATA, SIGNAL_UNIT_PULL_UPDATE
+
+from custom_components.casambi.casambi.CasambiTrafficRecorder import (
+    SIGNAL_TOPOLOGY,
+    CasambiTrafficRecorder,
+)
+
+from .conftest import FakeUnit
+
+
+def read_records(path) -> list:
+    """Records of a traffic file"""
+    with open(path, encoding="utf-8") as traffic_file:
+        return [json.loads(line) for line in traffic_file]
+
+
+def get_recorder(hass, path, units, **kwargs) -> CasambiTrafficRecorder:
+    """Recorder of the traffic of units"""
+    units_by_id = {unit.unique_id: unit for unit in units}
+
+    return CasambiTrafficRecorder(
+        hass,
+        str(path),
+        lambda: units,
+        units_by_id.get,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_records_signals_after_topology(hass, tmp_path):
+    """A file starts with the topology, followed by the unit states"""
+    units = [FakeUnit(1), FakeUnit(2)]
+    path = tmp_path / "traffic.jsonl"
+    recorder = get_recorder(hass, path, units)
+
+    units[0].value = 0.5
+    recorder.record(SIGNAL_DATA, {units[0].unique_id: units[0]})
+    recorder.record(SIGNAL_UNIT_PULL_UPDATE, [units[1].unique_id, "unknown"])
+
+    await recorder.async_stop()
+
+    topology, data, pull_update = read_records(path)
+
+    assert topology["s"] == SIGNAL_TOPOLOGY
+    assert [unit["unique_id"] for unit in topology["d"]] == [
+        unit.unique_id for unit in units
+    ]
+
+    assert data["s"] == SIGNAL_DATA
+    assert data["d"]["u"][units[0].unique_id]["v"] == 0.5
+
+    assert pull_update["s"] == SIGNAL_UNIT_PULL_UPDATE
+    assert pull_update["d"]["u"][units[1].unique_id]["o"] is True
+    assert pull_update["d"]["u"]["unknown"] is None
+
+    assert recorder.statistics["records"] == 2
+    assert recorder.statistics["bytes_written"] == os.path.getsize(path)
+
+    # Stopped, nothing is recorded any more
+    recorder.record(SIGNAL_DATA, {units[0].unique_id: units[0]})
+    assert recorder.statistics["records"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rotates_full_files(hass, tmp_path):
+    """Full files are rotated, every file starts with the topology"""
+    units = [FakeUnit(1)]
+    path = tmp_path / "traffic.jsonl"
+    recorder = get_recorder(hass, path, units, max_bytes=1000, backup_count=2)
+
+    for index in range(20):
+        units[0].value = index / 20
+        recorder.record(SIGNAL_DATA, {units[0].unique_id: units[0]})
+        await recorder.async_flush()
+
+    await recorder.async_stop()
+
+    assert recorder.rotations > 2
+    assert sorted(os.listdir(tmp_path)) == [
+        "traffic.jsonl",
+        "traffic.jsonl.1",
+        "traffic.jsonl.2",
+    ]
+
+    for name in os.listdir(tmp_path):
+        records = read_records(tmp_path / name)
+        assert records[0]["s"] == SIGNAL_TOPOLOGY
+        assert os.path.getsize(tmp_path / name) <= 1000
+
+    # Latest records are in the current file
+    assert read_records(path)[-1]["d"]["u"][units[0].unique_id]["v"] == 0.95
+
+
+def test_remove_files(tmp_path):
+    """The file and its numbered backups are removed, nothing else"""
+    path = tmp_path / "traffic.jsonl"
+    (tmp_path / "traffic.jsonl.bak").write_text("{}\n", encoding="utf-8")
+    for name in ("traffic.jsonl", "traffic.jsonl.1", "traffic.jsonl.5", "other.1"):
+        (tmp_path / name).write_text("{}\n", encoding="utf-8")
+
+    assert CasambiTrafficRecorder.remove_files(str(path)) == 3
+    assert sorted(os.listdir(tmp_path)) == ["other.1", "traffic.jsonl.bak"]
+
+    assert CasambiTrafficRecorder.remove_files(str(path)) == 0